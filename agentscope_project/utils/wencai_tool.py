@@ -5,11 +5,31 @@
 用于查询个股的详细信息
 """
 
+import importlib.util
+import os
 import pywencai
 import json
 import pandas as pd
 from typing import Dict, Any, Optional
 
+# 复用主项目的问财分部分缓存（按文件路径加载，避免与本项目的 app.py 重名）
+_CACHE_MODULE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "app", "utils", "wencai_cache.py"
+)
+_spec = importlib.util.spec_from_file_location("hello_stock_wencai_cache", _CACHE_MODULE_PATH)
+_wencai_cache_module = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_wencai_cache_module)
+
+# 转换为字符串时表格最多保留的行数
+MAX_TABLE_ROWS = 50
+
+def _frame_from_split(split: Dict) -> pd.DataFrame:
+    """缓存中的列式表格直接还原为 DataFrame，不展开为 records"""
+    return pd.DataFrame(split.get('data', []), columns=split.get('columns', []))
+
+wencai_cache = _wencai_cache_module.WenCaiCache(table_factory=_frame_from_split)
+
 def _convert_nested_dataframe(obj):
     """
     递归处理嵌套在字典或列表中的DataFrame对象
@@ -42,26 +62,37 @@ def _convert_nested_dataframe(obj):
         # 其他情况直接返回
         return obj
 
-def _convert_to_string(value: Any) -> str:
+def _convert_to_string(value: Any, max_rows: int = MAX_TABLE_ROWS) -> str:
     """
     将各种数据类型统一转换为字符串
     
+    表格只转换前 max_rows 行，避免把大表（如历史龙虎榜、主力资金）全部展开
+    
     Args:
         value: 需要转换的值
+        max_rows: 表格和列表最多保留的行数
         
     Returns:
         str: 转换后的字符串
     """
     try:
+        total = None
+        if isinstance(value, pd.DataFrame) and len(value) > max_rows:
+            total = len(value)
+            value = value.head(max_rows)
+        elif isinstance(value, list) and len(value) > max_rows:
+            total = len(value)
+            value = value[:max_rows]
+        
         # 首先处理嵌套的DataFrame
         processed_value = _convert_nested_dataframe(value)
         
-        if isinstance(processed_value, dict):
-            # 如果值是字典，转换为JSON字符串
-            return json.dumps(processed_value, ensure_ascii=False, indent=2, default=str)
-        elif isinstance(processed_value, list):
-            # 如果值是列表，转换为字符串
-            return json.dumps(processed_value, ensure_ascii=False, indent=2, default=str)
+        if isinstance(processed_value, (dict, list)):
+            # 如果值是字典或列表，转换为JSON字符串
+            text = json.dumps(processed_value, ensure_ascii=False, indent=2, default=str)
+            if total is not None:
+                text += f"\n... (共 {total} 行，仅保留前 {max_rows} 行)"
+            return text
         elif pd.isna(processed_value):
             # 处理NaN值
             return "无数据"
@@ -97,8 +128,20 @@ def get_stock_info(stock_name: str) -> Optional[Dict[str, Any]]:
             - 历史龙虎榜
     """
     try:
-        # 调用问财接口
-        res = pywencai.get(query=stock_name)
+        # 非字典结果（如表格查询）无法分部分缓存，直接处理
+        uncached = []
+        
+        def fetch():
+            raw = pywencai.get(query=stock_name)
+            if raw is not None and not isinstance(raw, dict):
+                uncached.append(raw)
+                return None
+            return raw
+        
+        # 经过分部分缓存调用问财接口
+        res = wencai_cache.get_or_fetch(stock_name, fetch)
+        if res is None and uncached:
+            res = uncached[0]
         
         if res is None:
             return None
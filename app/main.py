@@ -1,6 +1,11 @@
+import os
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from app.routers import stock, chat, risk, market
 from app.database import init_db
+from app.utils.quote_snapshot import quote_service
+from app.utils.symbol_master import symbol_master
+from app.utils.instrumentation import metrics
 
 app = FastAPI(
     title="Hello Stock - AI股票分析助手",
@@ -17,10 +22,37 @@ app.include_router(chat.router, prefix="/api/chat", tags=["对话管理"])
 app.include_router(risk.router, prefix="/api/risk", tags=["风险控制"])
 app.include_router(market.router, prefix="/api/market", tags=["市场分析"])
 
+@app.on_event("startup")
+async def start_quote_service():
+    """启动全市场行情快照轮询（通过 QUOTE_POLLER_ENABLED=1 开启）"""
+    if os.getenv("QUOTE_POLLER_ENABLED", "0") == "1":
+        quote_service.interval = float(os.getenv("QUOTE_POLLER_INTERVAL", "5"))
+        quote_service.start()
+
+@app.on_event("startup")
+async def load_symbol_master():
+    """加载股票代码主表，不是当天的数据时在后台刷新"""
+    symbol_master.refresh_in_background()
+
+@app.on_event("shutdown")
+async def stop_quote_service():
+    quote_service.stop(timeout=5)
+
 @app.get("/")
 async def root():
     return {"message": "欢迎使用Hello Stock - AI股票分析助手"}
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+@app.get("/metrics")
+async def get_metrics(format: str = "prometheus"):
+    """
+    导出进程内埋点指标
+
+    format=prometheus 返回 Prometheus 文本格式，format=json 返回直方图、计数器和最近的 span
+    """
+    if format == "json":
+        return metrics.snapshot()
+    return PlainTextResponse(metrics.to_prometheus(), media_type="text/plain; version=0.0.4")
@@ -1,11 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from datetime import datetime, date
 from app.database.base import get_db
 from app.schemas import market as schemas
 from app.models import market as models
 from app.core.qwen_api import qwen_api
+from app.utils.quote_snapshot import quote_service
+from app.utils.news_store import news_store
 
 router = APIRouter()
 
@@ -148,4 +150,29 @@ async def check_sector_rotation(db: Session = Depends(get_db)):
     
     return {
         "analysis": result["data"]
-    }
\ No newline at end of file
+    }
+
+@router.get("/quotes/{stock_code}")
+async def get_latest_quote(stock_code: str):
+    """
+    获取股票最新实时行情
+    """
+    quote = quote_service.get_quote(stock_code)
+    if not quote:
+        raise HTTPException(status_code=404, detail="暂无该股票的实时行情")
+    
+    return quote
+
+@router.get("/news/search")
+async def search_news(q: str, code: Optional[str] = None, days: Optional[float] = None, limit: int = 50):
+    """
+    本地全文检索新闻（标题、摘要、正文）
+    """
+    return news_store.search(q, code=code, days=days, limit=limit)
+
+@router.get("/news/stock/{stock_code}")
+async def get_stock_news(stock_code: str, days: float = 5, limit: int = 50):
+    """
+    获取最近提到某只股票的新闻
+    """
+    return news_store.news_for_stock(stock_code, days=days, limit=limit)
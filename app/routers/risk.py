@@ -1,9 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.database.base import get_db
 from app.schemas import risk as schemas
 from app.models import risk as models
+from app.models import stock as stock_models
+from app.utils.quote_snapshot import quote_service
 
 router = APIRouter()
 
@@ -54,16 +57,31 @@ async def mark_alert_as_read(alert_id: int, db: Session = Depends(get_db)):
     return {"message": "标记为已读成功"}
 
 @router.post("/check-stop-loss")
-async def check_stop_loss_conditions(user_id: str, current_price: float, purchase_price: float, db: Session = Depends(get_db)):
+async def check_stop_loss_conditions(user_id: str, purchase_price: float, current_price: Optional[float] = None,
+                                     stock_code: Optional[str] = None, db: Session = Depends(get_db)):
     """
     检查是否触发止损条件
+    
+    purchase_price 是某一只股票的成本价：传入 stock_code 时只检查该股票的规则和通用规则，
+    未传入 current_price 时使用实时行情快照中该股票的最新价
     """
+    if current_price is None:
+        if not stock_code:
+            raise HTTPException(status_code=400, detail="未传入 current_price 时必须指定 stock_code")
+        current_price = quote_service.get_latest_price(stock_code)
+        if current_price is None:
+            raise HTTPException(status_code=503, detail=f"暂无股票{stock_code}的实时行情")
+    
     # 获取用户的止损规则
-    stop_loss_rules = db.query(models.StockTradeRule).filter(
-        models.StockTradeRule.user_id == user_id,
-        models.StockTradeRule.rule_type == "stop_loss",
-        models.StockTradeRule.enabled == 1
-    ).all()
+    query = db.query(stock_models.StockTradeRule).filter(
+        stock_models.StockTradeRule.user_id == user_id,
+        stock_models.StockTradeRule.rule_type == "stop_loss",
+        stock_models.StockTradeRule.enabled == 1
+    )
+    if stock_code:
+        query = query.filter(or_(stock_models.StockTradeRule.stock_code == stock_code,
+                                 stock_models.StockTradeRule.stock_code.is_(None)))
+    stop_loss_rules = query.all()
     
     alerts = []
     
@@ -73,11 +91,12 @@ async def check_stop_loss_conditions(user_id: str, current_price: float, purchas
         
         # 检查是否触发止损
         if loss_percentage >= rule.threshold:
+            code = rule.stock_code or stock_code
             alert = models.RiskAlert(
                 user_id=user_id,
                 alert_type="stop_loss",
-                stock_code=rule.stock_code,
-                message=f"股票{rule.stock_code}已下跌{loss_percentage:.2f}%，达到止损线{rule.threshold}%",
+                stock_code=code,
+                message=f"股票{code}已下跌{loss_percentage:.2f}%，达到止损线{rule.threshold}%",
                 severity="high"
             )
             db.add(alert)
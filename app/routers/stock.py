@@ -1,14 +1,58 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.database.base import get_db
 from app.schemas import stock as schemas
 from app.models import stock as models
 from app.core.qwen_api import qwen_api
+from app.utils.stock_comprehensive_analyzer import StockComprehensiveAnalyzer
+import json
 import os
 
 router = APIRouter()
 
+# 综合分析器（首次使用时创建）
+_analyzer: Optional[StockComprehensiveAnalyzer] = None
+
+
+def get_analyzer() -> StockComprehensiveAnalyzer:
+    global _analyzer
+    if _analyzer is None:
+        _analyzer = StockComprehensiveAnalyzer()
+    return _analyzer
+
+
+@router.get("/report/{stock_code}/stream")
+def stream_stock_report(stock_code: str, kline_days: int = 120, use_ai: bool = True, format: str = "ndjson"):
+    """
+    渐进式输出股票分析报告
+
+    各章节的数据一到就输出：技术面通常 1 秒内到达，资金面、基本面和消息面随问财返回，
+    AI分析最后到达。format=ndjson 时每行一个 JSON 章节（最后一行附带 summary），
+    format=text 时直接输出报告文本。
+    """
+    parts = get_analyzer().stream_report(stock_code, kline_days=kline_days, use_ai=use_ai)
+
+    def ndjson():
+        for part in parts:
+            result = part.pop('result', None)
+            if result is not None:
+                part['summary'] = result['summary']
+            yield json.dumps(part, ensure_ascii=False, default=str) + "\n"
+
+    def text():
+        for part in parts:
+            yield part['text'] + "\n"
+
+    if format == "text":
+        body, media_type = text(), "text/plain; charset=utf-8"
+    else:
+        body, media_type = ndjson(), "application/x-ndjson"
+    # 关闭反向代理缓冲，保证章节到达即转发
+    return StreamingResponse(body, media_type=media_type, headers={"X-Accel-Buffering": "no"})
+
+
 @router.post("/analyze-image", response_model=dict)
 async def analyze_stock_image(request: schemas.StockImageAnalysisRequest, db: Session = Depends(get_db)):
     """
@@ -0,0 +1,196 @@
+"""
+综合分析结果缓存
+按 (股票代码, K线天数, 是否使用AI, 是否完整诊股, 是否只读诊股缓存, 交易会话) 缓存 analyze_stock 的结果，
+诊股数据有新部分到达或盘中K线更新后失效，支持先返回旧结果、后台刷新
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from .instrumentation import CACHE_HIT, CACHE_MISS, CACHE_STALE, metrics
+from .trading_calendar import is_trading_time, trading_session
+
+
+# 盘中最新一根K线仍在变化，结果超过该时间（秒）视为过期
+INTRADAY_TTL = 300.0
+
+# 最多缓存的结果数
+MAX_ENTRIES = 1000
+
+
+class AnalysisCache:
+    """
+    analyze_stock 结果的内存缓存（线程安全，LRU 淘汰）
+
+    交易会话是键的一部分，新交易日开盘后自动换新键；同一会话内，
+    以下任一情况视为过期：
+    - 版本号变化：调用方提供的版本号（如诊股数据各部分的最新获取时间）与缓存时不同，
+      或为 None（数据已过期，下次分析会重新获取）
+    - 交易时段内结果超过 intraday_ttl：当日K线还在变化
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, intraday_ttl: float = INTRADAY_TTL,
+                 refresh_workers: int = 2):
+        """
+        初始化缓存
+
+        Args:
+            max_entries: 最多缓存的结果数
+            intraday_ttl: 交易时段内结果的有效期（秒）
+            refresh_workers: 后台刷新的线程数
+        """
+        self.max_entries = max_entries
+        self.intraday_ttl = intraday_ttl
+        self.refresh_workers = refresh_workers
+        # 键 -> (结果, 版本号, 缓存时间)
+        self._entries: "OrderedDict[Hashable, Tuple[Dict, Any, float]]" = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @staticmethod
+    def make_key(stock_code: str, kline_days: int, use_ai: bool, full_diagnosis: bool = False,
+                 cache_only: bool = False, now: Optional[datetime] = None) -> Tuple:
+        """
+        生成缓存键
+
+        Args:
+            stock_code: 股票代码
+            kline_days: K线数据天数
+            use_ai: 是否使用AI分析
+            full_diagnosis: 是否获取完整诊股数据
+            cache_only: 诊股是否只读本地缓存（降级结果与正常结果分开缓存）
+            now: 当前时间，默认为 datetime.now()
+
+        Returns:
+            (股票代码, K线天数, 是否使用AI, 是否完整诊股, 是否只读诊股缓存, 交易会话日期)
+        """
+        return stock_code, kline_days, use_ai, full_diagnosis, cache_only, trading_session(now)
+
+    def _is_fresh(self, version: Any, cached_version: Any, cached_at: float) -> bool:
+        if version is None or version != cached_version:
+            return False
+        return not is_trading_time() or time.time() - cached_at < self.intraday_ttl
+
+    def lookup(self, key: Hashable, version: Any) -> Tuple[Optional[Dict], bool]:
+        """
+        查找缓存
+
+        Args:
+            key: make_key 生成的键
+            version: 当前的数据版本号
+
+        命中情况（有效 / 过期 / 没有缓存）记在 "analysis_cache.lookup" span 上。
+
+        Returns:
+            (缓存的结果, 是否仍然有效)，没有缓存时为 (None, False)
+        """
+        with metrics.span('analysis_cache.lookup') as span:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+            if entry is None:
+                span.cache = CACHE_MISS
+                return None, False
+            result, cached_version, cached_at = entry
+            fresh = self._is_fresh(version, cached_version, cached_at)
+            span.cache = CACHE_HIT if fresh else CACHE_STALE
+        return dict(result), fresh
+
+    def put(self, key: Hashable, result: Dict, version: Any):
+        """
+        写入结果
+
+        Args:
+            key: make_key 生成的键
+            result: 分析结果
+            version: 结果对应的数据版本号
+        """
+        with self._lock:
+            self._entries[key] = (result, version, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def refresh_in_background(self, key: Hashable, compute: Callable[[], Dict],
+                              version: Callable[[], Any]) -> bool:
+        """
+        在后台线程重新计算并写入缓存，同一个键同时只刷新一次
+
+        Args:
+            key: 缓存键
+            compute: 计算分析结果的函数
+            version: 计算完成后获取数据版本号的函数
+
+        Returns:
+            是否提交了新的刷新任务
+        """
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.refresh_workers,
+                                                    thread_name_prefix="analysis-refresh")
+
+        def run():
+            try:
+                self.put(key, compute(), version())
+            except Exception as e:
+                print(f"后台刷新分析结果失败 {key[0]}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        self._executor.submit(run)
+        return True
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Dict], version: Callable[[], Any],
+                       stale_while_revalidate: bool = False) -> Dict:
+        """
+        读取缓存，过期或没有缓存时重新计算
+
+        Args:
+            key: 缓存键
+            compute: 计算分析结果的函数
+            version: 获取当前数据版本号的函数（计算完成后会再调用一次，作为结果的版本号）
+            stale_while_revalidate: 过期时直接返回旧结果，并在后台刷新
+
+        Returns:
+            分析结果
+        """
+        cached, fresh = self.lookup(key, version())
+        if fresh:
+            return cached
+        if cached is not None and stale_while_revalidate:
+            self.refresh_in_background(key, compute, version)
+            return cached
+
+        result = compute()
+        self.put(key, result, version())
+        return result
+
+    def invalidate(self, stock_code: Optional[str] = None):
+        """
+        删除缓存
+
+        Args:
+            stock_code: 要删除的股票代码，None 表示全部
+        """
+        with self._lock:
+            if stock_code is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k[0] == stock_code]:
+                    del self._entries[key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# 创建全局实例
+analysis_cache = AnalysisCache()
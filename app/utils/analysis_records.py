@@ -0,0 +1,333 @@
+"""
+紧凑的分析结果表示
+把 analyze_stock 返回的嵌套字典压缩为带 __slots__ 的 SummaryRecord，或整批压缩为
+NumPy 结构化数组；建议、风险等级和技术信号用整数枚举表示，批量排序和筛选直接在数组上完成
+"""
+import math
+from dataclasses import dataclass
+from enum import IntEnum, IntFlag
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+
+from .factor_scoring import DIMENSION_NAMES
+
+
+class Recommendation(IntEnum):
+    """操作建议（数值越大越积极）"""
+    AVOID = 0
+    WATCH = 1
+    HOLD = 2
+    BUY = 3
+
+    @property
+    def label(self) -> str:
+        return RECOMMENDATION_LABELS[self]
+
+    @classmethod
+    def parse(cls, text: Optional[str]) -> 'Recommendation':
+        """从中文建议解析，无法识别时为观望"""
+        return _RECOMMENDATION_BY_LABEL.get(text, cls.WATCH)
+
+
+class RiskLevel(IntEnum):
+    """风险等级（数值越大风险越高）"""
+    UNKNOWN = 0
+    LOW = 1
+    MEDIUM = 2
+    HIGH = 3
+
+    @property
+    def label(self) -> str:
+        return RISK_LEVEL_LABELS[self]
+
+    @classmethod
+    def parse(cls, text: Optional[str]) -> 'RiskLevel':
+        """从中文风险等级解析，无法识别时为未知"""
+        return _RISK_LEVEL_BY_LABEL.get(text, cls.UNKNOWN)
+
+
+class Signal(IntFlag):
+    """技术信号位标志，取代 key_points / risks 中逐条的提示文字"""
+    NONE = 0
+    MA_BULL = 1           # 均线多头排列
+    MA_BEAR = 2           # 均线空头排列
+    MACD_GOLDEN = 4       # MACD 金叉
+    MACD_DEAD = 8         # MACD 死叉
+    KDJ_GOLDEN = 16       # KDJ 金叉向上
+    KDJ_DEAD = 32         # KDJ 死叉向下
+    KDJ_OVERBOUGHT = 64   # KDJ 超买
+    KDJ_OVERSOLD = 128    # KDJ 超卖
+    AI = 256              # 摘要由大模型生成
+
+
+RECOMMENDATION_LABELS = {
+    Recommendation.AVOID: '规避',
+    Recommendation.WATCH: '观望',
+    Recommendation.HOLD: '持有',
+    Recommendation.BUY: '买入',
+}
+
+RISK_LEVEL_LABELS = {
+    RiskLevel.UNKNOWN: '未知',
+    RiskLevel.LOW: '低风险',
+    RiskLevel.MEDIUM: '中等风险',
+    RiskLevel.HIGH: '高风险',
+}
+
+_RECOMMENDATION_BY_LABEL = {label: value for value, label in RECOMMENDATION_LABELS.items()}
+_RISK_LEVEL_BY_LABEL = {label: value for value, label in RISK_LEVEL_LABELS.items()}
+
+# 均线趋势和 MACD / KDJ 信号文字（" - " 之前的部分）-> 信号位
+_MA_SIGNALS = {'强势上涨': Signal.MA_BULL, '弱势下跌': Signal.MA_BEAR}
+_MACD_SIGNALS = {'金叉': Signal.MACD_GOLDEN, '死叉': Signal.MACD_DEAD}
+_KDJ_SIGNALS = {'金叉向上': Signal.KDJ_GOLDEN, '死叉向下': Signal.KDJ_DEAD,
+                '超买': Signal.KDJ_OVERBOUGHT, '超卖': Signal.KDJ_OVERSOLD}
+
+# 各维度评分字段，顺序与 DIMENSION_NAMES 一致
+SCORE_FIELDS = tuple(f'{dimension}_score' for dimension in DIMENSION_NAMES)
+
+# 结构化数组的字段：每只股票 112 字节（评分和价格用 float32，约 7 位有效数字）
+RECORD_DTYPE = np.dtype([
+    ('stock_code', 'U8'),
+    ('stock_name', 'U12'),
+    ('overall_score', 'f4'),
+    *[(field, 'f4') for field in SCORE_FIELDS],
+    ('recommendation', 'i1'),
+    ('risk_level', 'i1'),
+    ('signals', 'u2'),
+    ('close', 'f4'),
+    ('change_pct', 'f4'),
+])
+
+
+def technical_signals(technical: Optional[Dict]) -> Signal:
+    """
+    从技术分析结果提取信号位
+
+    Args:
+        technical: StockAnalyzer.analyze 的结果
+
+    Returns:
+        Signal 位组合
+    """
+    if not technical or 'error' in technical:
+        return Signal.NONE
+    indicators = technical.get('technical_indicators') or {}
+    signals = _MA_SIGNALS.get((indicators.get('ma') or {}).get('trend'), Signal.NONE)
+    macd = ((indicators.get('macd') or {}).get('signal') or '').split(' - ')[0]
+    kdj = ((indicators.get('kdj') or {}).get('signal') or '').split(' - ')[0]
+    return signals | _MACD_SIGNALS.get(macd, Signal.NONE) | _KDJ_SIGNALS.get(kdj, Signal.NONE)
+
+
+@dataclass(slots=True)
+class SummaryRecord:
+    """单只股票分析结果的紧凑表示（不含原始数据和提示文字）"""
+    stock_code: str
+    stock_name: str
+    overall_score: float
+    technical_score: float = math.nan
+    fund_score: float = math.nan
+    fundamental_score: float = math.nan
+    news_score: float = math.nan
+    recommendation: Recommendation = Recommendation.WATCH
+    risk_level: RiskLevel = RiskLevel.UNKNOWN
+    signals: Signal = Signal.NONE
+    close: float = math.nan
+    change_pct: float = math.nan
+
+    @classmethod
+    def from_result(cls, result: Dict) -> 'SummaryRecord':
+        """
+        从 analyze_stock 的结果创建
+
+        Args:
+            result: analyze_stock / analyze_many 的结果
+
+        Returns:
+            SummaryRecord，缺失的评分和价格为 NaN
+        """
+        summary = result.get('summary') or {}
+        details = summary.get('score_details') or {}
+        technical = result.get('technical_analysis')
+        basic = (technical or {}).get('basic_info') or {}
+        signals = technical_signals(technical)
+        if summary.get('generated_by', 'Rule') != 'Rule':
+            signals |= Signal.AI
+        return cls(
+            stock_code=result['stock_code'],
+            stock_name=result.get('stock_name') or result['stock_code'],
+            overall_score=_float(summary.get('overall_score')),
+            **{field: _float(details.get(name)) for field, name in zip(SCORE_FIELDS, DIMENSION_NAMES.values())},
+            recommendation=Recommendation.parse(summary.get('recommendation')),
+            risk_level=RiskLevel.parse(summary.get('risk_level')),
+            signals=signals,
+            close=_float(basic.get('close')),
+            change_pct=_float(basic.get('change_pct')),
+        )
+
+    def to_summary(self) -> Dict:
+        """
+        转换回 summary 字典（与 analyze_stock 结果中的 summary 字段同结构，不含提示文字）
+
+        Returns:
+            {'overall_score', 'risk_level', 'recommendation', 'score_details'}
+        """
+        scores = (getattr(self, field) for field in SCORE_FIELDS)
+        return {
+            'overall_score': self.overall_score,
+            'risk_level': self.risk_level.label,
+            'recommendation': self.recommendation.label,
+            'score_details': {name: score for name, score in zip(DIMENSION_NAMES.values(), scores)
+                              if not math.isnan(score)},
+        }
+
+    def to_result(self) -> Dict:
+        """
+        转换回精简的 analyze_stock 结果字典
+
+        Returns:
+            {'stock_code', 'stock_name', 'success', 'summary'}，可直接用于只读取 summary 的旧代码
+        """
+        return {
+            'stock_code': self.stock_code,
+            'stock_name': self.stock_name,
+            'success': True,
+            'summary': self.to_summary(),
+        }
+
+    def astuple(self) -> tuple:
+        """按 RECORD_DTYPE 的字段顺序返回"""
+        return tuple(getattr(self, name) for name in RECORD_DTYPE.names)
+
+
+def _float(value) -> float:
+    """转换为浮点数，缺失或无法转换时为 NaN"""
+    try:
+        return math.nan if value is None else float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def to_array(items: Iterable[Union[Dict, SummaryRecord]]) -> np.ndarray:
+    """
+    把一批分析结果压缩为结构化数组
+
+    Args:
+        items: analyze_many 的结果（失败的结果会被跳过）或 SummaryRecord
+
+    Returns:
+        dtype 为 RECORD_DTYPE 的一维数组
+
+    Example:
+        >>> records = to_array(analyzer.analyze_many(stocks))
+        >>> top = rank(select(records, min_score=70))[:10]
+    """
+    rows = []
+    for item in items:
+        if isinstance(item, dict):
+            if not item.get('success'):
+                continue
+            item = SummaryRecord.from_result(item)
+        rows.append(item.astuple())
+    return np.array(rows, dtype=RECORD_DTYPE)
+
+
+def from_array(array: np.ndarray) -> List[SummaryRecord]:
+    """
+    把结构化数组还原为 SummaryRecord 列表
+
+    Args:
+        array: to_array 返回的数组（或其切片）
+
+    Returns:
+        SummaryRecord 列表
+    """
+    records = []
+    for row in array.tolist():
+        values = dict(zip(RECORD_DTYPE.names, row))
+        values['recommendation'] = Recommendation(values['recommendation'])
+        values['risk_level'] = RiskLevel(values['risk_level'])
+        values['signals'] = Signal(values['signals'])
+        records.append(SummaryRecord(**values))
+    return records
+
+
+def rank(array: np.ndarray, by: str = 'overall_score', descending: bool = True,
+         limit: Optional[int] = None) -> np.ndarray:
+    """
+    按某个字段排序（NaN 排在最后，相同值保持原顺序）
+
+    Args:
+        array: 结构化数组
+        by: 排序字段
+        descending: 是否从高到低
+        limit: 只取前 limit 条（先 argpartition 再排序，只复制需要的行）
+
+    Returns:
+        排序后的新数组
+    """
+    values = array[by].astype(float)
+    if descending:
+        values = -values
+    keys = np.where(np.isnan(values), np.inf, values)
+    if limit is not None and limit < len(array):
+        # 取第 limit 小的键为阈值，与阈值并列的行都参与排序，保证与完整排序结果一致
+        if limit <= 0:
+            return array[:0]
+        threshold = np.partition(keys, limit - 1)[limit - 1]
+        candidates = np.flatnonzero(keys <= threshold)
+        order = candidates[np.argsort(keys[candidates], kind='stable')][:limit]
+    else:
+        order = np.argsort(keys, kind='stable')
+    return array[order]
+
+
+def select(array: np.ndarray, min_score: Optional[float] = None, max_score: Optional[float] = None,
+           recommendations: Optional[Iterable[Recommendation]] = None,
+           max_risk: Optional[RiskLevel] = None, signals: Signal = Signal.NONE,
+           exclude_signals: Signal = Signal.NONE) -> np.ndarray:
+    """
+    按条件筛选（各条件同时满足）
+
+    Args:
+        array: 结构化数组
+        min_score: 综合评分下限（含）
+        max_score: 综合评分上限（不含）
+        recommendations: 允许的操作建议
+        max_risk: 风险等级上限（含），未知风险不会被排除
+        signals: 必须全部具备的技术信号
+        exclude_signals: 不能具备的任何技术信号
+
+    Returns:
+        满足条件的子数组
+
+    Example:
+        >>> select(records, min_score=60, signals=Signal.MACD_GOLDEN, exclude_signals=Signal.KDJ_OVERBOUGHT)
+    """
+    mask = np.ones(len(array), dtype=bool)
+    score = array['overall_score']
+    if min_score is not None:
+        mask &= score >= min_score
+    if max_score is not None:
+        mask &= score < max_score
+    if recommendations is not None:
+        mask &= np.isin(array['recommendation'], [int(r) for r in recommendations])
+    if max_risk is not None:
+        mask &= array['risk_level'] <= max_risk
+    if signals:
+        mask &= (array['signals'] & signals) == signals
+    if exclude_signals:
+        mask &= (array['signals'] & exclude_signals) == 0
+    return array[mask]
+
+
+def count_by_recommendation(array: np.ndarray) -> Dict[Recommendation, int]:
+    """
+    统计各操作建议的股票数
+
+    Returns:
+        {Recommendation: 数量}，包含数量为 0 的建议
+    """
+    counts = np.bincount(array['recommendation'].astype(np.intp), minlength=len(Recommendation))
+    return {recommendation: int(counts[recommendation]) for recommendation in Recommendation}
@@ -2,73 +2,288 @@
 Cookie 管理器
 用于管理和持久化 cookie
 """
+import atexit
 import json
 import os
-from typing import Optional, List
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional, List, Dict, Tuple
 from pathlib import Path
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def _file_lock(path: Path):
+    """
+    跨进程的排他文件锁（POSIX 使用 flock，Windows 使用 msvcrt.locking）
+
+    Args:
+        path: 锁文件路径
+    """
+    with open(path, 'a+') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
 
 class CookieManager:
-    """Cookie 管理器，负责 cookie 的存储、读取和删除"""
-    
-    def __init__(self, cookie_file: str = "cookies.json"):
+    """
+    Cookie 管理器，负责 cookie 的存储、读取和删除
+
+    cookie 在内存中以池的形式维护：按轮询方式分配，记录每个 cookie 的成功率和延迟，
+    失败后进入冷却期而不是立即删除；写文件采用防抖的原子写入，不占用请求热路径。
+
+    多个进程（多个 uvicorn worker、批量脚本）共享同一个 cookie 文件时，写入在文件锁内
+    以“读取-合并-替换”的方式进行，只应用本进程的增删操作；各进程通过廉价的 os.stat
+    检测文件变化并重新加载，删除操作立即落盘，因此一个进程判定失效的 cookie 会很快
+    在所有进程中停用。
+    """
+
+    # 连续失败达到该次数后删除 cookie
+    MAX_CONSECUTIVE_FAILURES = 3
+
+    # 冷却时间（秒），按连续失败次数指数增长
+    BASE_COOLDOWN = 30.0
+    MAX_COOLDOWN = 600.0
+
+    # 延迟的指数移动平均系数
+    LATENCY_ALPHA = 0.2
+
+    def __init__(self, cookie_file: str = "cookies.json", save_delay: float = 1.0,
+                 check_interval: float = 1.0):
         """
         初始化 Cookie 管理器
-        
+
         Args:
             cookie_file: cookie 存储文件路径
+            save_delay: 防抖写入的延迟（秒），0 表示立即写入
+            check_interval: 检查文件是否被其他进程修改的最小间隔（秒）
         """
         self.cookie_file = Path(cookie_file)
+        self.lock_file = self.cookie_file.with_name(self.cookie_file.name + '.lock')
+        self.save_delay = save_delay
+        self.check_interval = check_interval
+        self._lock = threading.RLock()
+        self._cursor = 0
+        self._stats: Dict[str, Dict] = {}
+        self._save_timer: Optional[threading.Timer] = None
+
+        # 尚未落盘的本进程操作
+        self._pending_add: List[str] = []
+        self._pending_remove = set()
+        self._pending_clear = False
+
         self._ensure_cookie_file()
-    
+        self._cookies: List[str] = self._load_cookies()
+        self._file_signature = self._signature()
+        self._last_check = time.monotonic()
+        atexit.register(self.flush)
+
     def _ensure_cookie_file(self):
         """确保 cookie 文件存在"""
         if not self.cookie_file.exists():
-            self.cookie_file.write_text(json.dumps([]))
-    
+            with _file_lock(self.lock_file):
+                if not self.cookie_file.exists():
+                    self._save_cookies([])
+
+    def _signature(self) -> Optional[Tuple[int, int, int]]:
+        """cookie 文件的 (mtime, size, inode)，用于检测其他进程的修改"""
+        try:
+            st = os.stat(self.cookie_file)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    @property
+    def _dirty(self) -> bool:
+        return bool(self._pending_add or self._pending_remove or self._pending_clear)
+
+    def _apply_pending(self, cookies: List[str]) -> List[str]:
+        """在文件中的 cookie 列表上应用本进程尚未落盘的操作"""
+        if self._pending_clear:
+            cookies = []
+        cookies = [c for c in cookies if c not in self._pending_remove]
+        cookies.extend(c for c in self._pending_add if c not in cookies)
+        return cookies
+
+    def _adopt(self, cookies: List[str]):
+        """替换内存中的 cookie 列表，保留仍然存在的 cookie 的统计和轮询位置"""
+        current = self._cookies[self._cursor] if self._cookies and self._cursor < len(self._cookies) else None
+        self._cookies = cookies
+        self._stats = {c: stats for c, stats in self._stats.items() if c in cookies}
+        self._cursor = cookies.index(current) if current in cookies else 0
+
+    def _refresh_if_changed(self):
+        """文件被其他进程修改后重新加载（按 check_interval 节流）"""
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+
+        signature = self._signature()
+        if signature == self._file_signature:
+            return
+        self._file_signature = signature
+        self._adopt(self._apply_pending(self._load_cookies()))
+
+    def reload(self):
+        """立即从文件重新加载 cookie（合并本进程尚未落盘的操作）"""
+        with self._lock:
+            self._file_signature = self._signature()
+            self._last_check = time.monotonic()
+            self._adopt(self._apply_pending(self._load_cookies()))
+
+    def _new_stats(self) -> Dict:
+        return {
+            'success': 0,
+            'failure': 0,
+            'consecutive_failures': 0,
+            'latency': None,
+            'cooldown_until': 0.0
+        }
+
+    def _stats_of(self, cookie: str) -> Dict:
+        stats = self._stats.get(cookie)
+        if stats is None:
+            stats = self._stats[cookie] = self._new_stats()
+        return stats
+
     def get_cookie(self) -> Optional[str]:
         """
-        获取一个可用的 cookie
-        
+        按轮询方式获取一个可用的 cookie，跳过处于冷却期的 cookie
+
         Returns:
             cookie 字符串，如果没有可用的 cookie 则返回 None
         """
-        cookies = self._load_cookies()
-        if cookies:
-            return cookies[0]
-        return None
-    
+        with self._lock:
+            self._refresh_if_changed()
+            if not self._cookies:
+                return None
+
+            now = time.time()
+            count = len(self._cookies)
+            for offset in range(count):
+                index = (self._cursor + offset) % count
+                cookie = self._cookies[index]
+                if self._stats_of(cookie)['cooldown_until'] <= now:
+                    self._cursor = (index + 1) % count
+                    return cookie
+
+            # 全部在冷却期时，返回最早结束冷却的 cookie
+            return min(self._cookies, key=lambda c: self._stats_of(c)['cooldown_until'])
+
+    def report_success(self, cookie: str, latency: Optional[float] = None):
+        """
+        记录一次使用 cookie 的成功请求
+
+        Args:
+            cookie: cookie 字符串
+            latency: 请求耗时（秒）
+        """
+        with self._lock:
+            if cookie not in self._cookies:
+                return
+            stats = self._stats_of(cookie)
+            stats['success'] += 1
+            stats['consecutive_failures'] = 0
+            stats['cooldown_until'] = 0.0
+            if latency is not None:
+                if stats['latency'] is None:
+                    stats['latency'] = latency
+                else:
+                    stats['latency'] += self.LATENCY_ALPHA * (latency - stats['latency'])
+
+    def report_failure(self, cookie: str, transient: bool = True):
+        """
+        记录一次使用 cookie 的失败请求
+
+        临时性失败（超时、连接错误等）让 cookie 进入冷却期，连续失败过多或
+        明确失效（如 401/403）时才删除。
+
+        Args:
+            cookie: cookie 字符串
+            transient: 是否为临时性失败
+        """
+        with self._lock:
+            if cookie not in self._cookies:
+                return
+            stats = self._stats_of(cookie)
+            stats['failure'] += 1
+            stats['consecutive_failures'] += 1
+
+            if not transient or stats['consecutive_failures'] >= self.MAX_CONSECUTIVE_FAILURES:
+                self.remove_cookie(cookie)
+                return
+
+            cooldown = self.BASE_COOLDOWN * 2 ** (stats['consecutive_failures'] - 1)
+            stats['cooldown_until'] = time.time() + min(cooldown, self.MAX_COOLDOWN)
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """
+        获取每个 cookie 的健康统计
+
+        Returns:
+            {cookie: {'success', 'failure', 'consecutive_failures', 'latency', 'cooldown_until'}}
+        """
+        with self._lock:
+            return {cookie: dict(self._stats_of(cookie)) for cookie in self._cookies}
+
     def add_cookie(self, cookie: str):
         """
         添加一个新的 cookie
-        
+
         Args:
             cookie: cookie 字符串
         """
         if not cookie:
             return
-        
-        cookies = self._load_cookies()
-        if cookie not in cookies:
-            cookies.append(cookie)
-            self._save_cookies(cookies)
-    
+
+        with self._lock:
+            self._pending_remove.discard(cookie)
+            if cookie not in self._pending_add:
+                self._pending_add.append(cookie)
+            if cookie not in self._cookies:
+                self._cookies.append(cookie)
+            self._schedule_save()
+
     def remove_cookie(self, cookie: str):
         """
-        删除一个失效的 cookie
-        
+        删除一个失效的 cookie（立即落盘，让其他进程尽快停用）
+
         Args:
             cookie: 要删除的 cookie 字符串
         """
-        cookies = self._load_cookies()
-        if cookie in cookies:
-            cookies.remove(cookie)
-            self._save_cookies(cookies)
-    
+        with self._lock:
+            if cookie in self._pending_add:
+                self._pending_add.remove(cookie)
+            self._pending_remove.add(cookie)
+            if cookie in self._cookies:
+                self._cookies.remove(cookie)
+                self._stats.pop(cookie, None)
+                self._cursor = self._cursor % len(self._cookies) if self._cookies else 0
+            self.flush()
+
     def _load_cookies(self) -> List[str]:
         """
         从文件加载所有 cookies
-        
+
         Returns:
             cookie 列表
         """
@@ -77,26 +292,75 @@ class CookieManager:
             return json.loads(content)
         except (json.JSONDecodeError, FileNotFoundError):
             return []
-    
+
     def _save_cookies(self, cookies: List[str]):
         """
-        保存 cookies 到文件
-        
+        原子写入 cookies 到文件（先写临时文件再替换）
+
         Args:
             cookies: cookie 列表
         """
-        self.cookie_file.write_text(json.dumps(cookies, indent=2))
-    
+        directory = self.cookie_file.parent
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=self.cookie_file.name, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(json.dumps(cookies, indent=2))
+            os.replace(tmp_path, self.cookie_file)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _schedule_save(self):
+        """在防抖延迟后把本进程的操作写入文件"""
+        if self.save_delay <= 0:
+            self.flush()
+            return
+        if self._save_timer is None:
+            self._save_timer = threading.Timer(self.save_delay, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def flush(self):
+        """立即把本进程的增删操作合并写入文件"""
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            if not self._dirty:
+                return
+            try:
+                with _file_lock(self.lock_file):
+                    cookies = self._apply_pending(self._load_cookies())
+                    self._save_cookies(cookies)
+                    self._file_signature = self._signature()
+            except OSError as e:
+                print(f"保存 cookie 失败: {e}")
+                return
+
+            self._pending_add = []
+            self._pending_remove = set()
+            self._pending_clear = False
+            self._adopt(cookies)
+
     def get_all_cookies(self) -> List[str]:
         """
         获取所有存储的 cookies
-        
+
         Returns:
             cookie 列表
         """
-        return self._load_cookies()
-    
+        with self._lock:
+            self._refresh_if_changed()
+            return list(self._cookies)
+
     def clear_all_cookies(self):
         """清空所有 cookies"""
-        self._save_cookies([])
-
+        with self._lock:
+            self._pending_clear = True
+            self._pending_add = []
+            self._pending_remove = set()
+            self._cookies = []
+            self._stats.clear()
+            self._cursor = 0
+            self.flush()
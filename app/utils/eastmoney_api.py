@@ -2,9 +2,13 @@
 东方财富 API 封装
 提供股票列表和历史股价查询功能
 """
+import math
+import time
 import requests
-from typing import Optional, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List
 from .cookie_manager import CookieManager
+from .instrumentation import metrics
 
 
 class EastMoneyAPI:
@@ -19,6 +23,15 @@ class EastMoneyAPI:
     STOCK_LIST_URL = 'http://push2.eastmoney.com/api/qt/clist/get'
     STOCK_KLINE_URL = 'http://push2his.eastmoney.com/api/qt/stock/kline/get'
     
+    # 沪深京A股市场筛选条件
+    MARKET_FS = 'm:0 t:6,m:0 t:80,m:1 t:2,m:1 t:23,m:0 t:81 s:2048'
+    
+    # 全市场快照字段（f2 为最新价）
+    SNAPSHOT_FIELDS = 'f2,f3,f4,f5,f6,f7,f8,f12,f13,f14,f15,f16,f17,f18'
+    
+    # 全市场快照同时请求的页数
+    SNAPSHOT_WORKERS = 8
+    
     def __init__(self, cookie_file: str = "eastmoney_cookies.json"):
         """
         初始化东方财富 API
@@ -48,16 +61,26 @@ class EastMoneyAPI:
         if cookie:
             headers['Cookie'] = cookie
         
-        try:
-            resp = requests.get(url, params=params, headers=headers, timeout=10)
-            resp.raise_for_status()
-            return resp.json()
-        except (requests.RequestException, ValueError) as e:
-            # 如果请求失败且使用了 cookie，则删除该 cookie
-            if cookie and not custom_cookie:
-                self.cookie_manager.remove_cookie(cookie)
-            print(f"请求失败: {e}")
-            return None
+        started = time.perf_counter()
+        # 端点名取路径倒数第二段，如 .../qt/stock/kline/get -> kline
+        with metrics.span('eastmoney.request', endpoint=url.rstrip('/').split('/')[-2]) as span:
+            try:
+                resp = requests.get(url, params=params, headers=headers, timeout=10)
+                span.bytes = len(resp.content)
+                resp.raise_for_status()
+                data = resp.json()
+            except (requests.RequestException, ValueError) as e:
+                span.error = type(e).__name__
+                # 如果请求失败且使用了 cookie，则记录失败：401/403 视为 cookie 失效，其余进入冷却
+                if cookie and not custom_cookie:
+                    status = getattr(getattr(e, 'response', None), 'status_code', None)
+                    self.cookie_manager.report_failure(cookie, transient=status not in (401, 403))
+                print(f"请求失败: {e}")
+                return None
+        
+        if cookie and not custom_cookie:
+            self.cookie_manager.report_success(cookie, time.perf_counter() - started)
+        return data
     
     def get_stock_list(self, 
                        pn: int = 1, 
@@ -91,12 +114,74 @@ class EastMoneyAPI:
             'np': np,
             'fltt': 2,
             'invt': 2,
-            'fs': 'm:0 t:6,m:0 t:80,m:1 t:2,m:1 t:23,m:0 t:81 s:2048',
+            'fs': self.MARKET_FS,
             'fields': 'f12,f13,f14,f3,f4,f5,f6,f7,f8,f15,f16,f17,f18'
         }
         
         return self._make_request(self.STOCK_LIST_URL, params, cookie)
     
+    def get_market_snapshot(self,
+                            pz: int = 100,
+                            fields: str = SNAPSHOT_FIELDS,
+                            cookie: Optional[str] = None,
+                            workers: int = SNAPSHOT_WORKERS) -> Optional[List[Dict]]:
+        """
+        获取沪深京A股全市场行情快照（自动翻页）
+        
+        先请求第一页得到总数，其余页面并发请求；任何一页失败都返回 None，
+        不返回缺页的不完整快照。
+        
+        Args:
+            pz: 每页数量，默认为 100（接口单页最多返回 100 条）
+            fields: 返回字段，默认为 SNAPSHOT_FIELDS
+            cookie: 自定义 cookie，可选
+            workers: 并发请求的页数
+        
+        Returns:
+            全部股票的行情列表，每个元素为 {'f12': 代码, 'f14': 名称, ...}，
+            有页面请求失败返回 None
+            
+        Example:
+            >>> api = EastMoneyAPI()
+            >>> rows = api.get_market_snapshot()
+            >>> if rows:
+            >>>     print(len(rows))
+        """
+        def fetch_page(pn: int) -> Optional[Dict]:
+            params = {
+                'pn': pn,
+                'pz': pz,
+                'po': 1,
+                'np': 1,
+                'fltt': 2,
+                'invt': 2,
+                'fid': 'f12',
+                'fs': self.MARKET_FS,
+                'fields': fields
+            }
+            result = self._make_request(self.STOCK_LIST_URL, params, cookie)
+            return (result or {}).get('data') if result is not None else None
+        
+        first = fetch_page(1)
+        if first is None:
+            return None
+        rows = list(first.get('diff') or [])
+        total = first.get('total', 0)
+        if not rows or len(rows) >= total:
+            return rows
+        
+        # 每页实际条数以第一页为准（服务端可能把 pz 截断到 100）
+        pages = range(2, math.ceil(total / len(rows)) + 1)
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="snapshot") as executor:
+            for data in executor.map(fetch_page, pages):
+                diff = (data or {}).get('diff')
+                if not diff:
+                    print("行情快照翻页失败，放弃本次快照")
+                    return None
+                rows.extend(diff)
+        
+        return rows
+    
     def get_stock_history(self,
                          secid: str,
                          lmt: int = 210,
@@ -0,0 +1,226 @@
+"""
+横截面因子评分
+把技术面、资金面、基本面和消息面因子整理为整个股票池的数值矩阵，
+按横截面排名或标准化后加权，一步得到全部股票的评分和排名
+"""
+from typing import Any, Dict, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+from .wencai_metrics import build_metrics_frame
+
+
+# 评分维度及默认权重
+DEFAULT_WEIGHTS = {
+    'technical': 0.4,     # 技术面
+    'fund': 0.3,          # 资金面
+    'fundamental': 0.2,   # 基本面
+    'news': 0.1,          # 消息面
+}
+
+# 维度中文名称，与 _generate_rule_based_summary 的 score_details 一致
+DIMENSION_NAMES = {
+    'technical': '技术面',
+    'fund': '资金面',
+    'fundamental': '基本面',
+    'news': '消息面',
+}
+
+# 各维度包含的因子及方向（1 表示越大越好，-1 表示越小越好）
+FACTORS = {
+    'technical': {
+        'ma_trend': 1,            # 均线趋势：多头 1、纠缠 0、空头 -1
+        'macd_signal': 1,         # MACD：金叉 2、多头 1、震荡 0、空头 -1、死叉 -2
+        'kdj_signal': 1,          # KDJ：金叉 2、超卖 1、震荡 0、超买 -1、死叉 -2
+        'resistance_room': 1,     # 距压力位的空间（%）
+    },
+    'fund': {
+        'main_inflow_5d': 1,
+        'main_inflow_20d': 1,
+        'northbound_change': 1,
+    },
+    'fundamental': {
+        'roe': 1,
+        'revenue_growth': 1,
+        'earnings_yield': 1,      # 盈利收益率（1/市盈率，亏损为负）
+        'book_yield': 1,          # 1/市净率
+        'top10_holder_ratio': 1,
+    },
+    'news': {
+        'news_count': 1,          # 近期新闻条数（取对数）
+        'important_news': 1,      # 是否有重要新闻
+        'advisor_comment': 1,     # 是否有投顾点评
+    },
+}
+
+# 技术信号文字 -> 数值（信号文字形如 "金叉 - 买入信号"，取 " - " 之前的部分）
+MA_TREND_VALUES = {'强势上涨': 1.0, '震荡整理': 0.0, '弱势下跌': -1.0}
+MACD_SIGNAL_VALUES = {'金叉': 2.0, '多头': 1.0, '震荡': 0.0, '空头': -1.0, '死叉': -2.0}
+KDJ_SIGNAL_VALUES = {'金叉向上': 2.0, '超卖': 1.0, '震荡': 0.0, '超买': -1.0, '死叉向下': -2.0}
+
+# 标准化方法
+RANK = 'rank'
+ZSCORE = 'zscore'
+
+# z-score 截断范围，超过 ±3 个标准差的极端值按 ±3 计
+ZSCORE_CLIP = 3.0
+
+
+def _signal_values(signals: pd.Series, values: Dict[str, float]) -> np.ndarray:
+    """把信号文字映射为数值，未知信号为 NaN"""
+    return signals.str.split(' - ').str[0].map(values).to_numpy(dtype=float)
+
+
+def technical_factors(technicals: Mapping[str, Optional[Dict[str, Any]]]) -> pd.DataFrame:
+    """
+    把技术分析结果整理为技术面因子
+
+    Args:
+        technicals: {股票代码: StockAnalyzer.analyze 的结果}，失败的为 None 或含 error
+
+    Returns:
+        以股票代码为索引的因子表
+    """
+    n = len(technicals)
+    ma, macd, kdj = np.empty(n, dtype=object), np.empty(n, dtype=object), np.empty(n, dtype=object)
+    room = np.full(n, np.nan)
+    for i, technical in enumerate(technicals.values()):
+        if not technical or 'error' in technical:
+            continue
+        indicators = technical.get('technical_indicators', {})
+        ma[i] = indicators.get('ma', {}).get('trend')
+        macd[i] = indicators.get('macd', {}).get('signal')
+        kdj[i] = indicators.get('kdj', {}).get('signal')
+        distance = technical.get('support_resistance', {}).get('resistance_distance')
+        if distance is not None:
+            room[i] = distance
+
+    return pd.DataFrame({
+        'ma_trend': pd.Series(ma, dtype=object).map(MA_TREND_VALUES).to_numpy(dtype=float),
+        'macd_signal': _signal_values(pd.Series(macd, dtype=object), MACD_SIGNAL_VALUES),
+        'kdj_signal': _signal_values(pd.Series(kdj, dtype=object), KDJ_SIGNAL_VALUES),
+        'resistance_room': room,
+    }, index=pd.Index(list(technicals), name='code'))
+
+
+def news_factors(diagnoses: Mapping[str, Optional[Mapping[str, Any]]],
+                 news_counts: Optional[Mapping[str, int]] = None) -> pd.DataFrame:
+    """
+    整理消息面因子
+
+    Args:
+        diagnoses: {股票代码: 诊股数据}
+        news_counts: {股票代码: 近期新闻条数}，如 news_store.mention_counts()
+
+    Returns:
+        以股票代码为索引的因子表
+    """
+    codes = list(diagnoses)
+    counts = news_counts or {}
+    important = [1.0 if d and '重要新闻' in d else 0.0 for d in diagnoses.values()]
+    advisor = [1.0 if d and '投顾点评' in d else 0.0 for d in diagnoses.values()]
+    return pd.DataFrame({
+        'news_count': np.log1p(np.array([counts.get(code, 0) for code in codes], dtype=float)),
+        'important_news': important,
+        'advisor_comment': advisor,
+    }, index=pd.Index(codes, name='code'))
+
+
+def build_factor_frame(technicals: Mapping[str, Optional[Dict[str, Any]]],
+                       diagnoses: Mapping[str, Optional[Mapping[str, Any]]],
+                       news_counts: Optional[Mapping[str, int]] = None) -> pd.DataFrame:
+    """
+    汇总整个股票池的全部因子
+
+    Args:
+        technicals: {股票代码: 技术分析结果}
+        diagnoses: {股票代码: 诊股数据}
+        news_counts: {股票代码: 近期新闻条数}
+
+    Returns:
+        以股票代码为索引、FACTORS 中全部因子为列的 DataFrame（float64）
+    """
+    codes = list(dict.fromkeys([*technicals, *diagnoses]))
+    technicals = {code: technicals.get(code) for code in codes}
+    diagnoses = {code: diagnoses.get(code) for code in codes}
+
+    metrics = build_metrics_frame(diagnoses)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        metrics['earnings_yield'] = np.where(metrics['pe'] != 0, 1.0 / metrics['pe'], np.nan)
+        metrics['book_yield'] = np.where(metrics['pb'] > 0, 1.0 / metrics['pb'], np.nan)
+
+    frame = pd.concat([technical_factors(technicals), metrics, news_factors(diagnoses, news_counts)], axis=1)
+    columns = [factor for factors in FACTORS.values() for factor in factors]
+    return frame[columns]
+
+
+def normalize(frame: pd.DataFrame, method: str = RANK) -> pd.DataFrame:
+    """
+    横截面标准化，并按因子方向统一为越大越好
+
+    Args:
+        frame: 因子表
+        method: RANK 为排名线性映射到 0-1（并列取平均名次），ZSCORE 为截断后的 z-score 映射到 0-1
+
+    Returns:
+        同形状的 DataFrame，缺失值保持 NaN
+    """
+    directions = pd.Series({f: d for factors in FACTORS.values() for f, d in factors.items()})
+    values = frame * directions.reindex(frame.columns).fillna(1)
+
+    # 全部相同（或只有一个有效值）的因子没有区分度，记为中性 0.5
+    if method == RANK:
+        spread = (values.count() - 1).replace(0, np.nan)
+        return ((values.rank() - 1) / spread).fillna(0.5).where(values.notna())
+    if method == ZSCORE:
+        std = values.std(ddof=0).replace(0, np.nan)
+        z = ((values - values.mean()) / std).clip(-ZSCORE_CLIP, ZSCORE_CLIP)
+        return ((z + ZSCORE_CLIP) / (2 * ZSCORE_CLIP)).fillna(0.5).where(values.notna())
+    raise ValueError(f"未知的标准化方法: {method}")
+
+
+def score_universe(frame: pd.DataFrame, weights: Optional[Mapping[str, float]] = None,
+                   method: str = RANK) -> pd.DataFrame:
+    """
+    对整个股票池评分并排名
+
+    每个维度取其因子标准化值的平均（缺失因子不参与，整个维度缺失记为中性 50 分），
+    再按权重加权得到综合评分。
+
+    Args:
+        frame: build_factor_frame 返回的因子表
+        weights: 各维度权重，默认为 DEFAULT_WEIGHTS（会归一化）
+        method: 标准化方法，RANK 或 ZSCORE
+
+    Returns:
+        以股票代码为索引，包含 technical_score、fund_score、fundamental_score、
+        news_score、overall_score（0-100 分）和 rank（1 为最高）的 DataFrame，按排名排序
+
+    Example:
+        >>> frame = build_factor_frame(technicals, diagnoses, news_store.mention_counts())
+        >>> score_universe(frame, {'technical': 0.5, 'fund': 0.5}).head(10)
+    """
+    weights = dict(DEFAULT_WEIGHTS if weights is None else weights)
+    dimensions = [d for d in FACTORS if weights.get(d, 0) > 0]
+    if not dimensions:
+        raise ValueError("至少需要一个权重大于 0 的维度")
+
+    normalized = normalize(frame, method).to_numpy()
+    column_index = {c: i for i, c in enumerate(frame.columns)}
+    scores = np.empty((len(frame), len(dimensions)))
+    for j, dimension in enumerate(dimensions):
+        columns = [column_index[f] for f in FACTORS[dimension] if f in column_index]
+        block = normalized[:, columns]
+        present = ~np.isnan(block)
+        count = present.sum(axis=1)
+        total = np.where(present, block, 0.0).sum(axis=1)
+        scores[:, j] = np.where(count > 0, total / np.maximum(count, 1), 0.5) * 100
+
+    w = np.array([weights[d] for d in dimensions], dtype=float)
+    overall = scores @ (w / w.sum())
+
+    result = pd.DataFrame(scores.round(1), index=frame.index, columns=[f'{d}_score' for d in dimensions])
+    result['overall_score'] = overall.round(1)
+    result['rank'] = result['overall_score'].rank(ascending=False, method='min').astype(int)
+    return result.sort_values('rank', kind='stable')
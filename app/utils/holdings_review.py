@@ -0,0 +1,357 @@
+"""
+持仓纪律检查
+每个交易日收盘前（默认 14:40 开始、14:50 截止）按风险从高到低并发分析持仓股，
+给出止损 / 加仓 / 不动的决定；时间不够时跳过大模型、只读缓存的诊股数据，
+再不够就只按价格规则决定，保证截止前每只持仓都有结论
+"""
+import json
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timedelta
+from datetime import time as dtime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .quote_snapshot import quote_service
+from .stock_comprehensive_analyzer import StockComprehensiveAnalyzer
+from .trading_calendar import is_trading_day
+
+
+# 默认开始时间和截止时间（收盘前10分钟）
+DEFAULT_RUN_AT = dtime(14, 40)
+DEFAULT_DEADLINE = dtime(14, 50)
+
+# 手动运行且已过截止时间时给的时间预算（秒）
+DEFAULT_BUDGET = 600.0
+
+# 截止前预留的安全时间（秒），用于汇总和发送结果
+SAFETY_MARGIN = 20.0
+
+# 止损线（亏损百分比）
+STOP_LOSS_PCT = 8.0
+
+# 综合评分达到该值且没有亏损时加仓
+ADD_SCORE = 75.0
+
+# 综合评分低于该值视为走坏，没到止损线也止损
+EXIT_SCORE = 45.0
+
+# 决定
+STOP_LOSS = '止损'
+ADD = '加仓'
+HOLD = '不动'
+
+# 分析模式
+FULL = 'full'    # 完整分析（按分析器设置使用大模型）
+FAST = 'fast'    # 跳过大模型，诊股只读本地缓存
+RULE = 'rule'    # 不分析，只按价格规则决定
+
+# 各模式单只股票耗时的初始估计（秒），运行中按实际耗时更新
+ESTIMATED_SECONDS = {FULL: 40.0, FAST: 5.0}
+
+
+def load_holdings(path: str = "holdings.json") -> List[Dict]:
+    """
+    读取持仓文件
+
+    文件内容为列表，每项形如 {"code": "002115", "name": "三维通信", "cost": 8.5,
+    "shares": 1000, "stop_loss": 6.0}，name、shares、stop_loss 可省略。
+
+    Args:
+        path: 持仓文件路径
+
+    Returns:
+        持仓列表，文件不存在时返回空列表
+    """
+    try:
+        return json.loads(Path(path).read_text(encoding='utf-8'))
+    except FileNotFoundError:
+        return []
+
+
+def loss_pct(cost: Optional[float], price: Optional[float]) -> Optional[float]:
+    """计算亏损百分比（盈利为负），缺少价格时返回 None"""
+    if not cost or price is None or math.isnan(price):
+        return None
+    return (cost - price) / cost * 100
+
+
+def decide(holding: Dict, price: Optional[float], result: Optional[Dict],
+           stop_loss_pct: float = STOP_LOSS_PCT) -> Dict:
+    """
+    根据价格和分析结果给出持仓决定
+
+    - 亏损达到止损线：止损
+    - 综合评分低于 EXIT_SCORE 或建议规避：止损
+    - 综合评分达到 ADD_SCORE 且没有亏损：加仓（不摊低成本）
+    - 其他：不动
+
+    Args:
+        holding: 持仓
+        price: 最新价
+        result: analyze_stock 的结果，没有分析时为 None
+        stop_loss_pct: 默认止损线，持仓中的 stop_loss 优先
+
+    Returns:
+        {'code', 'name', 'decision', 'reason', 'price', 'loss_pct', 'score'}
+    """
+    stop_loss = holding.get('stop_loss') or stop_loss_pct
+    loss = loss_pct(holding.get('cost'), price)
+    summary = result.get('summary') if result and result.get('success') else None
+    score = summary.get('overall_score') if summary else None
+
+    if loss is not None and loss >= stop_loss:
+        decision, reason = STOP_LOSS, f"亏损 {loss:.2f}%，达到止损线 {stop_loss}%"
+    elif summary and (score < EXIT_SCORE or summary.get('recommendation') == '规避'):
+        decision, reason = STOP_LOSS, f"综合评分 {score:.1f}，建议{summary.get('recommendation')}"
+    elif summary and score >= ADD_SCORE and (loss is None or loss <= 0):
+        decision, reason = ADD, f"综合评分 {score:.1f}，趋势向好且没有亏损"
+    elif summary:
+        decision, reason = HOLD, f"综合评分 {score:.1f}，建议{summary.get('recommendation')}"
+    else:
+        decision, reason = HOLD, "没有分析结果，未触发止损线"
+
+    return {
+        'code': holding['code'],
+        'name': holding.get('name') or (result or {}).get('stock_name') or holding['code'],
+        'decision': decision,
+        'reason': reason,
+        'price': price,
+        'loss_pct': None if loss is None else round(loss, 2),
+        'score': score,
+    }
+
+
+def next_run(run_at: dtime, now: Optional[datetime] = None) -> datetime:
+    """获取下一次运行时间（当天已过或非交易日时顺延到下一个交易日）"""
+    now = now or datetime.now()
+    day = now.date()
+    if now.time() >= run_at or not is_trading_day(day):
+        day += timedelta(days=1)
+        while not is_trading_day(day):
+            day += timedelta(days=1)
+    return datetime.combine(day, run_at)
+
+
+class HoldingsReviewJob:
+    """
+    收盘前持仓纪律检查任务
+
+    Example:
+        >>> job = HoldingsReviewJob()
+        >>> for d in job.run(load_holdings()):
+        ...     print(d['name'], d['decision'], d['reason'])
+    """
+
+    def __init__(self, analyzer: Optional[StockComprehensiveAnalyzer] = None,
+                 deadline: dtime = DEFAULT_DEADLINE, concurrency: int = 4,
+                 stop_loss_pct: float = STOP_LOSS_PCT, kline_days: int = 60,
+                 price_source: Optional[Callable[[str], Optional[float]]] = None):
+        """
+        初始化任务
+
+        Args:
+            analyzer: StockComprehensiveAnalyzer，默认首次运行时创建
+            deadline: 每天的截止时间
+            concurrency: 同时分析的股票数
+            stop_loss_pct: 默认止损线（亏损百分比）
+            kline_days: K线数据天数
+            price_source: 获取最新价的函数，默认使用实时行情快照（行情轮询未启动时，
+                每次运行开始前拉取一次全市场快照）
+        """
+        self._analyzer = analyzer
+        self.deadline = deadline
+        self.concurrency = max(1, concurrency)
+        self.stop_loss_pct = stop_loss_pct
+        self.kline_days = kline_days
+        self.price_source = price_source or quote_service.get_latest_price
+        self._refresh_quotes = price_source is None
+        self.estimates = dict(ESTIMATED_SECONDS)
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def analyzer(self) -> StockComprehensiveAnalyzer:
+        if self._analyzer is None:
+            self._analyzer = StockComprehensiveAnalyzer()
+        return self._analyzer
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _deadline_for(self, now: datetime) -> datetime:
+        """当天截止时间；已经过了（手动运行）时给 DEFAULT_BUDGET 的时间"""
+        deadline = datetime.combine(now.date(), self.deadline)
+        if deadline <= now:
+            deadline = now + timedelta(seconds=DEFAULT_BUDGET)
+        return deadline
+
+    def _price(self, code: str) -> Optional[float]:
+        try:
+            return self.price_source(code)
+        except Exception:
+            return None
+
+    def _prepare_prices(self):
+        """使用默认行情快照但后台轮询没有运行时（如独立脚本），先同步拉取一次快照"""
+        if not self._refresh_quotes or quote_service.running:
+            return
+        try:
+            if not quote_service.poll_once():
+                print("拉取行情快照失败，没有最新价的持仓按已到止损线排序")
+        except Exception as e:
+            print(f"拉取行情快照失败: {e}")
+
+    def _risk(self, holding: Dict) -> float:
+        """风险程度：亏损占止损线的比例，越大越先分析；没有价格时按已到止损线处理"""
+        stop_loss = holding.get('stop_loss') or self.stop_loss_pct
+        loss = loss_pct(holding.get('cost'), self._price(holding['code']))
+        return 1.0 if loss is None else loss / stop_loss
+
+    def _choose_mode(self, remaining: float, waiting: int) -> str:
+        """
+        根据剩余时间选择分析模式
+
+        在当前这只按某种模式分析、其余全部按 FAST 分析的前提下，
+        估计能否在截止前完成，选能完成的最好模式。
+        """
+        rest = math.ceil((waiting - 1) / self.concurrency) * self.estimates[FAST]
+        if remaining >= self.estimates[FULL] + rest:
+            return FULL
+        if remaining >= self.estimates[FAST] + rest:
+            return FAST
+        return RULE
+
+    def _analyze(self, holding: Dict, mode: str) -> Optional[Dict]:
+        try:
+            return self.analyzer.analyze_stock(
+                holding['code'], holding.get('name'), kline_days=self.kline_days, verbose=False,
+                use_ai=None if mode == FULL else False, cache_only=mode == FAST,
+            )
+        except Exception as e:
+            print(f"分析持仓失败 {holding['code']}: {e}")
+            return None
+
+    def _decide(self, holding: Dict, result: Optional[Dict], mode: str) -> Dict:
+        price = self._price(holding['code'])
+        if price is None and result and result.get('technical_analysis'):
+            price = result['technical_analysis'].get('basic_info', {}).get('close')
+        decision = decide(holding, price, result, self.stop_loss_pct)
+        decision['mode'] = mode
+        return decision
+
+    def run(self, holdings: Iterable[Dict], deadline: Optional[datetime] = None) -> List[Dict]:
+        """
+        分析全部持仓并给出决定
+
+        按风险从高到低提交分析，每次提交前根据剩余时间和实测耗时选择模式；
+        到截止时间（提前 SAFETY_MARGIN 秒）仍未完成的分析不再等待，按价格规则决定。
+
+        Args:
+            holdings: 持仓列表
+            deadline: 截止时间，默认为当天的截止时间
+
+        Returns:
+            决定列表（按风险从高到低），每项包含 mode 字段表示实际使用的分析模式
+        """
+        deadline = deadline or self._deadline_for(datetime.now())
+        self._prepare_prices()
+        holdings = sorted(holdings, key=self._risk, reverse=True)
+        cutoff = deadline.timestamp() - SAFETY_MARGIN
+        order = {h['code']: i for i, h in enumerate(holdings)}
+
+        decisions: Dict[str, Dict] = {}
+        queue = deque(holdings)
+        pending = {}
+        executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="holdings")
+        try:
+            while queue or pending:
+                while queue and len(pending) < self.concurrency:
+                    mode = self._choose_mode(cutoff - time.time(), len(queue))
+                    holding = queue.popleft()
+                    if mode == RULE:
+                        decisions[holding['code']] = self._decide(holding, None, RULE)
+                    else:
+                        future = executor.submit(self._analyze, holding, mode)
+                        pending[future] = (holding, mode, time.monotonic())
+
+                if not pending:
+                    continue
+                remaining = cutoff - time.time()
+                if remaining <= 0:
+                    break
+                done, _ = wait(pending, timeout=min(remaining, 1.0), return_when=FIRST_COMPLETED)
+                for future in done:
+                    holding, mode, started = pending.pop(future)
+                    elapsed = time.monotonic() - started
+                    self.estimates[mode] = 0.5 * self.estimates[mode] + 0.5 * elapsed
+                    decisions[holding['code']] = self._decide(holding, future.result(), mode)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        # 截止时仍在分析或尚未开始的持仓按价格规则决定
+        for holding, _, _ in pending.values():
+            decisions[holding['code']] = self._decide(holding, None, RULE)
+            decisions[holding['code']]['reason'] += "（分析未在截止前完成）"
+        for holding in queue:
+            decisions[holding['code']] = self._decide(holding, None, RULE)
+
+        return sorted(decisions.values(), key=lambda d: order[d['code']])
+
+    @staticmethod
+    def format_decisions(decisions: List[Dict]) -> str:
+        """把决定列表格式化为文本"""
+        lines = [f"持仓纪律检查 {datetime.now():%Y-%m-%d %H:%M}", "=" * 60]
+        for decision in (STOP_LOSS, ADD, HOLD):
+            items = [d for d in decisions if d['decision'] == decision]
+            if not items:
+                continue
+            lines.append(f"\n【{decision}】")
+            for d in items:
+                loss = '' if d['loss_pct'] is None else f"  盈亏 {-d['loss_pct']:+.2f}%"
+                degraded = '' if d['mode'] == FULL else f"  [{d['mode']}]"
+                lines.append(f"  {d['name']}({d['code']}){loss}  {d['reason']}{degraded}")
+        return "\n".join(lines)
+
+    def _loop(self, load: Callable[[], List[Dict]], run_at: dtime,
+              notify: Optional[Callable[[str], None]]):
+        """后台定时循环"""
+        while not self._stop_event.is_set():
+            when = next_run(run_at)
+            if self._stop_event.wait(max(0.0, (when - datetime.now()).total_seconds())):
+                break
+            try:
+                text = self.format_decisions(self.run(load()))
+                print(text)
+                if notify:
+                    notify(text)
+            except Exception as e:
+                print(f"持仓纪律检查失败: {e}")
+
+    def start(self, load: Callable[[], List[Dict]] = load_holdings, run_at: dtime = DEFAULT_RUN_AT,
+              notify: Optional[Callable[[str], None]] = None):
+        """
+        启动后台定时任务，每个交易日 run_at 开始检查
+
+        Args:
+            load: 每次运行时读取持仓的函数
+            run_at: 每天的开始时间
+            notify: 结果文本的通知函数（如发送邮件）
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, args=(load, run_at, notify),
+                                        name="holdings-review", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """停止后台定时任务"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
@@ -0,0 +1,392 @@
+"""
+进程内埋点
+记录分析流程各阶段和各上游调用的耗时、字节数、缓存命中、重试次数和排队等待，
+汇总为直方图和计数器，可导出为 Prometheus 文本格式或 JSON
+"""
+import bisect
+import contextvars
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+# 耗时直方图的桶上界（秒），覆盖本地计算到大模型调用
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# 导出时的指标名前缀
+METRIC_PREFIX = 'stock_assistant'
+
+# 保留最近多少个 span 的明细
+MAX_RECENT_SPANS = 500
+
+# 缓存结果
+CACHE_HIT = 'hit'
+CACHE_MISS = 'miss'
+CACHE_STALE = 'stale'
+
+# 指标说明（Prometheus 的 HELP 行）
+METRIC_HELP = {
+    'span_duration_seconds': '各阶段及上游调用耗时',
+    'span_queue_wait_seconds': '排队和限速等待时间',
+    'span_bytes_total': '上游响应字节数',
+    'span_cache_total': '缓存命中情况',
+    'span_retries_total': '重试次数',
+    'span_errors_total': '出错次数',
+}
+
+_current_span: contextvars.ContextVar[Optional['Span']] = contextvars.ContextVar('current_span', default=None)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def current_span() -> Optional['Span']:
+    """获取当前线程（协程）中正在进行的 span，没有返回 None"""
+    return _current_span.get()
+
+
+def record_cache(result: str):
+    """在当前 span 上记录缓存命中情况（CACHE_HIT / CACHE_MISS / CACHE_STALE）"""
+    span = current_span()
+    if span is not None:
+        span.cache = result
+
+
+def record_queue_wait(seconds: float):
+    """把排队或限速等待时间累加到当前 span"""
+    span = current_span()
+    if span is not None and seconds > 0:
+        span.queue_wait += seconds
+
+
+def submit_in_context(executor, fn: Callable, *args, **kwargs) -> Future:
+    """
+    在当前上下文的副本中向线程池提交任务，线程中创建的 span 以提交时的 span 为父 span
+
+    Args:
+        executor: concurrent.futures 线程池
+        fn: 要执行的函数
+        *args, **kwargs: 传给 fn 的参数
+
+    Returns:
+        Future
+    """
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+class Histogram:
+    """固定桶直方图（非线程安全，由 Metrics 加锁）"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)   # 最后一个为 +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        按桶内线性插值估算分位数（与 Prometheus histogram_quantile 相同）
+
+        Args:
+            q: 分位，如 0.95
+
+        Returns:
+            估算值，没有样本返回 None；落在 +Inf 桶时返回最大的桶上界
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            if cumulative + count >= rank and count:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+
+class Span:
+    """
+    一次计时区间，作为上下文管理器使用
+
+    区间内可以设置 bytes、cache、retries、queue_wait 等属性，结束时统一记入指标。
+    """
+
+    def __init__(self, metrics: 'Metrics', name: str, labels: Dict[str, str]):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+        self.parent: Optional[str] = None
+        self.started = 0.0
+        self.duration: Optional[float] = None
+        self.bytes = 0
+        self.cache: Optional[str] = None
+        self.retries = 0
+        self.queue_wait = 0.0
+        self.error: Optional[str] = None
+        self._token = None
+
+    @property
+    def elapsed(self) -> float:
+        """已用时间（秒），结束后等于 duration"""
+        if self.duration is not None:
+            return self.duration
+        return time.perf_counter() - self.started if self.started else 0.0
+
+    def __enter__(self) -> 'Span':
+        parent = _current_span.get()
+        self.parent = parent.name if parent else None
+        self._token = _current_span.set(self)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.duration = time.perf_counter() - self.started
+        if exc_type is not None and self.error is None:
+            self.error = exc_type.__name__
+        _current_span.reset(self._token)
+        self.metrics.record(self)
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'labels': self.labels,
+            'parent': self.parent,
+            'duration': self.duration,
+            'bytes': self.bytes,
+            'cache': self.cache,
+            'retries': self.retries,
+            'queue_wait': self.queue_wait,
+            'error': self.error,
+        }
+
+
+class Metrics:
+    """
+    进程内指标注册表（线程安全）
+
+    Example:
+        >>> with metrics.span('eastmoney.request', endpoint='kline') as span:
+        ...     resp = requests.get(url)
+        ...     span.bytes = len(resp.content)
+        >>> print(metrics.to_prometheus())
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, max_spans: int = MAX_RECENT_SPANS):
+        """
+        初始化注册表
+
+        Args:
+            buckets: 耗时直方图的桶上界（秒）
+            max_spans: 保留最近多少个 span 的明细
+        """
+        self.buckets = buckets
+        self.enabled = True
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._recent = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+
+    def span(self, name: str, **labels: str) -> Span:
+        """
+        创建一个计时区间
+
+        Args:
+            name: 区间名称，如 "analyze.kline"、"wencai.fetch"
+            **labels: 附加标签（取值种类应有限，不要放股票代码）
+
+        Returns:
+            Span，用 with 语句包住要计时的代码
+        """
+        return Span(self, name, {k: str(v) for k, v in labels.items()})
+
+    @staticmethod
+    def _key(labels: Dict[str, str]) -> LabelKey:
+        return tuple(sorted(labels.items()))
+
+    def observe(self, name: str, value: float, **labels: str):
+        """
+        向直方图记录一个样本
+
+        Args:
+            name: 指标名，如 "span_duration_seconds"
+            value: 样本值
+            **labels: 标签
+        """
+        if not self.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def inc(self, name: str, amount: float = 1, **labels: str):
+        """
+        累加计数器
+
+        Args:
+            name: 指标名，如 "span_retries_total"
+            amount: 增量
+            **labels: 标签
+        """
+        if not self.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def record(self, span: Span):
+        """把结束的 span 记入各项指标"""
+        if not self.enabled:
+            return
+        labels = {'span': span.name, **span.labels}
+        self.observe('span_duration_seconds', span.duration, **labels)
+        if span.queue_wait:
+            self.observe('span_queue_wait_seconds', span.queue_wait, **labels)
+        if span.bytes:
+            self.inc('span_bytes_total', span.bytes, **labels)
+        if span.cache:
+            self.inc('span_cache_total', 1, result=span.cache, **labels)
+        if span.retries:
+            self.inc('span_retries_total', span.retries, **labels)
+        if span.error:
+            self.inc('span_errors_total', 1, error=span.error, **labels)
+        with self._lock:
+            self._recent.append(span.to_dict())
+
+    def reset(self):
+        """清空全部指标"""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._recent.clear()
+
+    def snapshot(self, recent: int = 50) -> Dict[str, Any]:
+        """
+        导出为可 JSON 序列化的字典
+
+        Args:
+            recent: 附带最近多少个 span 的明细
+
+        Returns:
+            {'histograms': [...], 'counters': [...], 'spans': [...]}，
+            直方图包含 count、sum、mean、p50、p95、p99 和各桶计数
+        """
+        with self._lock:
+            histograms = [
+                {
+                    'name': name,
+                    'labels': dict(key),
+                    'count': h.count,
+                    'sum': h.sum,
+                    'mean': h.sum / h.count if h.count else None,
+                    'p50': h.quantile(0.5),
+                    'p95': h.quantile(0.95),
+                    'p99': h.quantile(0.99),
+                    'buckets': dict(zip([*map(str, h.buckets), '+Inf'], h.counts)),
+                }
+                for name, series in sorted(self._histograms.items())
+                for key, h in sorted(series.items())
+            ]
+            counters = [
+                {'name': name, 'labels': dict(key), 'value': value}
+                for name, series in sorted(self._counters.items())
+                for key, value in sorted(series.items())
+            ]
+            spans = list(self._recent)[-recent:] if recent else []
+        return {'histograms': histograms, 'counters': counters, 'spans': spans}
+
+    def to_prometheus(self, prefix: str = METRIC_PREFIX) -> str:
+        """
+        导出为 Prometheus 文本格式（text/plain; version=0.0.4）
+
+        Args:
+            prefix: 指标名前缀
+
+        Returns:
+            文本格式的全部指标
+        """
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._histograms.items()):
+                metric = f"{prefix}_{name}"
+                lines.append(f"# HELP {metric} {METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {metric} histogram")
+                for key, h in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip([*h.buckets, math.inf], h.counts):
+                        cumulative += count
+                        le = '+Inf' if bound == math.inf else repr(float(bound))
+                        lines.append(f"{metric}_bucket{_format_labels(key + (('le', le),))} {cumulative}")
+                    lines.append(f"{metric}_sum{_format_labels(key)} {h.sum!r}")
+                    lines.append(f"{metric}_count{_format_labels(key)} {h.count}")
+            for name, series in sorted(self._counters.items()):
+                metric = f"{prefix}_{name}"
+                lines.append(f"# HELP {metric} {METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {metric} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{metric}{_format_labels(key)} {value!r}")
+        return "\n".join(lines) + "\n"
+
+    def format_report(self) -> str:
+        """
+        按 span 汇总耗时，生成便于终端阅读的表格
+
+        Returns:
+            每行一个 span：次数、平均、P50、P95、最大桶、排队等待、字节数、缓存命中率
+        """
+        snapshot = self.snapshot(recent=0)
+        waits = {h['labels'].get('span'): h for h in snapshot['histograms']
+                 if h['name'] == 'span_queue_wait_seconds'}
+        totals: Dict[Tuple[str, str], float] = {}
+        for counter in snapshot['counters']:
+            span = counter['labels'].get('span')
+            kind = counter['name'] if counter['name'] != 'span_cache_total' else counter['labels']['result']
+            totals[span, kind] = totals.get((span, kind), 0) + counter['value']
+
+        lines = [f"{'阶段':<24} {'次数':>6} {'平均':>8} {'P50':>8} {'P95':>8} {'排队':>8} {'字节':>10} {'命中率':>6}"]
+        for h in snapshot['histograms']:
+            if h['name'] != 'span_duration_seconds':
+                continue
+            name = h['labels']['span'] + ''.join(f" {k}={v}" for k, v in h['labels'].items() if k != 'span')
+            span = h['labels']['span']
+            wait = waits.get(span)
+            hits = totals.get((span, CACHE_HIT), 0)
+            looked = hits + totals.get((span, CACHE_MISS), 0) + totals.get((span, CACHE_STALE), 0)
+            lines.append(
+                f"{name:<24} {h['count']:>6} {h['mean']:>7.3f}s {h['p50']:>7.3f}s {h['p95']:>7.3f}s "
+                f"{(wait['sum'] / h['count'] if wait else 0):>7.3f}s "
+                f"{int(totals.get((span, 'span_bytes_total'), 0)):>10} "
+                f"{(f'{hits / looked:.0%}' if looked else '-'):>6}"
+            )
+        return "\n".join(lines)
+
+
+def _format_labels(key: LabelKey) -> str:
+    """格式化 Prometheus 标签，如 {span="wencai.fetch",le="0.5"}"""
+    if not key:
+        return ''
+    escaped = (f'{k}="{_escape(v)}"' for k, v in key)
+    return '{' + ','.join(escaped) + '}'
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# 创建全局实例
+metrics = Metrics()
@@ -0,0 +1,174 @@
+"""
+涨停雷达新闻正文抓取
+异步并发下载新闻正文，共享同花顺限速，提取纯文本后按 data_seq 保存
+"""
+import asyncio
+import codecs
+import re
+from typing import Dict, Iterable, List, Optional
+
+import httpx
+from lxml import etree
+
+from .news_store import NewsStore, news_store
+from .rate_limiter import RateLimiter, get_rate_limiter
+from .ths_crawler import THSCrawler
+
+
+# 正文所在元素的候选 XPath，按优先级排列
+BODY_XPATHS = [
+    etree.XPath('//div[contains(@class, "main-text")]'),
+    etree.XPath('//div[@id="contentApp"]'),
+    etree.XPath('//div[contains(@class, "article-content")]'),
+    etree.XPath('//article'),
+]
+
+# 请求头与爬虫一致（压缩格式交给 httpx 协商）
+REQUEST_HEADERS = {k: v for k, v in THSCrawler.DEFAULT_HEADERS.items() if k != 'Accept-Encoding'}
+
+# 提取正文前删除的元素
+_NOISE = etree.XPath('//script | //style | //noscript | //iframe')
+_PARAGRAPHS = etree.XPath('.//p')
+_SPACES = re.compile(r'[ \t　\xa0]+')
+_META_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.I)
+
+
+def detect_encoding(content: bytes, declared: Optional[str] = None) -> str:
+    """按响应头、页面 meta 的顺序确定编码，默认 utf-8（GBK 系列统一按 gb18030 解码）"""
+    encoding = declared
+    if not encoding:
+        match = _META_CHARSET.search(content[:4096])
+        encoding = match.group(1).decode('ascii') if match else 'utf-8'
+    if encoding.lower() in ('gbk', 'gb2312', 'gb18030'):
+        return 'gb18030'
+    try:
+        return codecs.lookup(encoding).name
+    except LookupError:
+        return 'utf-8'
+
+
+def extract_text(content: bytes, encoding: Optional[str] = None) -> str:
+    """
+    从文章页面中提取正文纯文本
+
+    优先使用已知的正文容器，找不到时取段落最多的元素；按段落分行。
+
+    Args:
+        content: 页面原始字节
+        encoding: 响应头声明的编码，未声明时从页面 meta 识别
+
+    Returns:
+        正文文本，提取失败返回空字符串
+    """
+    if not content:
+        return ""
+    parser = etree.HTMLParser(encoding=detect_encoding(content, encoding))
+    html = etree.HTML(content, parser=parser)
+    if html is None:
+        return ""
+
+    for element in _NOISE(html):
+        element.getparent().remove(element)
+
+    container = None
+    for xpath in BODY_XPATHS:
+        found = xpath(html)
+        if found:
+            container = found[0]
+            break
+    if container is None:
+        parents = [p.getparent() for p in _PARAGRAPHS(html)]
+        if not parents:
+            return ""
+        container = max(set(parents), key=parents.count)
+
+    paragraphs = _PARAGRAPHS(container) or [container]
+    lines = (_SPACES.sub(' ', ''.join(p.itertext())).strip() for p in paragraphs)
+    return "\n".join(line for line in lines if line)
+
+
+class ArticleFetcher:
+    """
+    涨停雷达新闻正文异步抓取器
+
+    Example:
+        >>> crawler = THSCrawler()
+        >>> articles = ArticleFetcher().fetch(crawler.get_new_limit_up_news(with_content=True))
+    """
+
+    def __init__(self, store: NewsStore = news_store, limiter: Optional[RateLimiter] = None,
+                 concurrency: int = 5, timeout: float = 10.0,
+                 client: Optional[httpx.AsyncClient] = None):
+        """
+        初始化抓取器
+
+        Args:
+            store: 正文存储
+            limiter: 限速器，默认与 THSCrawler 共享 "10jqka" 限速
+            concurrency: 最大并发下载数
+            timeout: 单篇下载超时（秒）
+            client: 自定义 httpx.AsyncClient，默认每次抓取时新建
+        """
+        self.store = store
+        self.limiter = limiter or get_rate_limiter('10jqka')
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.client = client
+
+    async def _fetch_one(self, client: httpx.AsyncClient, semaphore: asyncio.Semaphore,
+                         news: Dict[str, str]) -> Optional[Dict]:
+        """下载并保存单篇文章，失败返回 None"""
+        async with semaphore:
+            await self.limiter.acquire_async()
+            try:
+                resp = await client.get(news['url'], timeout=self.timeout)
+                resp.raise_for_status()
+            except httpx.HTTPError as e:
+                print(f"下载文章失败 {news['data_seq']}: {e}")
+                return None
+
+        body = extract_text(resp.content, resp.charset_encoding)
+        if not body:
+            print(f"文章正文为空 {news['data_seq']}: {news['url']}")
+            return None
+        self.store.save(news, body)
+        return {**news, 'body': body}
+
+    async def fetch_async(self, news_list: Iterable[Dict[str, str]]) -> List[Dict]:
+        """
+        并发下载尚未保存的文章正文
+
+        Args:
+            news_list: 涨停雷达新闻条目（需包含 data_seq 和 url）
+
+        Returns:
+            本次新保存的文章列表（包含 body 字段）
+        """
+        pending = {n['data_seq']: n for n in news_list if n.get('data_seq') and n.get('url')}
+        missing = self.store.missing(pending, with_body=True)
+        if not missing:
+            return []
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        client = self.client or httpx.AsyncClient(headers=REQUEST_HEADERS, follow_redirects=True)
+        try:
+            results = await asyncio.gather(*(
+                self._fetch_one(client, semaphore, news)
+                for seq, news in pending.items() if seq in missing
+            ))
+        finally:
+            if self.client is None:
+                await client.aclose()
+        return [article for article in results if article]
+
+    def fetch(self, news_list: Iterable[Dict[str, str]]) -> List[Dict]:
+        """
+        同步入口，在当前线程中运行 fetch_async
+
+        Args:
+            news_list: 涨停雷达新闻条目
+
+        Returns:
+            本次新保存的文章列表
+        """
+        return asyncio.run(self.fetch_async(list(news_list)))
@@ -0,0 +1,447 @@
+"""
+新闻存储与全文索引
+按 data_seq 保存涨停雷达新闻正文和问财重要新闻，建立 FTS5 全文索引和新闻-股票映射，
+分析器和对话可以直接在本地检索，不再请求上游
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from .symbol_master import SymbolMaster, symbol_master
+
+
+# 默认数据库放在项目根目录
+DEFAULT_DB_PATH = os.getenv(
+    "NEWS_STORE_DB",
+    str(Path(__file__).resolve().parents[2] / "news_store.db")
+)
+
+# 文章字段
+ARTICLE_FIELDS = ('data_seq', 'source', 'time', 'title', 'url', 'summary', 'body',
+                  'published_at', 'fetched_at')
+
+# 问财新闻时间的解析格式
+TIME_FORMATS = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d', '%Y%m%d', '%Y/%m/%d %H:%M')
+
+# trigram 分词至少需要 3 个字符，更短的查询退回 LIKE
+FTS_MIN_QUERY = 3
+
+DAY = 24 * 3600
+
+_CODE_RE = re.compile(r'(?<!\d)(\d{6})(?!\d)')
+
+
+class StockMatcher:
+    """从新闻文本中识别股票（按名称和6位代码），名单随代码主表更新"""
+
+    def __init__(self, master: SymbolMaster = symbol_master):
+        """
+        Args:
+            master: 股票代码主表
+        """
+        self.master = master
+        self._pattern: Optional[re.Pattern] = None
+        self._by_name: Dict[str, str] = {}
+        self._codes: Set[str] = set()
+        self._version: Optional[str] = None
+
+    def _build(self):
+        symbols = self.master.symbols()
+        self._by_name = {s['name']: s['code'] for s in symbols if s.get('name')}
+        self._codes = {s['code'] for s in symbols}
+        # 长名称优先，避免 "中国平安" 被 "平安" 截断
+        names = sorted(self._by_name, key=len, reverse=True)
+        self._pattern = re.compile('|'.join(map(re.escape, names))) if names else None
+        self._version = self.master.updated
+
+    def match(self, text: str) -> Set[str]:
+        """
+        找出文本中提到的股票代码
+
+        Args:
+            text: 新闻文本
+
+        Returns:
+            股票代码集合
+        """
+        if self._pattern is None or self._version != self.master.updated:
+            self._build()
+        if not text:
+            return set()
+        codes = {self._by_name[m] for m in self._pattern.findall(text)} if self._pattern else set()
+        codes.update(code for code in _CODE_RE.findall(text) if code in self._codes)
+        return codes
+
+
+def _parse_time(value: Any) -> Optional[float]:
+    """把新闻时间解析为时间戳，无法解析返回 None"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip()
+    for fmt in TIME_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).timestamp()
+        except ValueError:
+            continue
+    return None
+
+
+def _pick(record: Dict, *keywords: str) -> Optional[Any]:
+    """取出列名包含任一关键字的第一个值"""
+    for key, value in record.items():
+        if any(k in str(key).lower() for k in keywords):
+            return value
+    return None
+
+
+class NewsStore:
+    """基于 SQLite 的新闻存储（FTS5 trigram 全文索引 + 新闻-股票映射）"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, matcher: Optional[StockMatcher] = None):
+        """
+        初始化存储
+
+        Args:
+            db_path: SQLite 文件路径
+            matcher: 股票识别器，默认使用全局代码主表
+        """
+        self.db_path = db_path
+        self._matcher = matcher
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._fts_enabled = False
+
+    @property
+    def matcher(self) -> StockMatcher:
+        if self._matcher is None:
+            self._matcher = StockMatcher()
+        return self._matcher
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """首次使用时打开数据库连接并建表"""
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS articles (
+                    data_seq TEXT PRIMARY KEY,
+                    source TEXT NOT NULL DEFAULT 'ths',
+                    time TEXT,
+                    title TEXT,
+                    url TEXT,
+                    summary TEXT,
+                    body TEXT NOT NULL,
+                    published_at REAL,
+                    fetched_at REAL NOT NULL
+                )
+            """)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(articles)")}
+            if 'source' not in columns:
+                conn.execute("ALTER TABLE articles ADD COLUMN source TEXT NOT NULL DEFAULT 'ths'")
+            if 'published_at' not in columns:
+                conn.execute("ALTER TABLE articles ADD COLUMN published_at REAL")
+                conn.execute("UPDATE articles SET published_at = fetched_at")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_published ON articles (published_at)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS news_stocks (
+                    code TEXT NOT NULL,
+                    data_seq TEXT NOT NULL,
+                    PRIMARY KEY (code, data_seq)
+                ) WITHOUT ROWID
+            """)
+            self._fts_enabled = self._create_fts(conn)
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @property
+    def fts_enabled(self) -> bool:
+        """是否可以使用 FTS5 全文索引"""
+        return self.conn is not None and self._fts_enabled
+
+    @staticmethod
+    def _create_fts(conn: sqlite3.Connection) -> bool:
+        """创建全文索引表和同步触发器，SQLite 不支持 FTS5 trigram 时返回 False"""
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'articles_fts'"
+        ).fetchone()
+        try:
+            conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+                    title, summary, body, content='articles', tokenize='trigram'
+                )
+            """)
+        except sqlite3.OperationalError as e:
+            print(f"FTS5 全文索引不可用，检索退回 LIKE: {e}")
+            return False
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS articles_fts_insert AFTER INSERT ON articles BEGIN
+                INSERT INTO articles_fts (rowid, title, summary, body)
+                VALUES (new.rowid, new.title, new.summary, new.body);
+            END
+        """)
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS articles_fts_delete AFTER DELETE ON articles BEGIN
+                INSERT INTO articles_fts (articles_fts, rowid, title, summary, body)
+                VALUES ('delete', old.rowid, old.title, old.summary, old.body);
+            END
+        """)
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS articles_fts_update AFTER UPDATE ON articles BEGIN
+                INSERT INTO articles_fts (articles_fts, rowid, title, summary, body)
+                VALUES ('delete', old.rowid, old.title, old.summary, old.body);
+                INSERT INTO articles_fts (rowid, title, summary, body)
+                VALUES (new.rowid, new.title, new.summary, new.body);
+            END
+        """)
+        if not exists:
+            conn.execute("INSERT INTO articles_fts (articles_fts) VALUES ('rebuild')")
+        return True
+
+    def missing(self, data_seqs: Iterable[str], with_body: bool = False) -> Set[str]:
+        """
+        找出尚未保存的 data_seq
+
+        Args:
+            data_seqs: 待检查的 data_seq
+            with_body: 为 True 时，已保存但还没有正文的也算未保存
+
+        Returns:
+            未保存的 data_seq 集合
+        """
+        seqs = set(data_seqs)
+        if not seqs:
+            return set()
+        placeholders = ",".join("?" * len(seqs))
+        condition = " AND body != ''" if with_body else ""
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT data_seq FROM articles WHERE data_seq IN ({placeholders}){condition}", tuple(seqs)
+            ).fetchall()
+        return seqs - {row[0] for row in rows}
+
+    def has(self, data_seq: str) -> bool:
+        """判断文章是否已保存"""
+        return not self.missing([data_seq])
+
+    def save(self, news: Dict[str, Any], body: str, source: str = 'ths',
+             codes: Optional[Iterable[str]] = None) -> bool:
+        """
+        保存文章并建立索引（已有正文时不覆盖）
+
+        Args:
+            news: 新闻条目，包含 data_seq、time、title、url，可选 content（摘要）和
+                published_at（发布时间戳，默认为当前时间）
+            body: 正文纯文本，可以为空（之后抓到正文时再补上）
+            source: 来源，"ths"（涨停雷达）或 "wencai"（问财重要新闻）
+            codes: 关联的股票代码，会与从文本中识别出的股票合并
+
+        Returns:
+            是否新写入（或补上了正文）
+        """
+        return self.save_many([{**news, 'body': body}], source=source, codes=codes) > 0
+
+    def save_many(self, articles: Iterable[Dict[str, Any]], source: str = 'ths',
+                  codes: Optional[Iterable[str]] = None) -> int:
+        """
+        在一个事务中批量保存文章
+
+        已存在的文章不覆盖，只有原来没有正文、这次带了正文时才补上正文。
+
+        Args:
+            articles: 新闻条目列表，字段同 save 的 news，正文放在 body 字段
+            source: 来源
+            codes: 所有文章都关联的股票代码
+
+        Returns:
+            新写入（或补上正文）的条数
+        """
+        now = time.time()
+        extra_codes = set(codes or ())
+        rows = []
+        for article in articles:
+            summary = article.get('content')
+            body = article.get('body') or ''
+            related = extra_codes | self.matcher.match(
+                "\n".join(filter(None, [article.get('title'), summary, body]))
+            )
+            rows.append(((article['data_seq'], source, article.get('time'), article.get('title'),
+                          article.get('url'), summary, body, article.get('published_at') or now, now),
+                         related))
+
+        saved = 0
+        with self._lock:
+            for values, related in rows:
+                cursor = self.conn.execute(
+                    "INSERT INTO articles "
+                    "(data_seq, source, time, title, url, summary, body, published_at, fetched_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (data_seq) DO UPDATE SET body = excluded.body, fetched_at = excluded.fetched_at "
+                    "WHERE articles.body = '' AND excluded.body != ''",
+                    values
+                )
+                if cursor.rowcount > 0:
+                    saved += 1
+                    self.conn.executemany(
+                        "INSERT OR IGNORE INTO news_stocks (code, data_seq) VALUES (?, ?)",
+                        [(code, values[0]) for code in related]
+                    )
+            self.conn.commit()
+        return saved
+
+    def save_wencai_news(self, stock: str, items: Any) -> int:
+        """
+        保存问财诊股中的 "重要新闻"
+
+        Args:
+            stock: 股票代码或名称
+            items: 重要新闻（records 列表，或包含 records 列表的字典）
+
+        Returns:
+            新写入的条数
+        """
+        if isinstance(items, dict):
+            items = next((v for v in items.values() if isinstance(v, list)), [])
+        if not isinstance(items, list):
+            return 0
+
+        symbol = self.matcher.master.resolve(stock)
+        codes = [symbol['code']] if symbol else []
+        saved = 0
+        for record in items:
+            if not isinstance(record, dict):
+                continue
+            title = _pick(record, '标题', 'title')
+            if not title:
+                continue
+            news_time = _pick(record, '时间', '日期', 'time', 'date')
+            content = _pick(record, '内容', '摘要', 'content', 'summary')
+            digest = hashlib.md5(f"{title}|{news_time}".encode('utf-8')).hexdigest()[:16]
+            news = {
+                'data_seq': f"wc-{digest}",
+                'time': str(news_time) if news_time is not None else None,
+                'title': str(title),
+                'url': _pick(record, '链接', 'url'),
+                'content': str(content) if content is not None else None,
+                'published_at': _parse_time(news_time),
+            }
+            saved += self.save(news, news['content'] or '', source='wencai', codes=codes)
+        return saved
+
+    def get(self, data_seq: str) -> Optional[Dict]:
+        """
+        读取文章
+
+        Returns:
+            文章字典，不存在返回 None
+        """
+        with self._lock:
+            row = self.conn.execute(
+                f"SELECT {', '.join(ARTICLE_FIELDS)} FROM articles WHERE data_seq = ?", (data_seq,)
+            ).fetchone()
+        return dict(zip(ARTICLE_FIELDS, row)) if row else None
+
+    def recent(self, limit: int = 50) -> List[Dict]:
+        """
+        读取最近发布的文章
+
+        Args:
+            limit: 最多返回的条数
+
+        Returns:
+            文章列表（按发布时间从新到旧）
+        """
+        return self._query([], [], limit)
+
+    def _query(self, where: List[str], params: List[Any], limit: int, join: str = "") -> List[Dict]:
+        columns = ', '.join(f"a.{field}" for field in ARTICLE_FIELDS)
+        sql = f"SELECT {columns} FROM articles a {join}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY a.published_at DESC LIMIT ?"
+        with self._lock:
+            rows = self.conn.execute(sql, (*params, limit)).fetchall()
+        return [dict(zip(ARTICLE_FIELDS, row)) for row in rows]
+
+    def search(self, query: str, code: Optional[str] = None, days: Optional[float] = None,
+               limit: int = 50) -> List[Dict]:
+        """
+        全文检索标题、摘要和正文
+
+        Args:
+            query: 检索词，如 "三维通信"、"算力"
+            code: 只返回关联该股票代码的新闻
+            days: 只返回最近若干天的新闻
+            limit: 最多返回的条数
+
+        Returns:
+            文章列表（按发布时间从新到旧）
+        """
+        where, params, join = [], [], ""
+        query = query.strip()
+        if query:
+            if self.fts_enabled and len(query) >= FTS_MIN_QUERY:
+                join = "JOIN articles_fts f ON f.rowid = a.rowid"
+                where.append("articles_fts MATCH ?")
+                params.append('"' + query.replace('"', '""') + '"')
+            else:
+                pattern = '%' + query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+                where.append("(a.title LIKE ? ESCAPE '\\' OR a.summary LIKE ? ESCAPE '\\' "
+                             "OR a.body LIKE ? ESCAPE '\\')")
+                params.extend([pattern] * 3)
+        if code:
+            where.append("a.data_seq IN (SELECT data_seq FROM news_stocks WHERE code = ?)")
+            params.append(code)
+        if days is not None:
+            where.append("a.published_at >= ?")
+            params.append(time.time() - days * DAY)
+        return self._query(where, params, limit, join)
+
+    def news_for_stock(self, stock: str, days: Optional[float] = 5, limit: int = 50) -> List[Dict]:
+        """
+        读取提到某只股票的新闻
+
+        Args:
+            stock: 股票代码、名称或拼音缩写
+            days: 最近若干天，None 表示不限
+            limit: 最多返回的条数
+
+        Returns:
+            文章列表（按发布时间从新到旧），股票无法识别时返回空列表
+        """
+        symbol = self.matcher.master.resolve(stock)
+        if not symbol:
+            return []
+        return self.search("", code=symbol['code'], days=days, limit=limit)
+
+    def mention_counts(self, days: Optional[float] = 5) -> Dict[str, int]:
+        """
+        统计每只股票被新闻提到的次数（一次查询覆盖全部股票）
+
+        Args:
+            days: 最近若干天，None 表示不限
+
+        Returns:
+            {股票代码: 新闻条数}
+        """
+        sql = "SELECT s.code, COUNT(*) FROM news_stocks s"
+        params = []
+        if days is not None:
+            sql += " JOIN articles a ON a.data_seq = s.data_seq WHERE a.published_at >= ?"
+            params.append(time.time() - days * DAY)
+        sql += " GROUP BY s.code"
+        with self._lock:
+            return dict(self.conn.execute(sql, params).fetchall())
+
+
+# 创建全局实例
+news_store = NewsStore()
@@ -0,0 +1,285 @@
+"""
+全市场实时行情快照服务
+在交易时段定时拉取东方财富全市场快照，写入预分配的内存环形缓冲区
+"""
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .eastmoney_api import EastMoneyAPI
+from .trading_calendar import is_trading_time
+
+
+# 快照字段名 -> 东方财富字段
+QUOTE_FIELDS = (
+    ('price', 'f2'),
+    ('change_pct', 'f3'),
+    ('change_amount', 'f4'),
+    ('volume', 'f5'),
+    ('amount', 'f6'),
+    ('amplitude', 'f7'),
+    ('turnover_rate', 'f8'),
+    ('high', 'f15'),
+    ('low', 'f16'),
+    ('open', 'f17'),
+    ('prev_close', 'f18'),
+)
+
+
+def _to_float(value) -> float:
+    """将东方财富字段值转换为浮点数，停牌等情况下的 '-' 转为 NaN"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class QuoteRingBuffer:
+    """
+    行情环形缓冲区
+
+    预分配 (快照数 × 股票数 × 字段数) 的数组，股票代码通过字典映射到固定列，
+    最新行情和逐笔变化量均为 O(1) 查询。
+    """
+
+    def __init__(self, max_symbols: int = 6000, capacity: int = 60):
+        """
+        初始化环形缓冲区
+
+        Args:
+            max_symbols: 最多容纳的股票数量
+            capacity: 保留的快照数量
+        """
+        self.max_symbols = max_symbols
+        self.capacity = capacity
+        self.field_names = [name for name, _ in QUOTE_FIELDS]
+        self._field_index = {name: i for i, name in enumerate(self.field_names)}
+
+        n_fields = len(self.field_names)
+        self._data = np.full((capacity, max_symbols, n_fields), np.nan)
+        self._deltas = np.full((max_symbols, n_fields), np.nan)
+        self._timestamps = np.zeros(capacity)
+
+        self._index: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._markets: List[int] = []
+
+        self._head = -1
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, stock_code: str) -> bool:
+        return stock_code in self._index
+
+    def _slot_of(self, stock_code: str) -> int:
+        """获取股票所在列，新股票分配新列"""
+        slot = self._index.get(stock_code)
+        if slot is None:
+            slot = len(self._names)
+            if slot >= self.max_symbols:
+                return -1
+            self._index[stock_code] = slot
+            self._names.append('')
+            self._markets.append(-1)
+        return slot
+
+    def append(self, rows: List[Dict], timestamp: Optional[float] = None):
+        """
+        写入一次全市场快照并计算相对上一快照的变化量
+
+        Args:
+            rows: get_market_snapshot 返回的行情列表
+            timestamp: 快照时间戳，默认为当前时间
+        """
+        timestamp = timestamp or time.time()
+        n_fields = len(QUOTE_FIELDS)
+
+        with self._lock:
+            slots = np.empty(len(rows), dtype=np.intp)
+            values = np.empty((len(rows), n_fields))
+            for i, row in enumerate(rows):
+                slot = self._slot_of(str(row.get('f12', '')))
+                slots[i] = slot
+                if slot >= 0:
+                    self._names[slot] = row.get('f14', '')
+                    self._markets[slot] = int(row.get('f13', -1))
+                values[i] = [_to_float(row.get(key)) for _, key in QUOTE_FIELDS]
+
+            valid = slots >= 0
+            slots, values = slots[valid], values[valid]
+
+            head = (self._head + 1) % self.capacity
+            frame = self._data[head]
+            frame.fill(np.nan)
+            frame[slots] = values
+
+            if self._count:
+                np.subtract(frame, self._data[self._head], out=self._deltas)
+            else:
+                self._deltas.fill(np.nan)
+
+            self._timestamps[head] = timestamp
+            self._head = head
+            self._count = min(self._count + 1, self.capacity)
+
+    def latest(self, stock_code: str) -> Optional[Dict]:
+        """
+        获取股票最新行情
+
+        Args:
+            stock_code: 股票代码，如 "002115"
+
+        Returns:
+            最新行情字典（含 delta 变化量），没有数据时返回 None
+        """
+        slot = self._index.get(stock_code)
+        if slot is None or not self._count:
+            return None
+
+        with self._lock:
+            values = self._data[self._head, slot]
+            deltas = self._deltas[slot]
+            if np.isnan(values[0]):
+                return None
+
+            quote = {
+                'stock_code': stock_code,
+                'stock_name': self._names[slot],
+                'market': self._markets[slot],
+                'timestamp': datetime.fromtimestamp(self._timestamps[self._head]),
+            }
+            for i, name in enumerate(self.field_names):
+                quote[name] = None if np.isnan(values[i]) else float(values[i])
+            quote['delta'] = {
+                name: None if np.isnan(deltas[i]) else float(deltas[i])
+                for i, name in enumerate(self.field_names)
+            }
+        return quote
+
+    def latest_price(self, stock_code: str) -> Optional[float]:
+        """
+        获取股票最新价
+
+        Args:
+            stock_code: 股票代码
+
+        Returns:
+            最新价，没有数据时返回 None
+        """
+        slot = self._index.get(stock_code)
+        if slot is None or not self._count:
+            return None
+        price = self._data[self._head, slot, 0]
+        return None if np.isnan(price) else float(price)
+
+    def history(self, stock_code: str, field: str = 'price') -> np.ndarray:
+        """
+        获取股票某字段在缓冲区内的历史序列（从旧到新）
+
+        Args:
+            stock_code: 股票代码
+            field: 字段名，默认为 'price'
+
+        Returns:
+            历史数值数组
+        """
+        slot = self._index.get(stock_code)
+        if slot is None or not self._count:
+            return np.array([])
+
+        with self._lock:
+            order = (np.arange(self._count) + self._head - self._count + 1) % self.capacity
+            return self._data[order, slot, self._field_index[field]].copy()
+
+
+class QuoteSnapshotService:
+    """全市场行情快照轮询服务"""
+
+    def __init__(self,
+                 interval: float = 5.0,
+                 buffer: Optional[QuoteRingBuffer] = None,
+                 api: Optional[EastMoneyAPI] = None,
+                 trading_hours_only: bool = True):
+        """
+        初始化行情快照服务
+
+        Args:
+            interval: 轮询间隔（秒）
+            buffer: 环形缓冲区，默认新建
+            api: 东方财富 API 实例，默认在首次轮询时创建
+            trading_hours_only: 是否只在交易时段轮询
+        """
+        self.interval = interval
+        self.buffer = buffer or QuoteRingBuffer()
+        self.trading_hours_only = trading_hours_only
+        self._api = api
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    @property
+    def api(self) -> EastMoneyAPI:
+        if self._api is None:
+            self._api = EastMoneyAPI()
+        return self._api
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def poll_once(self) -> bool:
+        """
+        拉取一次全市场快照
+
+        Returns:
+            是否成功写入缓冲区
+        """
+        rows = self.api.get_market_snapshot()
+        if not rows:
+            return False
+        self.buffer.append(rows)
+        return True
+
+    def _run(self):
+        """后台轮询循环"""
+        while not self._stop_event.is_set():
+            started = time.monotonic()
+            if not self.trading_hours_only or is_trading_time():
+                try:
+                    self.poll_once()
+                except Exception as e:
+                    print(f"行情快照拉取失败: {e}")
+            elapsed = time.monotonic() - started
+            self._stop_event.wait(max(0.0, self.interval - elapsed))
+
+    def start(self):
+        """启动后台轮询线程"""
+        if self.running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="quote-snapshot", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """停止后台轮询线程"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def get_quote(self, stock_code: str) -> Optional[Dict]:
+        """获取股票最新行情"""
+        return self.buffer.latest(stock_code)
+
+    def get_latest_price(self, stock_code: str) -> Optional[float]:
+        """获取股票最新价"""
+        return self.buffer.latest_price(stock_code)
+
+
+# 创建全局实例
+quote_service = QuoteSnapshotService()
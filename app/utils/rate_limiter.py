@@ -0,0 +1,87 @@
+"""
+请求限速工具
+令牌桶限速器，按数据源共享，线程和协程都可以使用
+"""
+import asyncio
+import threading
+import time
+from typing import Dict
+
+from .instrumentation import record_queue_wait
+
+
+# 各数据源的默认限速（每秒请求数, 突发数）
+DEFAULT_RATES = {
+    '10jqka': (2.0, 4),
+    'eastmoney': (5.0, 10),
+}
+
+# 未配置数据源的默认限速
+DEFAULT_RATE = (2.0, 2)
+
+
+class RateLimiter:
+    """令牌桶限速器（线程安全）"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        初始化限速器
+
+        Args:
+            rate: 每秒补充的令牌数（即平均每秒请求数）
+            burst: 桶容量，允许的突发请求数
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """
+        预订一个令牌
+
+        Returns:
+            需要等待的秒数（令牌不足时透支，等待到令牌补足为止）
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self):
+        """同步获取一个令牌，必要时阻塞等待"""
+        wait = self._reserve()
+        if wait > 0:
+            record_queue_wait(wait)
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """异步获取一个令牌，必要时挂起等待"""
+        wait = self._reserve()
+        if wait > 0:
+            record_queue_wait(wait)
+            await asyncio.sleep(wait)
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(name: str) -> RateLimiter:
+    """
+    获取某个数据源共享的限速器（同一进程内同名共享）
+
+    Args:
+        name: 数据源名称，如 "10jqka"、"eastmoney"
+
+    Returns:
+        限速器
+    """
+    with _limiters_lock:
+        if name not in _limiters:
+            rate, burst = DEFAULT_RATES.get(name, DEFAULT_RATE)
+            _limiters[name] = RateLimiter(rate, burst)
+        return _limiters[name]
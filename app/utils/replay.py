@@ -0,0 +1,392 @@
+"""
+离线录制/回放工具
+把东方财富、同花顺、问财和大模型接口的真实响应录制为本地 fixture 文件，
+并在离线环境下按可配置的延迟和错误率回放，用于确定性的性能测试
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import pickle
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import httpx
+import pywencai
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+# 参与匹配时忽略的 URL 参数（时间戳等易变参数）
+DEFAULT_IGNORE_PARAMS = ('_', 'cb')
+
+# 回放时可注入的错误类型
+ERROR_KINDS = ('timeout', 'connection', 'http_500')
+
+
+class FixtureStore:
+    """fixture 文件存储，按请求内容的哈希值组织"""
+
+    def __init__(self, directory: str = "fixtures/replay",
+                 ignore_params: Iterable[str] = DEFAULT_IGNORE_PARAMS):
+        """
+        初始化 fixture 存储
+
+        Args:
+            directory: fixture 根目录
+            ignore_params: 计算请求键时忽略的 URL 参数
+        """
+        self.directory = Path(directory)
+        self.ignore_params = set(ignore_params)
+
+    def request_key(self, method: str, url: str, body: Optional[bytes] = None) -> str:
+        """
+        计算 HTTP 请求的匹配键
+
+        Args:
+            method: 请求方法
+            url: 完整 URL（含查询参数）
+            body: 请求体
+
+        Returns:
+            形如 "host/sha1" 的键
+        """
+        parts = urlsplit(url)
+        query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                       if k not in self.ignore_params)
+        canonical_url = urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ''))
+
+        digest = hashlib.sha1()
+        digest.update(method.upper().encode())
+        digest.update(canonical_url.encode())
+        digest.update(body or b'')
+        return f"{parts.netloc}/{digest.hexdigest()}"
+
+    def call_key(self, name: str, kwargs: Dict[str, Any]) -> str:
+        """
+        计算函数调用（如 pywencai.get）的匹配键
+
+        Args:
+            name: 函数名
+            kwargs: 调用参数
+
+        Returns:
+            形如 "name/sha1" 的键
+        """
+        payload = json.dumps(kwargs, sort_keys=True, ensure_ascii=False, default=str)
+        return f"{name}/{hashlib.sha1(payload.encode()).hexdigest()}"
+
+    def save_response(self, key: str, entry: Dict):
+        """保存一条 HTTP 响应"""
+        path = self.directory / f"{key}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(entry, ensure_ascii=False, indent=2))
+
+    def load_response(self, key: str) -> Optional[Dict]:
+        """读取一条 HTTP 响应，不存在时返回 None"""
+        path = self.directory / f"{key}.json"
+        if not path.exists():
+            return None
+        return json.loads(path.read_text())
+
+    def save_call(self, key: str, result: Any):
+        """保存一次函数调用的返回值"""
+        path = self.directory / f"{key}.pkl"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(pickle.dumps(result))
+
+    def load_call(self, key: str) -> Tuple[bool, Any]:
+        """读取一次函数调用的返回值，返回 (是否存在, 返回值)"""
+        path = self.directory / f"{key}.pkl"
+        if not path.exists():
+            return False, None
+        return True, pickle.loads(path.read_bytes())
+
+
+def _encode_entry(method: str, url: str, status: int, headers: Dict[str, str],
+                  content: bytes, encoding: Optional[str]) -> Dict:
+    """把响应编码为可写入 JSON 的字典"""
+    return {
+        'request': {'method': method, 'url': url},
+        'response': {
+            'status': status,
+            'headers': dict(headers),
+            'encoding': encoding,
+            'body': base64.b64encode(content).decode('ascii'),
+        }
+    }
+
+
+class _Patcher:
+    """在进入/退出上下文时替换和还原 requests、httpx 和 pywencai 的发送入口"""
+
+    def __init__(self, store: FixtureStore):
+        self.store = store
+        self._originals = {}
+
+    def _install(self):
+        self._originals = {
+            'requests': requests.Session.send,
+            'httpx': httpx.Client.send,
+            'httpx_async': httpx.AsyncClient.send,
+            'pywencai': pywencai.get,
+        }
+        requests.Session.send = self._wrap_requests(self._originals['requests'])
+        httpx.Client.send = self._wrap_httpx(self._originals['httpx'])
+        httpx.AsyncClient.send = self._wrap_httpx_async(self._originals['httpx_async'])
+        pywencai.get = self._wrap_pywencai(self._originals['pywencai'])
+
+    def _uninstall(self):
+        requests.Session.send = self._originals['requests']
+        httpx.Client.send = self._originals['httpx']
+        httpx.AsyncClient.send = self._originals['httpx_async']
+        pywencai.get = self._originals['pywencai']
+
+    def __enter__(self):
+        self._install()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._uninstall()
+        return False
+
+    @staticmethod
+    def _requests_body(request: requests.PreparedRequest) -> bytes:
+        body = request.body or b''
+        return body.encode('utf-8') if isinstance(body, str) else body
+
+
+class Recorder(_Patcher):
+    """
+    录制器，在上下文中透传真实请求并把响应写入 fixture
+
+    Example:
+        >>> store = FixtureStore("fixtures/replay")
+        >>> with Recorder(store):
+        >>>     StockComprehensiveAnalyzer().analyze_stock("002115", "三维通信")
+    """
+
+    def __init__(self, store: FixtureStore):
+        super().__init__(store)
+        self.recorded = 0
+
+    def _wrap_requests(self, original):
+        recorder = self
+
+        def send(session, request, **kwargs):
+            resp = original(session, request, **kwargs)
+            key = recorder.store.request_key(request.method, request.url,
+                                             recorder._requests_body(request))
+            recorder.store.save_response(key, _encode_entry(
+                request.method, request.url, resp.status_code, resp.headers,
+                resp.content, resp.encoding))
+            recorder.recorded += 1
+            return resp
+        return send
+
+    def _wrap_httpx(self, original):
+        recorder = self
+
+        def send(client, request, **kwargs):
+            resp = original(client, request, **kwargs)
+            resp.read()
+            recorder._save_httpx(request, resp)
+            return resp
+        return send
+
+    def _wrap_httpx_async(self, original):
+        recorder = self
+
+        async def send(client, request, **kwargs):
+            resp = await original(client, request, **kwargs)
+            await resp.aread()
+            recorder._save_httpx(request, resp)
+            return resp
+        return send
+
+    def _save_httpx(self, request: httpx.Request, resp: httpx.Response):
+        key = self.store.request_key(request.method, str(request.url), request.content)
+        self.store.save_response(key, _encode_entry(
+            request.method, str(request.url), resp.status_code, resp.headers,
+            resp.content, resp.encoding))
+        self.recorded += 1
+
+    def _wrap_pywencai(self, original):
+        recorder = self
+
+        def get(**kwargs):
+            result = original(**kwargs)
+            if result is not None:
+                recorder.store.save_call(recorder.store.call_key('pywencai', kwargs), result)
+                recorder.recorded += 1
+            return result
+        return get
+
+
+class Replayer(_Patcher):
+    """
+    回放器，在上下文中用 fixture 代替真实网络请求
+
+    Example:
+        >>> store = FixtureStore("fixtures/replay")
+        >>> with Replayer(store, latency=0.2, error_rate=0.05) as replayer:
+        >>>     StockComprehensiveAnalyzer(use_ai=False).analyze_stock("002115", "三维通信")
+        >>> print(replayer.stats)
+    """
+
+    def __init__(self, store: FixtureStore,
+                 latency: float = 0.0,
+                 jitter: float = 0.0,
+                 error_rate: float = 0.0,
+                 error_kind: str = 'timeout',
+                 strict: bool = True,
+                 seed: Optional[int] = None):
+        """
+        初始化回放器
+
+        Args:
+            store: fixture 存储
+            latency: 每次请求的固定延迟（秒）
+            jitter: 在固定延迟上叠加的随机延迟上限（秒）
+            error_rate: 注入错误的概率，0-1
+            error_kind: 注入的错误类型，timeout / connection / http_500
+            strict: 找不到 fixture 时是否报错，False 则透传到真实网络
+            seed: 随机数种子，用于复现延迟和错误序列
+        """
+        super().__init__(store)
+        if error_kind not in ERROR_KINDS:
+            raise ValueError(f"不支持的错误类型: {error_kind}")
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_kind = error_kind
+        self.strict = strict
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'errors': 0}
+
+    def _roll(self) -> Tuple[float, bool]:
+        """计算本次请求的延迟以及是否注入错误"""
+        with self._lock:
+            delay = self.latency + self._random.uniform(0, self.jitter) if self.jitter else self.latency
+            fail = self.error_rate > 0 and self._random.random() < self.error_rate
+            if fail:
+                self.stats['errors'] += 1
+        return delay, fail
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _wrap_requests(self, original):
+        replayer = self
+
+        def send(session, request, **kwargs):
+            key = replayer.store.request_key(request.method, request.url,
+                                             replayer._requests_body(request))
+            entry = replayer.store.load_response(key)
+            if entry is None:
+                replayer._count('misses')
+                if not replayer.strict:
+                    return original(session, request, **kwargs)
+                raise requests.ConnectionError(f"回放 fixture 不存在: {request.method} {request.url}")
+
+            delay, fail = replayer._roll()
+            time.sleep(delay)
+            if fail and replayer.error_kind == 'timeout':
+                raise requests.Timeout(f"注入超时: {request.url}")
+            if fail and replayer.error_kind == 'connection':
+                raise requests.ConnectionError(f"注入连接错误: {request.url}")
+
+            replayer._count('hits')
+            data = entry['response']
+            resp = requests.Response()
+            resp.status_code = 500 if fail else data['status']
+            resp.headers = CaseInsensitiveDict(data['headers'])
+            resp.headers.pop('Content-Encoding', None)
+            resp._content = base64.b64decode(data['body'])
+            resp.encoding = data.get('encoding')
+            resp.url = request.url
+            resp.request = request
+            return resp
+        return send
+
+    def _build_httpx(self, request: httpx.Request, entry: Dict, fail: bool) -> httpx.Response:
+        data = entry['response']
+        headers = {k: v for k, v in data['headers'].items()
+                   if k.lower() not in ('content-encoding', 'content-length', 'transfer-encoding')}
+        resp = httpx.Response(500 if fail else data['status'], headers=headers,
+                              content=base64.b64decode(data['body']), request=request)
+        if data.get('encoding'):
+            resp.encoding = data['encoding']
+        return resp
+
+    def _lookup_httpx(self, request: httpx.Request) -> Optional[Dict]:
+        entry = self.store.load_response(
+            self.store.request_key(request.method, str(request.url), request.content))
+        if entry is None:
+            self._count('misses')
+            if self.strict:
+                raise httpx.ConnectError(f"回放 fixture 不存在: {request.method} {request.url}",
+                                         request=request)
+        return entry
+
+    def _raise_httpx(self, request: httpx.Request):
+        if self.error_kind == 'timeout':
+            raise httpx.ReadTimeout(f"注入超时: {request.url}", request=request)
+        if self.error_kind == 'connection':
+            raise httpx.ConnectError(f"注入连接错误: {request.url}", request=request)
+
+    def _wrap_httpx(self, original):
+        replayer = self
+
+        def send(client, request, **kwargs):
+            entry = replayer._lookup_httpx(request)
+            if entry is None:
+                return original(client, request, **kwargs)
+            delay, fail = replayer._roll()
+            time.sleep(delay)
+            if fail:
+                replayer._raise_httpx(request)
+            replayer._count('hits')
+            return replayer._build_httpx(request, entry, fail)
+        return send
+
+    def _wrap_httpx_async(self, original):
+        replayer = self
+
+        async def send(client, request, **kwargs):
+            entry = replayer._lookup_httpx(request)
+            if entry is None:
+                return await original(client, request, **kwargs)
+            delay, fail = replayer._roll()
+            await asyncio.sleep(delay)
+            if fail:
+                replayer._raise_httpx(request)
+            replayer._count('hits')
+            return replayer._build_httpx(request, entry, fail)
+        return send
+
+    def _wrap_pywencai(self, original):
+        replayer = self
+
+        def get(**kwargs):
+            found, result = replayer.store.load_call(replayer.store.call_key('pywencai', kwargs))
+            if not found:
+                replayer._count('misses')
+                if not replayer.strict:
+                    return original(**kwargs)
+                raise ConnectionError(f"回放 fixture 不存在: pywencai {kwargs.get('query')}")
+
+            delay, fail = replayer._roll()
+            time.sleep(delay)
+            if fail:
+                # pywencai 重试耗尽后返回 None，这里保持一致
+                return None
+            replayer._count('hits')
+            return result
+        return get
@@ -0,0 +1,370 @@
+"""
+分析结果流式导出
+每完成一只股票就把扁平化的结果追加到按日期分区的 JSONL 文件或 Parquet 数据集，
+批量分析中途崩溃也只会丢失尚未写出的少量结果
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+import pandas as pd
+
+from .factor_scoring import DIMENSION_NAMES
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    _ARROW_TYPES = {'str': pa.string, 'float': pa.float64, 'int': pa.int64, 'bool': pa.bool_}
+except ImportError:  # 未安装 pyarrow 时只能导出 JSONL
+    pa = None
+
+
+# 扁平化后的字段及类型，JSONL 和 Parquet 共用同一结构
+EXPORT_FIELDS = (
+    ('analyzed_at', 'str'),         # 写出时间（ISO 格式）
+    ('stock_code', 'str'),
+    ('stock_name', 'str'),
+    ('success', 'bool'),
+    ('error', 'str'),
+    ('overall_score', 'float'),
+    ('technical_score', 'float'),
+    ('fund_score', 'float'),
+    ('fundamental_score', 'float'),
+    ('news_score', 'float'),
+    ('recommendation', 'str'),
+    ('risk_level', 'str'),
+    ('generated_by', 'str'),
+    ('trade_date', 'str'),          # K线最新交易日
+    ('close', 'float'),
+    ('change_pct', 'float'),
+    ('volume', 'int'),
+    ('amount', 'float'),
+    ('turnover_rate', 'float'),
+    ('ma_trend', 'str'),
+    ('macd_signal', 'str'),
+    ('kdj_signal', 'str'),
+    ('rsi6', 'float'),
+    ('support', 'float'),
+    ('resistance', 'float'),
+    ('news_count', 'int'),
+    ('key_points', 'str'),          # 多条要点以换行分隔
+    ('risks', 'str'),
+    ('opportunities', 'str'),
+    ('elapsed', 'float'),           # 分析总耗时（秒）
+)
+
+# 导出格式
+JSONL = 'jsonl'
+PARQUET = 'parquet'
+
+# 分区目录名，形如 date=2024-01-19（hive 风格，pyarrow / pandas 可直接识别）
+PARTITION_PREFIX = 'date='
+
+# Parquet 默认每攒够多少条写一个分片文件
+PARQUET_BATCH_SIZE = 500
+
+
+def flatten_result(result: Dict, analyzed_at: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    把 analyze_stock 的结果展开为 EXPORT_FIELDS 定义的扁平记录
+
+    原始 K 线、DataFrame 和诊股原文不导出。
+
+    Args:
+        result: analyze_stock / analyze_many 的结果
+        analyzed_at: 记录时间，默认为当前时间
+
+    Returns:
+        {字段名: 值}，缺失的字段为 None
+    """
+    summary = result.get('summary') or {}
+    technical = result.get('technical_analysis') or {}
+    if 'error' in technical:
+        technical = {}
+    basic = technical.get('basic_info') or {}
+    indicators = technical.get('technical_indicators') or {}
+    levels = technical.get('support_resistance') or {}
+    details = summary.get('score_details') or {}
+
+    record = {
+        'analyzed_at': (analyzed_at or datetime.now()).isoformat(timespec='seconds'),
+        'stock_code': result.get('stock_code'),
+        'stock_name': result.get('stock_name'),
+        'success': bool(result.get('success')),
+        'error': result.get('error'),
+        'overall_score': summary.get('overall_score'),
+        'recommendation': summary.get('recommendation'),
+        'risk_level': summary.get('risk_level'),
+        'generated_by': summary.get('generated_by'),
+        'trade_date': basic.get('date'),
+        'close': basic.get('close'),
+        'change_pct': basic.get('change_pct'),
+        'volume': basic.get('volume'),
+        'amount': basic.get('amount'),
+        'turnover_rate': basic.get('turnover_rate'),
+        'ma_trend': (indicators.get('ma') or {}).get('trend'),
+        'macd_signal': (indicators.get('macd') or {}).get('signal'),
+        'kdj_signal': (indicators.get('kdj') or {}).get('signal'),
+        'rsi6': (indicators.get('rsi') or {}).get('rsi6'),
+        'support': levels.get('support'),
+        'resistance': levels.get('resistance'),
+        'news_count': len(result['recent_news']) if result.get('recent_news') is not None else None,
+        'key_points': "\n".join(summary.get('key_points') or []) or None,
+        'risks': "\n".join(summary.get('risks') or []) or None,
+        'opportunities': "\n".join(summary.get('opportunities') or []) or None,
+        'elapsed': (result.get('timings') or {}).get('total'),
+    }
+    for dimension, name in DIMENSION_NAMES.items():
+        record[f'{dimension}_score'] = details.get(name)
+    return {name: record[name] for name, _ in EXPORT_FIELDS}
+
+
+def partition_dir(directory: Union[str, Path], day: date) -> Path:
+    """获取某一天的分区目录"""
+    return Path(directory) / f"{PARTITION_PREFIX}{day.isoformat()}"
+
+
+class ResultSink:
+    """
+    分析结果导出基类
+
+    线程安全，可作为上下文管理器使用；write 之后即按各自的策略落盘，close 写出剩余数据。
+    """
+
+    format = ''
+
+    def __init__(self, directory: Union[str, Path] = "exports", prefix: str = "analysis"):
+        """
+        初始化导出目标
+
+        Args:
+            directory: 导出根目录，其下按日期建立分区目录
+            prefix: 文件名前缀
+        """
+        self.directory = Path(directory)
+        self.prefix = prefix
+        self.written = 0
+        self._lock = threading.Lock()
+
+    def write(self, result: Dict):
+        """
+        写入一条分析结果
+
+        Args:
+            result: analyze_stock 的结果
+        """
+        now = datetime.now()
+        record = flatten_result(result, now)
+        with self._lock:
+            self._write(record, now.date())
+            self.written += 1
+
+    def write_many(self, results: Iterable[Dict]) -> Iterator[Dict]:
+        """
+        边写边透传结果，可直接包在 analyze_many 外面
+
+        Args:
+            results: 分析结果迭代器
+
+        Yields:
+            原样返回的结果
+
+        Example:
+            >>> with JsonlSink() as sink:
+            ...     for result in sink.write_many(analyzer.analyze_many(stocks)):
+            ...         print(result['stock_name'])
+        """
+        for result in results:
+            self.write(result)
+            yield result
+
+    def _write(self, record: Dict[str, Any], day: date):
+        raise NotImplementedError
+
+    def flush(self):
+        """把缓冲中的数据写到磁盘"""
+
+    def close(self):
+        """写出剩余数据并释放文件"""
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class JsonlSink(ResultSink):
+    """
+    JSONL 导出，每条结果一行，追加写入 <目录>/date=YYYY-MM-DD/<前缀>.jsonl
+
+    每行写完立即 flush，进程崩溃时最多丢失正在写的一行。
+    """
+
+    format = JSONL
+
+    def __init__(self, directory: Union[str, Path] = "exports", prefix: str = "analysis",
+                 fsync: bool = False):
+        """
+        初始化 JSONL 导出
+
+        Args:
+            directory: 导出根目录
+            prefix: 文件名前缀
+            fsync: 每行写完是否调用 fsync（断电也不丢数据，但更慢）
+        """
+        super().__init__(directory, prefix)
+        self.fsync = fsync
+        self._file = None
+        self._day: Optional[date] = None
+
+    def path_for(self, day: date) -> Path:
+        """获取某一天的导出文件路径"""
+        return partition_dir(self.directory, day) / f"{self.prefix}.jsonl"
+
+    def _write(self, record: Dict[str, Any], day: date):
+        if self._file is None or day != self._day:
+            self._close_file()
+            path = self.path_for(day)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(path, 'a', encoding='utf-8')
+            self._day = day
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self):
+        with self._lock:
+            self._close_file()
+
+
+class ParquetSink(ResultSink):
+    """
+    Parquet 数据集导出
+
+    结果攒够 batch_size 条写一个分片文件 <目录>/date=YYYY-MM-DD/<前缀>-<时间戳>-<序号>.parquet，
+    分片先写临时文件再改名，读取方永远不会看到写了一半的文件；同一天多次运行只会新增分片。
+    """
+
+    format = PARQUET
+
+    def __init__(self, directory: Union[str, Path] = "exports", prefix: str = "analysis",
+                 batch_size: int = PARQUET_BATCH_SIZE):
+        """
+        初始化 Parquet 导出
+
+        Args:
+            directory: 导出根目录
+            prefix: 文件名前缀
+            batch_size: 每个分片的最大条数（越小越不怕崩溃，但文件越多）
+
+        Raises:
+            ImportError: 未安装 pyarrow
+        """
+        if pa is None:
+            raise ImportError("导出 Parquet 需要安装 pyarrow：pip install pyarrow")
+        super().__init__(directory, prefix)
+        self.batch_size = max(1, batch_size)
+        self.schema = pa.schema([(name, _ARROW_TYPES[kind]()) for name, kind in EXPORT_FIELDS])
+        self._rows: Dict[date, List[Dict[str, Any]]] = {}
+        self._parts = 0
+        self._run_id = time.strftime('%H%M%S')
+
+    def _write(self, record: Dict[str, Any], day: date):
+        rows = self._rows.setdefault(day, [])
+        rows.append(record)
+        if len(rows) >= self.batch_size:
+            self._write_part(day, self._rows.pop(day))
+
+    def _write_part(self, day: date, rows: List[Dict[str, Any]]):
+        """把一批记录原子写为一个分片文件"""
+        directory = partition_dir(self.directory, day)
+        directory.mkdir(parents=True, exist_ok=True)
+        self._parts += 1
+        path = directory / f"{self.prefix}-{self._run_id}-{os.getpid()}-{self._parts:05d}.parquet"
+
+        table = pa.Table.from_pylist(rows, schema=self.schema)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + path.name, suffix='.tmp')
+        os.close(fd)
+        try:
+            pq.write_table(table, tmp_path)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def flush(self):
+        with self._lock:
+            rows, self._rows = self._rows, {}
+            for day, batch in rows.items():
+                self._write_part(day, batch)
+
+
+def open_sink(fmt: str = JSONL, directory: Union[str, Path] = "exports", **kwargs) -> ResultSink:
+    """
+    按格式创建导出目标
+
+    Args:
+        fmt: JSONL 或 PARQUET
+        directory: 导出根目录
+        **kwargs: 传给具体导出类的参数
+
+    Returns:
+        ResultSink 实例
+    """
+    if fmt == JSONL:
+        return JsonlSink(directory, **kwargs)
+    if fmt == PARQUET:
+        return ParquetSink(directory, **kwargs)
+    raise ValueError(f"未知的导出格式: {fmt}")
+
+
+def load_history(directory: Union[str, Path] = "exports", start: Optional[date] = None,
+                 end: Optional[date] = None, fmt: Optional[str] = None) -> pd.DataFrame:
+    """
+    读取导出的历史结果，只打开日期范围内的分区
+
+    Args:
+        directory: 导出根目录
+        start: 起始日期（含），默认不限
+        end: 结束日期（含），默认不限
+        fmt: 只读取某种格式，默认 JSONL 和 Parquet 都读
+
+    Returns:
+        包含 EXPORT_FIELDS 各列及分区日期 date 列的 DataFrame
+    """
+    frames = []
+    root = Path(directory)
+    partitions = sorted(root.glob(f"{PARTITION_PREFIX}*")) if root.is_dir() else []
+    for partition in partitions:
+        try:
+            day = date.fromisoformat(partition.name[len(PARTITION_PREFIX):])
+        except ValueError:
+            continue
+        if (start and day < start) or (end and day > end):
+            continue
+        if fmt in (None, JSONL):
+            for path in sorted(partition.glob("*.jsonl")):
+                frames.append(pd.read_json(path, lines=True, dtype=False).assign(date=day))
+        if fmt in (None, PARQUET):
+            for path in sorted(partition.glob("*.parquet")):
+                frames.append(pd.read_parquet(path).assign(date=day))
+
+    columns = [name for name, _ in EXPORT_FIELDS] + ['date']
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True).reindex(columns=columns)
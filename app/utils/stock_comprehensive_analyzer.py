@@ -2,80 +2,423 @@
 股票综合分析器
 整合问财诊股数据、东方财富K线数据和技术分析，生成完整的股票分析报告
 """
-from typing import Dict, Optional
-from .wencai_api import WenCaiAPI
+import asyncio
+import itertools
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import contextmanager
+from functools import partial
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+from .wencai_api import WenCaiAPI, BATCH_MAX_WORKERS
 from .eastmoney_api import EastMoneyAPI
 from .technical_analysis import StockAnalyzer
+from .symbol_master import symbol_master
+from .news_store import news_store
+from .analysis_cache import AnalysisCache, analysis_cache
+from .instrumentation import Span, metrics, submit_in_context
+from .factor_scoring import DEFAULT_WEIGHTS, RANK, build_factor_frame, score_universe
+from .wencai_metrics import build_metrics_frame, score_funds, score_fundamentals
 from app.core.deepseek_api import DeepSeekAPI
 
 
+# 评分和AI分析用到的问财诊股部分
+FUND_SECTIONS = ('历史主力资金流向', '北向资金流向情况', 'DDE散户数量变化')
+FUNDAMENTAL_SECTIONS = ('财务数据', '估值指标', '十大股东持股比例')
+NEWS_SECTIONS = ('重要新闻', '所属概念列表', '投顾点评')
+
+# analyze_stock 并发获取的数据源数（问财、K线、本地新闻）
+FANOUT_WORKERS = 3
+
+# analyze_many 默认同时分析的股票数
+BATCH_CONCURRENCY = 8
+
+# stream_report 输出的章节，按通常的到达顺序排列（technical 与 fund/fundamental/news 谁先到取决于数据源）
+REPORT_SECTIONS = ('header', 'technical', 'fund', 'fundamental', 'news', 'summary', 'ai', 'done')
+
+
 class StockComprehensiveAnalyzer:
     """股票综合分析器，整合多个数据源"""
     
-    def __init__(self, use_ai: bool = True):
+    # 分析所需的问财诊股部分，只获取、转换和缓存这些部分
+    REQUIRED_SECTIONS = FUND_SECTIONS + FUNDAMENTAL_SECTIONS + NEWS_SECTIONS
+    
+    def __init__(self, use_ai: bool = True, cache: Optional[AnalysisCache] = None):
         """
         初始化分析器
         
         Args:
             use_ai: 是否使用AI大模型进行分析，默认True
+            cache: 分析结果缓存，默认使用全局 analysis_cache
         """
         self.wencai_api = WenCaiAPI()
         self.eastmoney_api = EastMoneyAPI()
         self.technical_analyzer = StockAnalyzer()
+        self.symbol_master = symbol_master
         self.use_ai = use_ai
+        self.cache = cache if cache is not None else analysis_cache
         if use_ai:
             self.deepseek_api = DeepSeekAPI()
     
-    def analyze_stock(self, stock_code: str, stock_name: str = None, kline_days: int = 120) -> Dict:
+    def analyze_stock(self, stock_code: str, stock_name: str = None, kline_days: int = 120,
+                      full_diagnosis: bool = False, verbose: bool = True, use_cache: bool = True,
+                      stale_while_revalidate: bool = False, use_ai: Optional[bool] = None,
+                      cache_only: bool = False) -> Dict:
         """
         综合分析股票
         
+        问财诊股、K线（拿到后立即做技术分析）和本地新闻三路互不依赖，并发执行；
+        全部完成后再生成综合评分，总耗时约等于最慢的单个数据源。
+        
         Args:
-            stock_code: 股票代码，如 "002115"
-            stock_name: 股票名称，如 "三维通信"（可选）
+            stock_code: 股票代码，如 "002115"，也可以是名称或拼音缩写
+            stock_name: 股票名称，如 "三维通信"（可选，默认从代码主表获取）
             kline_days: K线数据天数，默认120天
+            full_diagnosis: 是否获取完整的问财诊股数据，默认只获取 REQUIRED_SECTIONS
+            verbose: 是否打印各步骤进度
+            use_cache: 是否使用分析结果缓存（同一交易会话内数据没有变化时直接返回）
+            stale_while_revalidate: 缓存过期时先返回旧结果，在后台重新分析
+            use_ai: 本次是否使用AI分析，None 表示按初始化时的设置（未初始化大模型时始终不用）
+            cache_only: 问财诊股只读本地缓存，不请求问财（时间紧张时的降级模式）
         
         Returns:
-            综合分析结果字典
+            综合分析结果字典，timings 字段为各阶段耗时（秒）
             
         Example:
             >>> analyzer = StockComprehensiveAnalyzer()
             >>> result = analyzer.analyze_stock("002115", "三维通信")
             >>> print(result['summary'])
         """
-        print(f"开始分析股票: {stock_name or stock_code}")
+        stock_code, stock_name = self._resolve_stock(stock_code, stock_name)
+        use_ai = self._use_ai(use_ai)
+        compute = partial(self._analyze, stock_code, stock_name, kline_days, full_diagnosis,
+                          verbose, use_ai, cache_only)
+        if not use_cache:
+            return compute()
+        
+        key = self.cache.make_key(stock_code, kline_days, use_ai, full_diagnosis, cache_only)
+        return self.cache.get_or_compute(
+            key,
+            compute,
+            lambda: self._data_version(stock_code, stock_name, full_diagnosis),
+            stale_while_revalidate=stale_while_revalidate,
+        )
+    
+    def _use_ai(self, use_ai: Optional[bool]) -> bool:
+        """本次分析是否使用AI（未初始化大模型时始终为 False）"""
+        return self.use_ai if use_ai is None else (use_ai and self.use_ai)
+    
+    def _analyze(self, stock_code: str, stock_name: Optional[str], kline_days: int,
+                 full_diagnosis: bool, verbose: bool, use_ai: bool, cache_only: bool = False) -> Dict:
+        """不经过结果缓存，并发获取各数据源并完成分析（记为 "analyze" span，各阶段为其子 span）"""
+        if verbose:
+            print(f"开始分析股票: {stock_name or stock_code}")
+        
+        started = time.perf_counter()
+        timings = {}
+        with metrics.span('analyze'), \
+                ThreadPoolExecutor(max_workers=FANOUT_WORKERS, thread_name_prefix="analyze") as executor:
+            diagnosis = submit_in_context(executor, self._fetch_diagnosis, stock_code, stock_name,
+                                          full_diagnosis, timings, verbose, cache_only)
+            technical = submit_in_context(executor, self._fetch_technical, stock_code, kline_days,
+                                          timings, verbose)
+            news = submit_in_context(executor, self._fetch_news, stock_code, timings)
+            kline_data, technical_result = technical.result()
+            result = self._build_result(stock_code, stock_name, diagnosis.result(),
+                                        kline_data, technical_result, news.result(), timings, use_ai)
+        timings['total'] = time.perf_counter() - started
+        
+        if verbose:
+            print("分析完成！")
+        return result
+    
+    async def analyze_stock_async(self, stock_code: str, stock_name: str = None, kline_days: int = 120,
+                                  full_diagnosis: bool = False, verbose: bool = True, use_cache: bool = True,
+                                  stale_while_revalidate: bool = False, use_ai: Optional[bool] = None,
+                                  cache_only: bool = False) -> Dict:
+        """
+        综合分析股票（异步版本，参数和返回值同 analyze_stock）
+        
+        各数据源的阻塞调用放到线程中执行，不阻塞事件循环，可以在 FastAPI 等
+        异步代码中直接 await，也可以用 asyncio.gather 同时分析多只股票。
+        
+        Example:
+            >>> result = await analyzer.analyze_stock_async("002115")
+        """
+        stock_code, stock_name = self._resolve_stock(stock_code, stock_name)
+        use_ai = self._use_ai(use_ai)
+        if use_cache:
+            key = self.cache.make_key(stock_code, kline_days, use_ai, full_diagnosis, cache_only)
+            version = partial(self._data_version, stock_code, stock_name, full_diagnosis)
+            cached, fresh = self.cache.lookup(key, await asyncio.to_thread(version))
+            if fresh:
+                return cached
+            if cached is not None and stale_while_revalidate:
+                self.cache.refresh_in_background(
+                    key, partial(self._analyze, stock_code, stock_name, kline_days, full_diagnosis,
+                                 verbose, use_ai, cache_only),
+                    version)
+                return cached
+        
+        if verbose:
+            print(f"开始分析股票: {stock_name or stock_code}")
+        
+        started = time.perf_counter()
+        timings = {}
+        # asyncio.to_thread 会复制当前上下文，各阶段 span 的父 span 为 "analyze"
+        with metrics.span('analyze'):
+            diagnosis, (kline_data, technical_result), recent_news = await asyncio.gather(
+                asyncio.to_thread(self._fetch_diagnosis, stock_code, stock_name, full_diagnosis,
+                                  timings, verbose, cache_only),
+                asyncio.to_thread(self._fetch_technical, stock_code, kline_days, timings, verbose),
+                asyncio.to_thread(self._fetch_news, stock_code, timings),
+            )
+            result = await asyncio.to_thread(self._build_result, stock_code, stock_name, diagnosis,
+                                             kline_data, technical_result, recent_news, timings, use_ai)
+        timings['total'] = time.perf_counter() - started
+        if use_cache:
+            self.cache.put(key, result, await asyncio.to_thread(version))
+        
+        if verbose:
+            print("分析完成！")
+        return result
+    
+    def _data_version(self, stock_code: str, stock_name: Optional[str], full_diagnosis: bool) -> Optional[float]:
+        """分析结果依赖的诊股数据版本（见 WenCaiCache.version），用于判断缓存的结果是否过期"""
+        sections = None if full_diagnosis else self.REQUIRED_SECTIONS
+        return self.wencai_api.cache.version(stock_name or stock_code, sections)
+    
+    def _resolve_stock(self, stock_code: str, stock_name: Optional[str]) -> Tuple[str, Optional[str]]:
+        """通过代码主表把代码、名称或拼音缩写解析为 (股票代码, 股票名称)"""
+        symbol = self.symbol_master.resolve(stock_code)
+        if symbol:
+            stock_code = symbol['code']
+            stock_name = stock_name or symbol['name']
+        return stock_code, stock_name
+    
+    @staticmethod
+    @contextmanager
+    def _stage(timings: Dict[str, float], stage: str) -> Iterator[Span]:
+        """
+        记录一个分析阶段：耗时写入 timings[stage]，同时作为 "analyze.<stage>" span 记入全局指标
         
-        # 1. 获取问财诊股数据
-        print("  [1/3] 获取问财诊股数据...")
-        diagnosis = self.wencai_api.get_stock_diagnosis(stock_name or stock_code)
+        出错时同样记录已用时间。
+        """
+        span = metrics.span(f'analyze.{stage}')
+        try:
+            with span:
+                yield span
+        finally:
+            timings[stage] = span.elapsed
+    
+    def _fetch_diagnosis(self, stock_code: str, stock_name: Optional[str], full_diagnosis: bool,
+                         timings: Dict[str, float], verbose: bool = True,
+                         cache_only: bool = False) -> Optional[Dict]:
+        """获取问财诊股数据"""
+        if verbose:
+            print("  [问财] 获取问财诊股数据...")
+        sections = None if full_diagnosis else self.REQUIRED_SECTIONS
+        with self._stage(timings, 'diagnosis'):
+            return self.wencai_api.get_stock_diagnosis(stock_name or stock_code, sections=sections,
+                                                       cache_only=cache_only)
+    
+    def _fetch_technical(self, stock_code: str, kline_days: int, timings: Dict[str, float],
+                         verbose: bool = True) -> Tuple[Optional[Dict], Optional[Dict]]:
+        """
+        获取K线数据并立即进行技术分析
         
-        # 2. 获取K线数据
-        print("  [2/3] 获取K线历史数据...")
+        Returns:
+            (K线数据, 技术分析结果)，获取失败时都为 None
+        """
+        if verbose:
+            print("  [K线] 获取K线历史数据...")
         # 构建secid（市场代码.股票代码）
         secid = self._build_secid(stock_code)
-        kline_data = self.eastmoney_api.get_stock_history(secid=secid, lmt=kline_days)
+        with self._stage(timings, 'kline'):
+            kline_data = self.eastmoney_api.get_stock_history(secid=secid, lmt=kline_days)
         
-        # 3. 技术分析
-        print("  [3/3] 进行技术分析...")
         technical_result = None
         if kline_data:
-            technical_result = self.technical_analyzer.analyze(kline_data)
-        
-        # 整合结果
+            if verbose:
+                print("  [K线] 进行技术分析...")
+            with self._stage(timings, 'technical'):
+                technical_result = self.technical_analyzer.analyze(kline_data)
+        return kline_data, technical_result
+    
+    def _fetch_news(self, stock_code: str, timings: Dict[str, float]) -> List[Dict]:
+        """读取本地新闻库中近5日提到该股票的新闻"""
+        with self._stage(timings, 'news'):
+            return news_store.news_for_stock(stock_code, days=5, limit=20)
+    
+    def _build_result(self, stock_code: str, stock_name: Optional[str], diagnosis: Optional[Dict],
+                      kline_data: Optional[Dict], technical_result: Optional[Dict],
+                      recent_news: List[Dict], timings: Dict[str, float],
+                      use_ai: Optional[bool] = None) -> Dict:
+        """整合各数据源的结果并生成综合评分和建议"""
         result = {
             "stock_code": stock_code,
             "stock_name": stock_name or stock_code,
             "diagnosis": diagnosis,
             "kline_data": kline_data,
             "technical_analysis": technical_result,
+            "recent_news": recent_news,
+            "timings": timings,
             "success": True
         }
+        with self._stage(timings, 'summary'):
+            result["summary"] = self._generate_summary(diagnosis, technical_result, use_ai)
+        return result
+    
+    def analyze_many(self, stocks: Iterable, concurrency: int = BATCH_CONCURRENCY, kline_days: int = 120,
+                     full_diagnosis: bool = False,
+                     progress: Optional[Callable[[int, int, Dict], None]] = None,
+                     cancel_event: Optional[threading.Event] = None) -> Iterator[Dict]:
+        """
+        用有界线程池批量分析股票，按完成先后逐个返回结果
         
-        # 生成综合评分和建议
-        result["summary"] = self._generate_summary(diagnosis, technical_result)
+        同时在途的股票数不超过 concurrency，股票列表再长也不会一次性提交；
+        单只股票出错只影响它自己，返回 success=False 的结果并附带错误信息。
+        设置 cancel_event 后不再开始新的股票，已经开始的分析完成后照常返回；
+        提前停止迭代时，正在进行的分析无法中断，会在后台自然结束。
         
-        print("分析完成！")
-        return result
+        Args:
+            stocks: 股票代码列表，或 (股票代码, 股票名称) 列表
+            concurrency: 同时分析的股票数
+            kline_days: K线数据天数
+            full_diagnosis: 是否获取完整的问财诊股数据
+            progress: 进度回调 progress(已完成数, 总数, 结果)，默认打印一行进度
+            cancel_event: 取消信号
+        
+        Yields:
+            analyze_stock 的结果，timings 字段为各阶段耗时（秒）
+            
+        Example:
+            >>> for result in analyzer.analyze_many(["002115", "600036"], concurrency=8):
+            ...     print(result['stock_name'], result['summary']['overall_score'])
+        """
+        items = [(s, None) if isinstance(s, str) else tuple(s) for s in stocks]
+        total = len(items)
+        if not total:
+            return
+        progress = progress or self._print_progress
+        stopped = threading.Event()
+        
+        def cancelled() -> bool:
+            return stopped.is_set() or (cancel_event is not None and cancel_event.is_set())
+        
+        def run(code: str, name: Optional[str], submitted: float) -> Dict:
+            metrics.observe('span_queue_wait_seconds', time.perf_counter() - submitted, span='analyze_many')
+            if cancelled():
+                return {"stock_code": code, "stock_name": name or code, "success": False,
+                        "error": "已取消", "cancelled": True, "timings": {}}
+            started = time.perf_counter()
+            try:
+                return self.analyze_stock(code, name, kline_days=kline_days,
+                                          full_diagnosis=full_diagnosis, verbose=False)
+            except Exception as e:
+                return {"stock_code": code, "stock_name": name or code, "success": False,
+                        "error": f"{type(e).__name__}: {e}",
+                        "timings": {"total": time.perf_counter() - started}}
+        
+        executor = ThreadPoolExecutor(max_workers=max(1, min(concurrency, total)),
+                                      thread_name_prefix="analyze-many")
+        queue = iter(items)
+        pending = set()
+        done_count = 0
+        try:
+            # 保持最多 concurrency 只股票在途
+            for code, name in itertools.islice(queue, concurrency):
+                pending.add(executor.submit(run, code, name, time.perf_counter()))
+            
+            while pending:
+                finished, pending = wait(pending, timeout=1.0, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    result = future.result()
+                    if result.get("cancelled"):
+                        continue
+                    done_count += 1
+                    progress(done_count, total, result)
+                    yield result
+                
+                if cancelled():
+                    continue
+                for code, name in itertools.islice(queue, len(finished)):
+                    pending.add(executor.submit(run, code, name, time.perf_counter()))
+        finally:
+            stopped.set()
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+    
+    @staticmethod
+    def _print_progress(done: int, total: int, result: Dict):
+        """analyze_many 的默认进度输出"""
+        name = f"{result['stock_name']}({result['stock_code']})"
+        elapsed = result.get('timings', {}).get('total', 0.0)
+        if result.get('success'):
+            summary = result['summary']
+            print(f"[{done}/{total}] ✓ {name} 评分: {summary['overall_score']:.1f}  "
+                  f"建议: {summary['recommendation']}  用时 {elapsed:.1f}s")
+        else:
+            print(f"[{done}/{total}] ✗ {name} {result.get('error', '分析失败')}")
+    
+    def rank_stocks(self, results: Iterable[Dict], weights: Optional[Dict[str, float]] = None,
+                    method: str = RANK) -> pd.DataFrame:
+        """
+        对一批分析结果做横截面因子评分和排名
+        
+        单只股票的 summary 用绝对规则评分；批量分析时用本方法在整个股票池内
+        排名或标准化各因子，再按维度权重加权，一步得到全部股票的排名。
+        
+        Args:
+            results: analyze_stock / analyze_many 的结果（失败的结果会被跳过）
+            weights: 各维度权重，默认为 DEFAULT_WEIGHTS（技术面40%、资金面30%、基本面20%、消息面10%）
+            method: 标准化方法，RANK 或 ZSCORE
+        
+        Returns:
+            score_universe 返回的评分表，另加 stock_name 列
+        """
+        results = [r for r in results if r.get('success')]
+        technicals = {r['stock_code']: r.get('technical_analysis') for r in results}
+        diagnoses = {r['stock_code']: r.get('diagnosis') for r in results}
+        news_counts = {r['stock_code']: len(r.get('recent_news') or []) for r in results}
+        
+        ranking = score_universe(build_factor_frame(technicals, diagnoses, news_counts), weights, method)
+        names = {r['stock_code']: r['stock_name'] for r in results}
+        ranking.insert(0, 'stock_name', [names[code] for code in ranking.index])
+        return ranking
+    
+    def _diagnosis_query(self, stock_code: str) -> str:
+        """获取问财查询词（与 analyze_stock 一致，优先使用股票名称）"""
+        symbol = self.symbol_master.resolve(stock_code)
+        return symbol['name'] if symbol and symbol.get('name') else stock_code
+    
+    def prefetch_diagnosis(self, stock_codes: Iterable[str], max_workers: int = BATCH_MAX_WORKERS) -> Dict:
+        """
+        并发预取多只股票的问财诊股数据并写入本地缓存
+        
+        之后逐只调用 analyze_stock 时直接命中缓存，不再串行等待问财。
+        
+        Args:
+            stock_codes: 股票代码列表
+            max_workers: 最大并发数
+        
+        Returns:
+            {问财查询词: 诊断信息}，失败的为 None
+        """
+        queries = [self._diagnosis_query(code) for code in stock_codes]
+        total = len(set(queries))
+        results = {}
+        for i, (query, diagnosis) in enumerate(
+                self.wencai_api.iter_stock_diagnosis(queries, max_workers=max_workers,
+                                                     sections=self.REQUIRED_SECTIONS), 1):
+            status = "✓" if diagnosis else "✗"
+            print(f"  [{i}/{total}] 问财数据 {status} {query}")
+            results[query] = diagnosis
+        return results
     
     def _build_secid(self, stock_code: str) -> str:
         """
@@ -87,31 +430,22 @@ class StockComprehensiveAnalyzer:
         Returns:
             secid字符串，如 "0.002115"
         """
-        # 判断市场：
-        # 0: 深圳（创业板00、中小板002、深市主板000）
-        # 1: 上海（主板60、科创板688）
-        if stock_code.startswith('6'):
-            market = '1'
-        elif stock_code.startswith('688'):
-            market = '1'
-        else:
-            market = '0'
-        
-        return f"{market}.{stock_code}"
+        return self.symbol_master.get_secid(stock_code)
     
-    def _generate_summary(self, diagnosis: Dict, technical: Dict) -> Dict:
+    def _generate_summary(self, diagnosis: Dict, technical: Dict, use_ai: Optional[bool] = None) -> Dict:
         """
         生成综合分析摘要
         
         Args:
             diagnosis: 问财诊股数据
             technical: 技术分析结果
+            use_ai: 是否使用AI分析，None 表示按初始化时的设置
         
         Returns:
             综合摘要字典
         """
         # 如果启用AI分析，尝试使用大模型
-        if self.use_ai:
+        if self._use_ai(use_ai):
             try:
                 ai_summary = self._generate_ai_summary(diagnosis, technical)
                 if ai_summary:
@@ -137,7 +471,11 @@ class StockComprehensiveAnalyzer:
         stock_data = self._format_data_for_ai(diagnosis, technical)
         
         # 调用大模型
-        result = self.deepseek_api.analyze_stock_data(stock_data)
+        with metrics.span('deepseek.analyze') as span:
+            result = self.deepseek_api.analyze_stock_data(stock_data)
+            span.bytes = len((result.get('raw_text') or '').encode('utf-8'))
+            if not result['success']:
+                span.error = 'APIError'
         
         if result['success'] and result['data']:
             ai_result = result['data']
@@ -217,25 +555,19 @@ RSI指标:
         
         # 3. 资金面数据（如果有）
         if diagnosis:
-            has_fund_data = any(key in diagnosis for key in [
-                '历史主力资金流向', '北向资金流向情况', 'DDE散户数量变化'
-            ])
+            has_fund_data = any(key in diagnosis for key in FUND_SECTIONS)
             if has_fund_data:
                 data_parts.append("【资金面】\n包含: 主力资金流向、北向资金、DDE散户数据")
         
         # 4. 基本面数据（如果有）
         if diagnosis:
-            has_fundamental_data = any(key in diagnosis for key in [
-                '财务数据', '估值指标', '十大股东持股比例'
-            ])
+            has_fundamental_data = any(key in diagnosis for key in FUNDAMENTAL_SECTIONS)
             if has_fundamental_data:
                 data_parts.append("【基本面】\n包含: 财务数据、估值指标、股东信息")
         
         # 5. 消息面数据（如果有）
         if diagnosis:
-            has_news_data = any(key in diagnosis for key in [
-                '重要新闻', '所属概念列表', '投顾点评'
-            ])
+            has_news_data = any(key in diagnosis for key in NEWS_SECTIONS)
             if has_news_data:
                 data_parts.append("【消息面】\n包含: 重要新闻、概念题材、投顾点评")
         
@@ -267,22 +599,25 @@ RSI指标:
         # 1. 技术面评分（权重40%）
         if technical and "error" not in technical:
             tech_score = self._evaluate_technical(technical, summary)
-            scores.append(("技术面", tech_score, 0.4))
+            scores.append(("技术面", tech_score, DEFAULT_WEIGHTS['technical']))
+        
+        # 问财诊股数据解析为数值字段，资金面和基本面共用
+        frame = build_metrics_frame({"": diagnosis}) if diagnosis else None
         
         # 2. 资金面评分（权重30%）
         if diagnosis:
-            fund_score = self._evaluate_funds(diagnosis, summary)
-            scores.append(("资金面", fund_score, 0.3))
+            fund_score = self._evaluate_funds(frame, summary)
+            scores.append(("资金面", fund_score, DEFAULT_WEIGHTS['fund']))
         
         # 3. 基本面评分（权重20%）
         if diagnosis:
-            fundamental_score = self._evaluate_fundamentals(diagnosis, summary)
-            scores.append(("基本面", fundamental_score, 0.2))
+            fundamental_score = self._evaluate_fundamentals(frame, summary)
+            scores.append(("基本面", fundamental_score, DEFAULT_WEIGHTS['fundamental']))
         
         # 4. 消息面评分（权重10%）
         if diagnosis:
             news_score = self._evaluate_news(diagnosis, summary)
-            scores.append(("消息面", news_score, 0.1))
+            scores.append(("消息面", news_score, DEFAULT_WEIGHTS['news']))
         
         # 计算加权平均分
         if scores:
@@ -335,38 +670,41 @@ RSI指标:
         
         return max(0, min(100, score))
     
-    def _evaluate_funds(self, diagnosis: Dict, summary: Dict) -> float:
-        """评估资金面，返回0-100分"""
-        score = 50.0
-        
-        # 从诊股数据中提取资金信息（这里需要根据实际数据结构调整）
-        if '历史主力资金流向' in diagnosis:
-            summary['key_points'].append("○ 包含主力资金流向数据")
-            score += 10
-        
-        if '北向资金流向情况' in diagnosis:
-            summary['key_points'].append("○ 包含北向资金数据")
-            score += 5
-        
-        if 'DDE散户数量变化' in diagnosis:
-            summary['key_points'].append("○ 包含DDE散户数据")
-            score += 5
-        
-        return max(0, min(100, score))
+    def _evaluate_funds(self, frame: pd.DataFrame, summary: Dict) -> float:
+        """评估资金面，返回0-100分（frame 为单只股票的数值表）"""
+        row = frame.iloc[0]
+        
+        inflow = row['main_inflow_5d']
+        if not math.isnan(inflow):
+            text = f"近5日主力净流入 {inflow / 1e8:.2f} 亿元"
+            if inflow >= 0:
+                summary['key_points'].append(f"✓ {text}")
+            else:
+                summary['risks'].append(f"✗ {text}")
+        
+        northbound = row['northbound_change']
+        if not math.isnan(northbound):
+            summary['key_points'].append(f"○ 北向资金持股比例近5日变化 {northbound:+.2f}%")
+        
+        return float(score_funds(frame).iloc[0])
     
-    def _evaluate_fundamentals(self, diagnosis: Dict, summary: Dict) -> float:
-        """评估基本面，返回0-100分"""
-        score = 50.0
+    def _evaluate_fundamentals(self, frame: pd.DataFrame, summary: Dict) -> float:
+        """评估基本面，返回0-100分（frame 为单只股票的数值表）"""
+        row = frame.iloc[0]
         
-        if '财务数据' in diagnosis:
-            summary['key_points'].append("○ 包含财务数据")
-            score += 15
+        if not math.isnan(row['roe']):
+            summary['key_points'].append(f"○ ROE {row['roe']:.2f}%")
         
-        if '估值指标' in diagnosis:
-            summary['key_points'].append("○ 包含估值指标")
-            score += 10
+        if not math.isnan(row['revenue_growth']):
+            summary['key_points'].append(f"○ 营收同比增长 {row['revenue_growth']:.2f}%")
         
-        return max(0, min(100, score))
+        if not math.isnan(row['pe']):
+            if row['pe'] < 0:
+                summary['risks'].append("✗ 市盈率为负，公司亏损")
+            else:
+                summary['key_points'].append(f"○ 市盈率 {row['pe']:.1f} 倍")
+        
+        return float(score_fundamentals(frame).iloc[0])
     
     def _evaluate_news(self, diagnosis: Dict, summary: Dict) -> float:
         """评估消息面，返回0-100分"""
@@ -402,6 +740,160 @@ RSI指标:
         else:
             return "高风险"
     
+    def stream_report(self, stock_code: str, stock_name: str = None, kline_days: int = 120,
+                      full_diagnosis: bool = False, use_ai: Optional[bool] = None,
+                      use_cache: bool = True) -> Iterator[Dict]:
+        """
+        渐进式生成分析报告，各部分的数据一到就输出对应章节
+        
+        技术面在K线返回后立即输出，资金面、基本面和消息面在问财返回后输出，
+        数据齐全后先输出规则评分，最后输出耗时最长的AI分析。
+        
+        Args:
+            stock_code: 股票代码，也可以是名称或拼音缩写
+            stock_name: 股票名称（可选）
+            kline_days: K线数据天数
+            full_diagnosis: 是否获取完整的问财诊股数据
+            use_ai: 是否使用AI分析，None 表示按初始化时的设置
+            use_cache: 是否使用分析结果缓存（命中时一次性输出全部章节，并写回完整结果）
+        
+        Yields:
+            章节 {'section': REPORT_SECTIONS 中的名称, 'text': 章节文本, 'elapsed': 距开始的秒数}；
+            评分类章节另有 'score'，最后一个 'done' 章节的 'result' 为完整分析结果（同 analyze_stock）
+            
+        Example:
+            >>> for part in analyzer.stream_report("002115"):
+            ...     print(part['text'], flush=True)
+        """
+        started = time.perf_counter()
+        
+        def section(name: str, lines: List[str], **extra) -> Dict:
+            return {"section": name, "text": "\n".join(lines),
+                    "elapsed": round(time.perf_counter() - started, 3), **extra}
+        
+        stock_code, stock_name = self._resolve_stock(stock_code, stock_name)
+        use_ai = self._use_ai(use_ai)
+        yield section("header", self._format_header_lines(stock_code, stock_name or stock_code))
+        
+        key = self.cache.make_key(stock_code, kline_days, use_ai, full_diagnosis)
+        version = partial(self._data_version, stock_code, stock_name, full_diagnosis)
+        if use_cache:
+            cached, fresh = self.cache.lookup(key, version())
+            if fresh:
+                summary = cached['summary']
+                yield section("summary", self._format_summary_lines(summary),
+                              score=summary.get('overall_score'))
+                yield section("done", [], result=cached)
+                return
+        
+        timings = {}
+        executor = ThreadPoolExecutor(max_workers=FANOUT_WORKERS, thread_name_prefix="report")
+        try:
+            futures = {
+                submit_in_context(executor, self._fetch_technical, stock_code, kline_days,
+                                  timings, False): "technical",
+                submit_in_context(executor, self._fetch_diagnosis, stock_code, stock_name, full_diagnosis,
+                                  timings, False): "diagnosis",
+                submit_in_context(executor, self._fetch_news, stock_code, timings): "news",
+            }
+            data = {}
+            pending = set(futures)
+            while pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    data[futures[future]] = future.result()
+                    for name, lines, extra in self._ready_sections(futures[future], data):
+                        yield section(name, lines, **extra)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        kline_data, technical_result = data["technical"]
+        diagnosis = data["diagnosis"]
+        with self._stage(timings, 'summary'):
+            summary = self._generate_rule_based_summary(diagnosis, technical_result)
+        lines = self._format_summary_lines(summary)
+        if use_ai:
+            lines[0] = f"\n【初步评分（规则）】{summary['overall_score']:.1f} 分"
+        yield section("summary", lines, score=summary["overall_score"])
+        
+        if use_ai:
+            ai_summary = None
+            with self._stage(timings, 'ai'):
+                try:
+                    ai_summary = self._generate_ai_summary(diagnosis, technical_result)
+                except Exception as e:
+                    print(f"AI分析失败，使用规则评分: {e}")
+            if ai_summary:
+                summary = ai_summary
+                yield section("ai", self._format_summary_lines(summary), score=summary.get("overall_score"))
+            else:
+                yield section("ai", ["\n【AI分析】未能完成，以上规则评分为最终结果"])
+        
+        timings['total'] = time.perf_counter() - started
+        result = {
+            "stock_code": stock_code,
+            "stock_name": stock_name or stock_code,
+            "diagnosis": diagnosis,
+            "kline_data": kline_data,
+            "technical_analysis": technical_result,
+            "recent_news": data["news"],
+            "timings": timings,
+            "success": True,
+            "summary": summary,
+        }
+        if use_cache:
+            self.cache.put(key, result, version())
+        yield section("done", ["\n" + "=" * 80, "报告生成完成", "=" * 80], result=result)
+    
+    def _ready_sections(self, source: str, data: Dict) -> Iterator[Tuple]:
+        """
+        某个数据源返回后可以输出的章节
+        
+        Args:
+            source: 刚返回的数据源（technical / diagnosis / news）
+            data: 已返回的数据源结果
+        
+        Yields:
+            (章节名称, 文本行, 附加字段字典)
+        """
+        if source == "technical":
+            _, technical = data["technical"]
+            if not technical or "error" in technical:
+                yield "technical", ["\n【技术面】K线数据获取失败，暂无技术分析"], {}
+                return
+            points = {"key_points": [], "risks": [], "opportunities": []}
+            score = self._evaluate_technical(technical, points)
+            lines = [f"\n【技术面】{score:.1f} 分"] + self._format_point_lines(points)
+            yield "technical", lines + self._format_technical_lines(technical), {"score": score}
+        
+        elif source == "diagnosis":
+            diagnosis = data["diagnosis"]
+            if not diagnosis:
+                yield "fund", ["\n【资金面 / 基本面】问财诊股数据获取失败"], {}
+            else:
+                frame = build_metrics_frame({"": diagnosis})
+                for name, title, evaluate in (("fund", "资金面", self._evaluate_funds),
+                                              ("fundamental", "基本面", self._evaluate_fundamentals)):
+                    points = {"key_points": [], "risks": [], "opportunities": []}
+                    score = evaluate(frame, points)
+                    yield name, [f"\n【{title}】{score:.1f} 分"] + self._format_point_lines(points), {"score": score}
+        
+        # 消息面需要问财诊股和本地新闻都返回
+        if source in ("diagnosis", "news") and "diagnosis" in data and "news" in data:
+            diagnosis, recent_news = data["diagnosis"], data["news"]
+            lines = []
+            extra = {}
+            if diagnosis:
+                points = {"key_points": [], "risks": [], "opportunities": []}
+                extra["score"] = self._evaluate_news(diagnosis, points)
+                lines = [f"\n【消息面】{extra['score']:.1f} 分"] + self._format_point_lines(points)
+            else:
+                lines = ["\n【消息面】"]
+            if recent_news:
+                lines.append(f"\n【近5日新闻】共 {len(recent_news)} 条")
+                lines.extend(f"  {news.get('title', '')}" for news in recent_news[:5])
+            yield "news", lines, extra
+    
     def generate_report(self, analysis_result: Dict, detailed: bool = True) -> str:
         """
         生成分析报告
@@ -413,12 +905,37 @@ RSI指标:
         Returns:
             格式化的报告文本
         """
-        lines = []
-        lines.append("=" * 80)
-        lines.append(f"股票综合分析报告 - {analysis_result['stock_name']}({analysis_result['stock_code']})")
+        lines = self._format_header_lines(analysis_result['stock_code'], analysis_result['stock_name'])
+        lines.extend(self._format_summary_lines(analysis_result.get('summary', {})))
+        
+        # 详细技术分析
+        if detailed and analysis_result.get('technical_analysis'):
+            tech = analysis_result['technical_analysis']
+            if 'error' not in tech:
+                lines.append(f"\n{'=' * 80}")
+                lines.append("技术分析详情")
+                lines.append("=" * 80)
+                lines.extend(self._format_technical_lines(tech))
+        
+        lines.append("\n" + "=" * 80)
+        lines.append("报告生成完成")
         lines.append("=" * 80)
         
-        summary = analysis_result.get('summary', {})
+        return "\n".join(lines)
+    
+    @staticmethod
+    def _format_header_lines(stock_code: str, stock_name: str) -> List[str]:
+        """报告标题"""
+        return [
+            "=" * 80,
+            f"股票综合分析报告 - {stock_name}({stock_code})",
+            "=" * 80,
+        ]
+    
+    @staticmethod
+    def _format_summary_lines(summary: Dict) -> List[str]:
+        """综合评分、分项评分、要点、机会、风险和AI分析"""
+        lines = []
         
         # 综合评分
         lines.append(f"\n【综合评分】{summary.get('overall_score', 0):.1f} 分")
@@ -431,23 +948,7 @@ RSI指标:
             for name, score in summary['score_details'].items():
                 lines.append(f"  {name}: {score:.1f} 分")
 
-        # 关键要点
-        if summary.get('key_points'):
-            lines.append("\n【关键要点】")
-            for point in summary['key_points']:
-                lines.append(f"  {point}")
-
-        # 机会提示
-        if summary.get('opportunities'):
-            lines.append("\n【机会提示】")
-            for opp in summary['opportunities']:
-                lines.append(f"  {opp}")
-
-        # 风险提示
-        if summary.get('risks'):
-            lines.append("\n【风险提示】")
-            for risk in summary['risks']:
-                lines.append(f"  {risk}")
+        lines.extend(StockComprehensiveAnalyzer._format_point_lines(summary))
 
         # AI详细分析（如果有）
         if summary.get('ai_analysis'):
@@ -457,57 +958,61 @@ RSI指标:
         # 分析方式标注
         if summary.get('generated_by'):
             lines.append(f"\n[分析方式: {summary['generated_by']}]")
+        return lines
+    
+    @staticmethod
+    def _format_point_lines(summary: Dict) -> List[str]:
+        """关键要点、机会提示和风险提示"""
+        lines = []
+        for key, title in (('key_points', '关键要点'), ('opportunities', '机会提示'), ('risks', '风险提示')):
+            if summary.get(key):
+                lines.append(f"\n【{title}】")
+                for point in summary[key]:
+                    lines.append(f"  {point}")
+        return lines
+    
+    @staticmethod
+    def _format_technical_lines(tech: Dict) -> List[str]:
+        """技术分析详情：基本信息、均线、MACD、KDJ 和支撑压力位"""
+        lines = []
         
-        # 详细技术分析
-        if detailed and analysis_result.get('technical_analysis'):
-            tech = analysis_result['technical_analysis']
-            if 'error' not in tech:
-                lines.append(f"\n{'=' * 80}")
-                lines.append("技术分析详情")
-                lines.append("=" * 80)
-                
-                # 基本信息
-                basic = tech['basic_info']
-                lines.append(f"\n【基本信息】")
-                lines.append(f"  日期: {basic['date']}")
-                lines.append(f"  收盘价: {basic['close']} 元")
-                lines.append(f"  涨跌幅: {basic['change_pct']}%")
-                lines.append(f"  成交量: {basic['volume']:,} 手")
-                lines.append(f"  换手率: {basic['turnover_rate']}%")
-                
-                # 均线系统
-                ma = tech['technical_indicators']['ma']
-                lines.append(f"\n【均线系统】")
-                lines.append(f"  趋势: {ma['trend']}")
-                lines.append(f"  排列: {ma['alignment']}")
-                if 'ma5' in ma:
-                    lines.append(f"  MA5: {ma['ma5']:.2f}  MA10: {ma['ma10']:.2f}")
-                    lines.append(f"  MA20: {ma['ma20']:.2f}  MA60: {ma['ma60']:.2f}")
-                
-                # MACD
-                macd = tech['technical_indicators']['macd']
-                lines.append(f"\n【MACD】")
-                lines.append(f"  信号: {macd['signal']}")
-                if 'dif' in macd:
-                    lines.append(f"  DIF: {macd['dif']}  DEA: {macd['dea']}  HIST: {macd['hist']}")
-                
-                # KDJ
-                kdj = tech['technical_indicators']['kdj']
-                lines.append(f"\n【KDJ】")
-                lines.append(f"  信号: {kdj['signal']}")
-                if 'k' in kdj:
-                    lines.append(f"  K: {kdj['k']}  D: {kdj['d']}  J: {kdj['j']}")
-                
-                # 支撑压力位
-                sr = tech['support_resistance']
-                lines.append(f"\n【支撑压力位】")
-                lines.append(f"  当前价: {sr['current']} 元")
-                lines.append(f"  支撑位: {sr['support']} 元 (距离 {sr['support_distance']}%)")
-                lines.append(f"  压力位: {sr['resistance']} 元 (距离 {sr['resistance_distance']}%)")
-        
-        lines.append("\n" + "=" * 80)
-        lines.append("报告生成完成")
-        lines.append("=" * 80)
-        
-        return "\n".join(lines)
+        # 基本信息
+        basic = tech['basic_info']
+        lines.append(f"\n【基本信息】")
+        lines.append(f"  日期: {basic['date']}")
+        lines.append(f"  收盘价: {basic['close']} 元")
+        lines.append(f"  涨跌幅: {basic['change_pct']}%")
+        lines.append(f"  成交量: {basic['volume']:,} 手")
+        lines.append(f"  换手率: {basic['turnover_rate']}%")
+        
+        # 均线系统
+        ma = tech['technical_indicators']['ma']
+        lines.append(f"\n【均线系统】")
+        lines.append(f"  趋势: {ma['trend']}")
+        lines.append(f"  排列: {ma['alignment']}")
+        if 'ma5' in ma:
+            lines.append(f"  MA5: {ma['ma5']:.2f}  MA10: {ma['ma10']:.2f}")
+            lines.append(f"  MA20: {ma['ma20']:.2f}  MA60: {ma['ma60']:.2f}")
+        
+        # MACD
+        macd = tech['technical_indicators']['macd']
+        lines.append(f"\n【MACD】")
+        lines.append(f"  信号: {macd['signal']}")
+        if 'dif' in macd:
+            lines.append(f"  DIF: {macd['dif']}  DEA: {macd['dea']}  HIST: {macd['hist']}")
+        
+        # KDJ
+        kdj = tech['technical_indicators']['kdj']
+        lines.append(f"\n【KDJ】")
+        lines.append(f"  信号: {kdj['signal']}")
+        if 'k' in kdj:
+            lines.append(f"  K: {kdj['k']}  D: {kdj['d']}  J: {kdj['j']}")
+        
+        # 支撑压力位
+        sr = tech['support_resistance']
+        lines.append(f"\n【支撑压力位】")
+        lines.append(f"  当前价: {sr['current']} 元")
+        lines.append(f"  支撑位: {sr['support']} 元 (距离 {sr['support_distance']}%)")
+        lines.append(f"  压力位: {sr['resistance']} 元 (距离 {sr['resistance_distance']}%)")
+        return lines
 
@@ -0,0 +1,315 @@
+"""
+股票代码主表
+基于东方财富全市场股票列表构建本地缓存，提供 代码/名称/拼音缩写/secid 的 O(1) 解析
+"""
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .eastmoney_api import EastMoneyAPI
+
+try:
+    from pypinyin import lazy_pinyin, Style
+except ImportError:  # 未安装 pypinyin 时不建立拼音缩写索引
+    lazy_pinyin = None
+
+
+# 主表只需要的字段：代码、市场、名称
+MASTER_FIELDS = 'f12,f13,f14'
+
+# 刷新失败后的重试间隔（秒）
+REFRESH_RETRY_INTERVAL = 3600
+
+
+def guess_market(stock_code: str) -> str:
+    """
+    按代码规则推断东方财富市场代码（仅在主表中查不到时使用）
+
+    - 1: 上海（主板60、科创板688、B股900）
+    - 0: 深圳（主板000、中小板002、创业板30、B股200）和北交所（43/83/87/92）
+
+    Args:
+        stock_code: 6位股票代码
+
+    Returns:
+        市场代码 '0' 或 '1'
+    """
+    if stock_code.startswith('92'):
+        return '0'
+    if stock_code.startswith(('6', '9', '5')):
+        return '1'
+    return '0'
+
+
+def name_abbreviation(name: str) -> str:
+    """
+    获取股票名称的拼音首字母缩写，如 "三维通信" -> "SWTX"
+
+    Args:
+        name: 股票名称
+
+    Returns:
+        大写缩写，未安装 pypinyin 时返回空字符串
+    """
+    if lazy_pinyin is None or not name:
+        return ''
+    letters = ''.join(lazy_pinyin(name, style=Style.FIRST_LETTER))
+    return re.sub(r'[^0-9A-Za-z]', '', letters).upper()
+
+
+class SymbolMaster:
+    """股票代码主表，每个交易日最多从东方财富刷新一次（后台进行，查询只读本地数据）"""
+
+    def __init__(self, cache_file: str = "symbol_master.json", api: Optional[EastMoneyAPI] = None):
+        """
+        初始化代码主表
+
+        Args:
+            cache_file: 本地缓存文件路径
+            api: 东方财富 API 实例，默认在需要刷新时创建
+        """
+        self.cache_file = Path(cache_file)
+        self._api = api
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._last_attempt = 0.0
+        self._refresh_thread: Optional[threading.Thread] = None
+
+        self.updated: Optional[str] = None
+        self._by_code: Dict[str, Dict] = {}
+        self._by_name: Dict[str, str] = {}
+        self._by_abbr: Dict[str, List[str]] = {}
+
+    @property
+    def api(self) -> EastMoneyAPI:
+        if self._api is None:
+            self._api = EastMoneyAPI()
+        return self._api
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self._by_code)
+
+    def _build_index(self, symbols: List[Dict]):
+        """根据股票列表重建哈希索引"""
+        by_code, by_name, by_abbr = {}, {}, {}
+        for symbol in symbols:
+            code = symbol['code']
+            by_code[code] = symbol
+            by_name[symbol['name']] = code
+            if symbol.get('abbr'):
+                by_abbr.setdefault(symbol['abbr'], []).append(code)
+        self._by_code, self._by_name, self._by_abbr = by_code, by_name, by_abbr
+
+    def load_rows(self, rows: List[Dict], updated: Optional[str] = None):
+        """
+        从东方财富行情列表构建主表
+
+        Args:
+            rows: get_market_snapshot 返回的列表，需包含 f12、f13、f14
+            updated: 数据日期，默认为今天
+        """
+        symbols = []
+        for row in rows:
+            code = str(row.get('f12', ''))
+            name = str(row.get('f14', '')).replace(' ', '')
+            if not code or not name:
+                continue
+            market = str(row.get('f13', guess_market(code)))
+            symbols.append({
+                'code': code,
+                'name': name,
+                'market': market,
+                'secid': f"{market}.{code}",
+                'abbr': name_abbreviation(name),
+            })
+
+        self._build_index(symbols)
+        self.updated = updated or date.today().isoformat()
+        self._loaded = True
+
+    def _load_cache(self) -> bool:
+        """从本地缓存文件加载"""
+        try:
+            content = json.loads(self.cache_file.read_text(encoding='utf-8'))
+        except (json.JSONDecodeError, FileNotFoundError):
+            return False
+        self._build_index(content.get('symbols', []))
+        self.updated = content.get('updated')
+        return bool(self._by_code)
+
+    def _save_cache(self):
+        """原子写入本地缓存文件"""
+        content = json.dumps({'updated': self.updated, 'symbols': list(self._by_code.values())},
+                             ensure_ascii=False)
+        directory = self.cache_file.parent
+        directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=self.cache_file.name, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, self.cache_file)
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        从东方财富刷新主表（当天已刷新过则跳过）
+
+        Args:
+            force: 是否强制刷新
+
+        Returns:
+            主表是否为当天的数据
+        """
+        today = date.today().isoformat()
+        if not force and self.updated == today:
+            return True
+
+        self._last_attempt = time.time()
+        rows = self.api.get_market_snapshot(fields=MASTER_FIELDS)
+        if not rows:
+            return False
+
+        self.load_rows(rows, today)
+        try:
+            self._save_cache()
+        except OSError as e:
+            print(f"保存代码主表失败: {e}")
+        return True
+
+    def refresh_in_background(self, force: bool = False) -> bool:
+        """
+        在后台线程刷新主表（服务启动时调用），同时只运行一个刷新任务
+
+        Args:
+            force: 是否忽略当天已刷新和失败重试间隔
+
+        Returns:
+            是否启动了新的刷新线程
+        """
+        self._load_local()
+        with self._lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return False
+            if not force and (self.updated == date.today().isoformat() or
+                              time.time() - self._last_attempt < REFRESH_RETRY_INTERVAL):
+                return False
+            self._last_attempt = time.time()
+            self._refresh_thread = threading.Thread(target=self._refresh_quietly, args=(force,),
+                                                    name="symbol-master-refresh", daemon=True)
+            self._refresh_thread.start()
+        return True
+
+    def _refresh_quietly(self, force: bool):
+        try:
+            if not self.refresh(force):
+                print("刷新代码主表失败，继续使用本地缓存")
+        except Exception as e:
+            print(f"刷新代码主表失败: {e}")
+
+    def _load_local(self):
+        """首次使用时加载本地缓存文件"""
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._load_cache()
+                    self._loaded = True
+
+    def _ensure_loaded(self):
+        """加载本地缓存；缓存不是当天的数据时在后台刷新，查询本身不发起网络请求"""
+        self._load_local()
+        if self.updated != date.today().isoformat():
+            self.refresh_in_background()
+
+    def resolve(self, query: str) -> Optional[Dict]:
+        """
+        解析股票代码、名称、拼音缩写或 secid
+
+        Args:
+            query: 如 "002115"、"三维通信"、"SWTX"、"0.002115"
+
+        只查本地主表；拼音缩写对应多只股票时无法确定，返回 None（用 find_by_abbr 查看候选）
+
+        Returns:
+            股票信息字典 {'code', 'name', 'market', 'secid', 'abbr'}，找不到或有歧义返回 None
+        """
+        self._ensure_loaded()
+        query = query.strip()
+
+        symbol = self._by_code.get(query)
+        if symbol:
+            return symbol
+
+        if '.' in query:
+            symbol = self._by_code.get(query.split('.', 1)[1])
+            if symbol:
+                return symbol
+
+        code = self._by_name.get(query.replace(' ', ''))
+        if code:
+            return self._by_code[code]
+
+        codes = self._by_abbr.get(query.upper())
+        if codes and len(codes) == 1:
+            return self._by_code[codes[0]]
+
+        return None
+
+    def get_secid(self, stock_code: str) -> str:
+        """
+        获取 secid（市场代码.股票代码）
+
+        Args:
+            stock_code: 股票代码
+
+        Returns:
+            secid 字符串，如 "0.002115"
+        """
+        symbol = self.resolve(stock_code)
+        if symbol:
+            return symbol['secid']
+        return f"{guess_market(stock_code)}.{stock_code}"
+
+    def get_name(self, stock_code: str) -> Optional[str]:
+        """
+        获取股票名称
+
+        Args:
+            stock_code: 股票代码
+
+        Returns:
+            股票名称，找不到返回 None
+        """
+        symbol = self.resolve(stock_code)
+        return symbol['name'] if symbol else None
+
+    def find_by_abbr(self, abbr: str) -> List[Dict]:
+        """
+        按拼音缩写查找所有匹配的股票
+
+        Args:
+            abbr: 拼音缩写，如 "PAYH"
+
+        Returns:
+            股票信息列表
+        """
+        self._ensure_loaded()
+        return [self._by_code[code] for code in self._by_abbr.get(abbr.upper(), [])]
+
+    def symbols(self) -> List[Dict]:
+        """
+        获取全部股票
+
+        Returns:
+            股票信息列表
+        """
+        self._ensure_loaded()
+        return list(self._by_code.values())
+
+
+# 创建全局实例
+symbol_master = SymbolMaster()
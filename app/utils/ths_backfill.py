@@ -0,0 +1,255 @@
+"""
+涨停雷达历史回补
+并发翻页抓取 mrnxgg_list 的历史列表页，按检查点断点续传，批量写入本地新闻库
+"""
+import asyncio
+import json
+import os
+import re
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+import httpx
+from lxml import etree
+
+from .news_fetcher import ArticleFetcher, REQUEST_HEADERS, detect_encoding
+from .news_store import NewsStore, news_store
+from .rate_limiter import RateLimiter, get_rate_limiter
+from .ths_crawler import THSCrawler, NEWS_FIELDS
+
+
+# 历史列表页地址，第 1 页为 LIMIT_UP_RADAR_URL 本身
+PAGE_URL = THSCrawler.LIMIT_UP_RADAR_URL + 'index_{page}.shtml'
+
+# 新闻链接中的日期，如 https://news.10jqka.com.cn/20240119/c652301234.shtml
+_URL_DATE = re.compile(r'/(\d{8})/')
+
+# 默认回补一年
+DEFAULT_DAYS = 365
+
+# 连续失败多少个页面后停止本次回补
+MAX_CONSECUTIVE_FAILURES = 5
+
+
+def published_at(news: Dict[str, str]) -> Optional[float]:
+    """
+    根据新闻链接中的日期和列表页上的时间推算发布时间
+
+    Args:
+        news: 涨停雷达新闻条目
+
+    Returns:
+        时间戳，无法推算返回 None
+    """
+    match = _URL_DATE.search(news.get('url', ''))
+    if not match:
+        return None
+    text = match.group(1)
+    clock = re.search(r'(\d{1,2}):(\d{2})', news.get('time', ''))
+    if clock:
+        text += f" {int(clock.group(1)):02d}:{clock.group(2)}"
+    try:
+        return datetime.strptime(text, '%Y%m%d %H:%M' if clock else '%Y%m%d').timestamp()
+    except ValueError:
+        return None
+
+
+class BackfillCrawler:
+    """涨停雷达历史回补爬虫（可中断、可续传）"""
+
+    def __init__(self, store: NewsStore = news_store,
+                 checkpoint_file: str = "ths_backfill_checkpoint.json",
+                 concurrency: int = 4, limiter: Optional[RateLimiter] = None,
+                 fetch_bodies: bool = False, timeout: float = 15.0,
+                 client: Optional[httpx.AsyncClient] = None,
+                 max_failures: int = MAX_CONSECUTIVE_FAILURES):
+        """
+        初始化回补爬虫
+
+        Args:
+            store: 新闻存储
+            checkpoint_file: 检查点文件路径
+            concurrency: 同时抓取的列表页数
+            limiter: 限速器，默认与 THSCrawler 共享 "10jqka" 限速
+            fetch_bodies: 是否同时下载新闻正文（请求数会多出一倍以上）
+            timeout: 单页请求超时（秒）
+            client: 自定义 httpx.AsyncClient
+            max_failures: 连续失败多少个页面后停止本次回补（检查点保留，下次运行重试）
+        """
+        self.store = store
+        self.checkpoint_file = Path(checkpoint_file)
+        self.concurrency = max(1, concurrency)
+        self.limiter = limiter or get_rate_limiter('10jqka')
+        self.fetch_bodies = fetch_bodies
+        self.timeout = timeout
+        self.client = client
+        self.max_failures = max(1, max_failures)
+
+    def load_checkpoint(self) -> Dict:
+        """
+        读取检查点
+
+        Returns:
+            {'next_page': 下一个未完成的页码, 'done_pages': 已完成的更大页码,
+             'end_page': 已知的最后一页（超过截止日期或没有更多内容）, 'finished': 是否已完成,
+             'saved': 已写入条数, 'until': 回补截止日期}
+        """
+        try:
+            return json.loads(self.checkpoint_file.read_text())
+        except (OSError, json.JSONDecodeError):
+            return {'next_page': 1, 'done_pages': [], 'finished': False, 'saved': 0}
+
+    def _save_checkpoint(self, checkpoint: Dict):
+        """原子写入检查点"""
+        directory = self.checkpoint_file.parent
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=self.checkpoint_file.name, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(json.dumps(checkpoint, ensure_ascii=False, indent=2))
+            os.replace(tmp_path, self.checkpoint_file)
+        except OSError as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            print(f"保存回补检查点失败: {e}")
+
+    @staticmethod
+    def page_url(page: int) -> str:
+        """获取第 page 页的地址"""
+        return THSCrawler.LIMIT_UP_RADAR_URL if page == 1 else PAGE_URL.format(page=page)
+
+    async def _fetch_page(self, client: httpx.AsyncClient, page: int) -> Optional[List[Dict]]:
+        """
+        抓取并解析一个列表页
+
+        Returns:
+            新闻列表（可能为空，表示已到最后一页），请求失败返回 None
+        """
+        await self.limiter.acquire_async()
+        try:
+            resp = await client.get(self.page_url(page), timeout=self.timeout)
+            if resp.status_code == 404:
+                return []
+            resp.raise_for_status()
+        except httpx.HTTPError as e:
+            print(f"抓取第 {page} 页失败: {e}")
+            return None
+
+        parser = etree.HTMLParser(encoding=detect_encoding(resp.content, resp.charset_encoding))
+        html = etree.HTML(resp.content, parser=parser)
+        if html is None:
+            return []
+        news_list = list(THSCrawler.iter_news(html, NEWS_FIELDS))
+        for news in news_list:
+            news['published_at'] = published_at(news)
+        return news_list
+
+    @staticmethod
+    def _advance(checkpoint: Dict, done: Set[int]):
+        """把连续完成的页码并入 next_page，最后一页之前没有缺页时标记为完成"""
+        pages = set(checkpoint['done_pages']) | done
+        while checkpoint['next_page'] in pages:
+            pages.discard(checkpoint['next_page'])
+            checkpoint['next_page'] += 1
+        end_page = checkpoint.get('end_page')
+        if end_page is not None:
+            pages = {p for p in pages if p <= end_page}
+            checkpoint['finished'] = checkpoint['next_page'] > end_page
+        checkpoint['done_pages'] = sorted(pages)
+
+    async def run_async(self, days: int = DEFAULT_DAYS, max_pages: Optional[int] = None,
+                        resume: bool = True) -> Dict:
+        """
+        回补历史列表，直到超过截止日期、到达最后一页或达到 max_pages
+
+        每抓完一批页面就写入新闻库并保存检查点；中断后以 resume=True 重新运行，
+        会跳过已完成的页面继续抓取。失败的页面不计入完成，在本次运行中重试，
+        连续失败 max_failures 个页面后停止；到达最后一页但之前仍有缺页时不算完成，
+        下次运行只重新抓取这些缺页。
+
+        Args:
+            days: 回补最近多少天
+            max_pages: 最多抓取到第几页
+            resume: 是否从检查点继续
+
+        Returns:
+            最终的检查点
+        """
+        checkpoint = self.load_checkpoint() if resume else {}
+        if not checkpoint or checkpoint.get('finished') or not resume:
+            checkpoint = {'next_page': 1, 'done_pages': [], 'finished': False, 'saved': 0}
+        checkpoint.setdefault('until', (date.today() - timedelta(days=days)).isoformat())
+        until = datetime.fromisoformat(checkpoint['until']).timestamp()
+
+        client = self.client or httpx.AsyncClient(headers=REQUEST_HEADERS, follow_redirects=True)
+        fetcher = ArticleFetcher(self.store, self.limiter, self.concurrency, self.timeout, client)
+        started = time.monotonic()
+        failures = 0
+        try:
+            while not checkpoint['finished']:
+                last = min((p for p in (checkpoint.get('end_page'), max_pages) if p is not None), default=None)
+                batch, page = [], checkpoint['next_page']
+                while len(batch) < self.concurrency and (last is None or page <= last):
+                    if page not in checkpoint['done_pages']:
+                        batch.append(page)
+                    page += 1
+                if not batch:
+                    break
+
+                results = await asyncio.gather(*(self._fetch_page(client, p) for p in batch))
+                done, articles, end_pages = set(), [], []
+                for p, news_list in zip(batch, results):
+                    if news_list is None:
+                        continue
+                    done.add(p)
+                    if not news_list:
+                        end_pages.append(p - 1)
+                        continue
+                    articles.extend(news_list)
+                    oldest = [n['published_at'] for n in news_list if n['published_at']]
+                    if oldest and min(oldest) < until:
+                        end_pages.append(p)
+                failures = 0 if done else failures + len(batch)
+
+                articles = [n for n in articles if not n['published_at'] or n['published_at'] >= until]
+                checkpoint['saved'] += self.store.save_many(articles)
+                if self.fetch_bodies and articles:
+                    await fetcher.fetch_async(articles)
+
+                if end_pages:
+                    checkpoint['end_page'] = min(end_pages + [checkpoint.get('end_page') or end_pages[0]])
+                self._advance(checkpoint, done)
+                self._save_checkpoint(checkpoint)
+                print(f"回补进度: 已完成到第 {checkpoint['next_page'] - 1} 页，"
+                      f"累计写入 {checkpoint['saved']} 条，用时 {time.monotonic() - started:.0f} 秒")
+                if failures >= self.max_failures:
+                    print(f"连续 {failures} 个页面抓取失败，停止回补，下次运行从第 {checkpoint['next_page']} 页重试")
+                    break
+        finally:
+            if self.client is None:
+                await client.aclose()
+        return checkpoint
+
+    def run(self, days: int = DEFAULT_DAYS, max_pages: Optional[int] = None, resume: bool = True) -> Dict:
+        """
+        同步入口，参数同 run_async
+
+        Example:
+            >>> BackfillCrawler(fetch_bodies=True).run(days=365)
+        """
+        return asyncio.run(self.run_async(days, max_pages, resume))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="涨停雷达历史回补")
+    parser.add_argument("--days", type=int, default=DEFAULT_DAYS, help="回补最近多少天")
+    parser.add_argument("--max-pages", type=int, help="最多抓取到第几页")
+    parser.add_argument("--bodies", action="store_true", help="同时下载新闻正文")
+    parser.add_argument("--restart", action="store_true", help="忽略检查点，从第一页重新开始")
+    args = parser.parse_args()
+
+    BackfillCrawler(fetch_bodies=args.bodies).run(args.days, args.max_pages, resume=not args.restart)
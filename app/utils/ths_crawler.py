@@ -2,10 +2,27 @@
 同花顺涨停雷达爬虫
 爬取涨停雷达页面并提取相关信息
 """
+import json
+import os
+import tempfile
+import threading
+import time
 import requests
+from pathlib import Path
 from lxml import etree
-from typing import List, Dict, Optional
+from typing import Iterable, Iterator, List, Dict, Optional
 from .cookie_manager import CookieManager
+from .instrumentation import CACHE_HIT, CACHE_MISS, metrics
+from .rate_limiter import get_rate_limiter
+from .trading_calendar import is_trading_time
+
+
+# 新闻字段：BASIC_FIELDS 为列表页的基本信息，NEWS_FIELDS 额外包含内容摘要
+BASIC_FIELDS = ('time', 'title', 'data_seq', 'url')
+NEWS_FIELDS = BASIC_FIELDS + ('content',)
+
+# 预编译的新闻条目 XPath
+_NEWS_ITEMS = etree.XPath('//div[@class="list-con"]//ul/li')
 
 
 class THSCrawler:
@@ -23,45 +40,82 @@ class THSCrawler:
         'Connection': 'keep-alive',
     }
     
-    def __init__(self, cookie_file: str = "ths_cookies.json"):
+    def __init__(self, cookie_file: str = "ths_cookies.json",
+                 state_file: str = "ths_crawl_state.json"):
         """
         初始化同花顺爬虫
         
         Args:
             cookie_file: cookie 存储文件路径
+            state_file: 增量抓取状态文件路径（已见过的最大 data_seq 和缓存校验头）
         """
         self.cookie_manager = CookieManager(cookie_file)
+        self.state_file = Path(state_file)
+        self._state_lock = threading.Lock()
+        self._state: Optional[Dict] = None
     
-    def _make_request(self, url: str, custom_cookie: Optional[str] = None) -> Optional[str]:
+    def _send(self, url: str, custom_cookie: Optional[str] = None,
+              extra_headers: Optional[Dict[str, str]] = None) -> Optional[requests.Response]:
         """
-        发起 HTTP 请求
+        发起 HTTP 请求并记录 cookie 的使用结果
         
         Args:
             url: 请求 URL
             custom_cookie: 自定义 cookie，如果不提供则从 cookie 管理器获取
+            extra_headers: 额外的请求头（如条件请求头）
         
         Returns:
-            页面 HTML 内容，如果请求失败返回 None
+            响应对象（可能是 304），如果请求失败返回 None
         """
         # 准备 headers
         headers = self.DEFAULT_HEADERS.copy()
+        if extra_headers:
+            headers.update(extra_headers)
         
         # 获取 cookie
         cookie = custom_cookie if custom_cookie else self.cookie_manager.get_cookie()
         if cookie:
             headers['Cookie'] = cookie
         
-        try:
-            resp = requests.get(url, headers=headers, timeout=15)
-            resp.raise_for_status()
-            resp.encoding = 'utf-8'  # 设置编码
-            return resp.text
-        except requests.RequestException as e:
-            # 如果请求失败且使用了 cookie，则删除该 cookie
-            if cookie and not custom_cookie:
-                self.cookie_manager.remove_cookie(cookie)
-            print(f"请求失败: {e}")
-            return None
+        with metrics.span('ths.request') as span:
+            # 与正文抓取共享同花顺的限速（等待时间计入 span 的排队时间）
+            get_rate_limiter('10jqka').acquire()
+            
+            started = time.perf_counter()
+            try:
+                resp = requests.get(url, headers=headers, timeout=15)
+                span.bytes = len(resp.content)
+                resp.raise_for_status()
+                resp.encoding = 'utf-8'  # 设置编码
+            except requests.RequestException as e:
+                span.error = type(e).__name__
+                # 如果请求失败且使用了 cookie，则记录失败：401/403 视为 cookie 失效，其余进入冷却
+                if cookie and not custom_cookie:
+                    status = getattr(getattr(e, 'response', None), 'status_code', None)
+                    self.cookie_manager.report_failure(cookie, transient=status not in (401, 403))
+                print(f"请求失败: {e}")
+                return None
+            if extra_headers:
+                # 条件请求：304 表示页面未变化
+                span.cache = CACHE_HIT if resp.status_code == 304 else CACHE_MISS
+        
+        if cookie and not custom_cookie:
+            self.cookie_manager.report_success(cookie, time.perf_counter() - started)
+        return resp
+    
+    def _make_request(self, url: str, custom_cookie: Optional[str] = None) -> Optional[str]:
+        """
+        发起 HTTP 请求
+        
+        Args:
+            url: 请求 URL
+            custom_cookie: 自定义 cookie，如果不提供则从 cookie 管理器获取
+        
+        Returns:
+            页面 HTML 内容，如果请求失败返回 None
+        """
+        resp = self._send(url, custom_cookie)
+        return resp.text if resp is not None else None
     
     def get_limit_up_news(self, cookie: Optional[str] = None) -> List[Dict[str, str]]:
         """
@@ -79,136 +133,203 @@ class THSCrawler:
             >>> for news in news_list:
             >>>     print(f"{news['time']} - {news['title']}")
         """
-        # 请求页面
-        html_content = self._make_request(self.LIMIT_UP_RADAR_URL, cookie)
-        if not html_content:
-            return []
-        
-        # 解析 HTML
-        try:
-            html = etree.HTML(html_content)
-            return self._parse_news_list(html)
-        except Exception as e:
-            print(f"HTML 解析失败: {e}")
-            return []
+        return self.fetch_limit_up_news(cookie, fields=BASIC_FIELDS)
     
-    def _parse_news_list(self, html: etree._Element) -> List[Dict[str, str]]:
+    def get_limit_up_news_with_content(self, cookie: Optional[str] = None) -> List[Dict[str, str]]:
         """
-        解析新闻列表
+        获取涨停雷达新闻列表（包含内容摘要）
         
         Args:
-            html: lxml 解析后的 HTML 元素
+            cookie: 自定义 cookie，可选
         
         Returns:
-            新闻列表
+            新闻列表，每个元素包含 time、title、data_seq、url、content（内容摘要）
         """
-        news_list = []
-        
-        # XPath 提取所有新闻条目
-        news_items = html.xpath('//div[@class="list-con"]//ul/li')
-        
-        for item in news_items:
-            try:
-                # 提取时间 - 在 span.arc-title 下的 span 标签中
-                time_elements = item.xpath('.//span[@class="arc-title"]/span/text()')
-                time = time_elements[0].strip() if time_elements else ""
-                
-                # 提取标题和 data-seq - 在 span.arc-title 下的 a 标签中
-                title_links = item.xpath('.//span[@class="arc-title"]/a[@class="news-link"]')
-                if not title_links:
-                    continue
-                
-                title_link = title_links[0]
-                title = title_link.get('title', '').strip()
-                data_seq = title_link.get('data-seq', '').strip()
-                url = title_link.get('href', '').strip()
-                
-                # 如果关键字段都存在，则添加到列表
-                if time and title and data_seq:
-                    news_list.append({
-                        'time': time,
-                        'title': title,
-                        'data_seq': data_seq,
-                        'url': url
-                    })
-            except Exception as e:
-                print(f"解析单个新闻条目失败: {e}")
-                continue
-        
-        return news_list
+        return self.fetch_limit_up_news(cookie, fields=NEWS_FIELDS)
     
-    def get_limit_up_news_with_content(self, cookie: Optional[str] = None) -> List[Dict[str, str]]:
+    def fetch_limit_up_news(self, cookie: Optional[str] = None,
+                            fields: Iterable[str] = NEWS_FIELDS) -> List[Dict[str, str]]:
         """
-        获取涨停雷达新闻列表（包含内容摘要）
+        请求一次涨停雷达页面并解析出指定字段
         
         Args:
             cookie: 自定义 cookie，可选
+            fields: 需要的字段，可选 time、title、data_seq、url、content
         
         Returns:
-            新闻列表，每个元素包含 time、title、data_seq、url、content（内容摘要）
+            新闻列表（从新到旧），请求或解析失败返回空列表
         """
-        # 请求页面
         html_content = self._make_request(self.LIMIT_UP_RADAR_URL, cookie)
         if not html_content:
             return []
         
-        # 解析 HTML
         try:
-            html = etree.HTML(html_content)
-            return self._parse_news_list_with_content(html)
+            return list(self.iter_news(etree.HTML(html_content), fields))
         except Exception as e:
             print(f"HTML 解析失败: {e}")
             return []
     
-    def _parse_news_list_with_content(self, html: etree._Element) -> List[Dict[str, str]]:
+    @staticmethod
+    def _seq_value(data_seq: str) -> Optional[int]:
+        """data_seq 转为整数用于比较，无法转换时返回 None"""
+        try:
+            return int(data_seq)
+        except (TypeError, ValueError):
+            return None
+    
+    @staticmethod
+    def iter_news(html: etree._Element, fields: Iterable[str] = NEWS_FIELDS) -> Iterator[Dict[str, str]]:
         """
-        解析新闻列表（包含内容摘要）
+        按页面顺序（从新到旧）逐条解析新闻，调用方可以随时停止
+        
+        每个 <li> 只遍历一次子元素，同时取出时间、标题链接和内容摘要；
+        time、title、data_seq 缺失的条目会被跳过。
         
         Args:
             html: lxml 解析后的 HTML 元素
+            fields: 需要的字段
         
-        Returns:
-            新闻列表
+        Yields:
+            只包含 fields 中字段的新闻字典
+        """
+        fields = tuple(fields)
+        want_content = 'content' in fields
+        
+        for item in _NEWS_ITEMS(html):
+            news_time = title_link = content = None
+            for element in item.iter('span', 'a'):
+                parent = element.getparent()
+                in_title = parent is not None and parent.get('class') == 'arc-title'
+                if element.tag == 'span':
+                    if in_title and news_time is None:
+                        news_time = (element.text or '').strip()
+                elif element.get('class') == 'news-link':
+                    if in_title and title_link is None:
+                        title_link = element
+                elif want_content and content is None and element.get('class') == 'arc-cont news-link':
+                    content = (element.text or '').strip()
+            
+            if title_link is None:
+                continue
+            
+            news = {
+                'time': news_time or '',
+                'title': title_link.get('title', '').strip(),
+                'data_seq': title_link.get('data-seq', '').strip(),
+                'url': title_link.get('href', '').strip(),
+                'content': content or '',
+            }
+            if news['time'] and news['title'] and news['data_seq']:
+                yield {field: news[field] for field in fields}
+    
+    def _load_state(self) -> Dict:
+        """读取增量抓取状态（首次调用时从文件加载）"""
+        if self._state is None:
+            try:
+                self._state = json.loads(self.state_file.read_text())
+            except (OSError, json.JSONDecodeError):
+                self._state = {}
+        return self._state
+    
+    def _save_state(self):
+        """原子写入增量抓取状态"""
+        directory = self.state_file.parent
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=self.state_file.name, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(json.dumps(self._state, ensure_ascii=False, indent=2))
+            os.replace(tmp_path, self.state_file)
+        except OSError as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            print(f"保存抓取状态失败: {e}")
+    
+    def get_new_limit_up_news(self, cookie: Optional[str] = None,
+                              with_content: bool = False) -> List[Dict[str, str]]:
         """
-        news_list = []
+        增量获取涨停雷达新闻，只返回上次调用之后新出现的条目
         
-        # XPath 提取所有新闻条目
-        news_items = html.xpath('//div[@class="list-con"]//ul/li')
+        带 If-None-Match / If-Modified-Since 发起条件请求，页面未变化（304）时不解析；
+        解析时遇到已见过的 data_seq 立即停止。已见过的最大 data_seq 持久化在
+        state_file 中，进程重启后继续增量。首次调用返回当前页面的全部新闻。
         
-        for item in news_items:
+        Args:
+            cookie: 自定义 cookie，可选
+            with_content: 是否包含内容摘要
+        
+        Returns:
+            新增的新闻列表（从新到旧），没有新内容或请求失败时返回空列表
+            
+        Example:
+            >>> crawler = THSCrawler()
+            >>> for news in crawler.get_new_limit_up_news():
+            >>>     print(f"{news['time']} - {news['title']}")
+        """
+        with self._state_lock:
+            state = self._load_state()
+            headers = {}
+            if state.get('etag'):
+                headers['If-None-Match'] = state['etag']
+            if state.get('last_modified'):
+                headers['If-Modified-Since'] = state['last_modified']
+            
+            resp = self._send(self.LIMIT_UP_RADAR_URL, cookie, headers)
+            if resp is None or resp.status_code == 304 or not resp.text:
+                return []
+            
+            # 没有记录过 last_seq（首次调用或重置后）时页面上的条目全部算新
+            last_seq = state.get('last_seq')
+            new_items, max_seq = [], last_seq
             try:
-                # 提取时间
-                time_elements = item.xpath('.//span[@class="arc-title"]/span/text()')
-                time = time_elements[0].strip() if time_elements else ""
-                
-                # 提取标题和 data-seq
-                title_links = item.xpath('.//span[@class="arc-title"]/a[@class="news-link"]')
-                if not title_links:
-                    continue
-                
-                title_link = title_links[0]
-                title = title_link.get('title', '').strip()
-                data_seq = title_link.get('data-seq', '').strip()
-                url = title_link.get('href', '').strip()
-                
-                # 提取内容摘要
-                content_elements = item.xpath('.//a[@class="arc-cont news-link"]/text()')
-                content = content_elements[0].strip() if content_elements else ""
-                
-                # 如果关键字段都存在，则添加到列表
-                if time and title and data_seq:
-                    news_list.append({
-                        'time': time,
-                        'title': title,
-                        'data_seq': data_seq,
-                        'url': url,
-                        'content': content
-                    })
+                html = etree.HTML(resp.text)
+                fields = NEWS_FIELDS if with_content else BASIC_FIELDS
+                for news in self.iter_news(html, fields):
+                    seq = self._seq_value(news['data_seq'])
+                    if seq is None:
+                        # data_seq 格式异常的条目无法判断新旧，跳过
+                        continue
+                    if last_seq is not None and seq <= last_seq:
+                        break
+                    new_items.append(news)
+                    max_seq = seq if max_seq is None else max(max_seq, seq)
             except Exception as e:
-                print(f"解析单个新闻条目失败: {e}")
-                continue
+                print(f"HTML 解析失败: {e}")
+                return []
+            
+            # 页面解析成功后才记录缓存校验信息，否则下次条件请求会得到 304 而不再读取页面
+            if max_seq is not None:
+                state['last_seq'] = max_seq
+            state['etag'] = resp.headers.get('ETag')
+            state['last_modified'] = resp.headers.get('Last-Modified')
+            self._save_state()
+            return new_items
+    
+    def watch_limit_up_news(self, interval: float = 5.0, with_content: bool = False,
+                            trading_hours_only: bool = True,
+                            stop_event: Optional[threading.Event] = None) -> Iterator[Dict[str, str]]:
+        """
+        轮询涨停雷达，逐条返回新出现的新闻（从旧到新）
         
-        return news_list
+        Args:
+            interval: 轮询间隔（秒）
+            with_content: 是否包含内容摘要
+            trading_hours_only: 是否只在交易时段请求
+            stop_event: 设置后停止轮询
+        
+        Yields:
+            新闻字典
+        """
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            if not trading_hours_only or is_trading_time():
+                yield from reversed(self.get_new_limit_up_news(with_content=with_content))
+            stop_event.wait(interval)
+    
+    def reset_incremental_state(self):
+        """清除增量抓取状态，下次调用返回当前页面的全部新闻"""
+        with self._state_lock:
+            self._state = {}
+            self._save_state()
     
     def add_cookie(self, cookie: str):
         """
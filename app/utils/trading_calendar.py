@@ -0,0 +1,83 @@
+"""
+A股交易时间工具
+提供交易日、交易时段和交易会话的判断
+"""
+from datetime import datetime, date, time, timedelta
+from typing import Optional, Set
+
+
+# 交易时段（含集合竞价）
+MORNING_OPEN = time(9, 15)
+MORNING_CLOSE = time(11, 30)
+AFTERNOON_OPEN = time(13, 0)
+AFTERNOON_CLOSE = time(15, 0)
+
+# 法定节假日休市日期，按需补充，如 {date(2025, 10, 1)}
+HOLIDAYS: Set[date] = set()
+
+
+def is_trading_day(day: date) -> bool:
+    """
+    判断是否为交易日（周一至周五且不在休市日期中）
+
+    Args:
+        day: 日期
+
+    Returns:
+        是否为交易日
+    """
+    return day.weekday() < 5 and day not in HOLIDAYS
+
+
+def is_trading_time(now: Optional[datetime] = None) -> bool:
+    """
+    判断当前是否处于交易时段
+
+    Args:
+        now: 当前时间，默认为 datetime.now()
+
+    Returns:
+        是否处于交易时段
+    """
+    now = now or datetime.now()
+    if not is_trading_day(now.date()):
+        return False
+
+    current = now.time()
+    return (MORNING_OPEN <= current <= MORNING_CLOSE or
+            AFTERNOON_OPEN <= current <= AFTERNOON_CLOSE)
+
+
+def previous_trading_day(day: date) -> date:
+    """
+    获取指定日期之前最近的一个交易日
+
+    Args:
+        day: 日期
+
+    Returns:
+        上一个交易日
+    """
+    day -= timedelta(days=1)
+    while not is_trading_day(day):
+        day -= timedelta(days=1)
+    return day
+
+
+def trading_session(now: Optional[datetime] = None) -> date:
+    """
+    获取当前时间所属的交易会话日期
+
+    开盘前和非交易日归属于上一个交易日，开盘后归属于当天。
+
+    Args:
+        now: 当前时间，默认为 datetime.now()
+
+    Returns:
+        交易会话对应的日期
+    """
+    now = now or datetime.now()
+    today = now.date()
+    if is_trading_day(today) and now.time() >= MORNING_OPEN:
+        return today
+    return previous_trading_day(today)
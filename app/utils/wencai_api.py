@@ -3,15 +3,36 @@
 用于查询个股的详细诊股信息
 """
 
+import random
+import time
 import pywencai
-import json
-import pandas as pd
-from typing import Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+from .wencai_cache import WenCaiCache, BATCH_SECTION
+from .wencai_data import LazyDiagnosis, LazyTable, materialize, render_value
+from .news_store import news_store
+from .instrumentation import CACHE_HIT, CACHE_MISS, metrics
+
+
+# 批量查询的默认并发数、单次超时（秒）和重试次数
+BATCH_MAX_WORKERS = 4
+BATCH_TIMEOUT = 30
+BATCH_RETRIES = 2
+
+# 多股票批量查询的指标和每次查询的股票数（问财单页最多返回100行）
+BATCH_INDICATORS = (
+    '5日主力资金净流入', '20日主力资金净流入', '北向持股比例变化',
+    '市盈率', '市净率', '净资产收益率', '营业收入同比增长率', '前十大股东持股比例合计',
+)
+BATCH_CHUNK_SIZE = 50
 
 
 class WenCaiAPI:
     """同花顺问财API封装类"""
     
+    # 诊股数据缓存，表格以 LazyTable 列式读取
+    cache = WenCaiCache(table_factory=LazyTable.from_split)
+    
     @staticmethod
     def _convert_nested_dataframe(obj):
         """
@@ -23,30 +44,51 @@ class WenCaiAPI:
         Returns:
             处理后的对象
         """
-        if isinstance(obj, dict):
-            return {key: WenCaiAPI._convert_nested_dataframe(value) for key, value in obj.items()}
-        elif isinstance(obj, list):
-            return [WenCaiAPI._convert_nested_dataframe(item) for item in obj]
-        elif isinstance(obj, pd.DataFrame):
-            try:
-                return obj.to_dict(orient='records')
-            except:
-                return str(obj)
-        elif hasattr(obj, 'to_dict') and callable(getattr(obj, 'to_dict')):
-            try:
-                return obj.to_dict()
-            except:
-                return str(obj)
-        else:
-            return obj
+        return materialize(obj)
+    
+    @staticmethod
+    def _fetch_diagnosis(stock_code: str) -> Optional[Any]:
+        """
+        调用问财接口（不经过缓存，不转换 DataFrame）
+        
+        Args:
+            stock_code: 股票代码或名称
+            
+        Returns:
+            pywencai 的原始结果，失败返回 None
+        """
+        with metrics.span('wencai.fetch'):
+            return pywencai.get(query=stock_code)
+    
+    @staticmethod
+    def _index_news(stock_code: str, news: Any):
+        """把新获取的重要新闻写入本地全文索引（失败不影响诊股）"""
+        try:
+            news_store.save_wencai_news(stock_code, materialize(news))
+        except Exception as e:
+            print(f"保存问财新闻失败: {e}")
     
     @staticmethod
-    def get_stock_diagnosis(stock_code: str) -> Optional[Dict[str, Any]]:
+    def get_stock_diagnosis(stock_code: str, use_cache: bool = True,
+                            sections: Optional[Iterable[str]] = None,
+                            cache_only: bool = False) -> Optional[Dict[str, Any]]:
         """
         通过问财接口获取股票诊断信息
         
+        默认经过本地缓存：各部分按各自的有效期缓存（新闻按小时、资金面按天、
+        财务数据按季度），只有存在过期部分时才重新请求问财。
+        
+        返回的 LazyDiagnosis 用法与字典相同，但表格只在读取对应部分时才转换，
+        可通过 table()/render() 直接读取列式表格或限长文本。
+        
+        指定 sections 时只返回、转换和缓存这些部分：所需部分都在有效期内时
+        不请求问财，其余部分即使一并下载也直接丢弃。
+        
         Args:
             stock_code: 股票代码或名称，如 "002115" 或 "三维通信"
+            use_cache: 是否使用本地缓存，默认True
+            sections: 需要的部分列表，None表示全部
+            cache_only: 只读本地缓存，不请求问财（可能返回过期数据，没有缓存时返回 None）
             
         Returns:
             股票诊断信息字典，包括：
@@ -69,21 +111,242 @@ class WenCaiAPI:
             >>> data = api.get_stock_diagnosis("002115")
             >>> print(data.keys())
         """
+        with metrics.span('wencai.diagnosis') as span:
+            try:
+                if sections is not None:
+                    sections = list(sections)
+                
+                # 非字典结果（如表格查询）无法分部分缓存，直接转换返回
+                uncached = []
+                
+                def fetch():
+                    span.cache = CACHE_MISS
+                    res = WenCaiAPI._fetch_diagnosis(stock_code)
+                    if res is not None and not isinstance(res, dict):
+                        uncached.append(res)
+                        return None
+                    if res and '重要新闻' in res:
+                        WenCaiAPI._index_news(stock_code, res['重要新闻'])
+                    return res
+                
+                if use_cache or cache_only:
+                    result = WenCaiAPI.cache.get_or_fetch(stock_code, fetch, sections=sections,
+                                                          cache_only=cache_only)
+                    # 没有调用 fetch 说明全部来自缓存
+                    span.cache = span.cache or CACHE_HIT
+                else:
+                    result = fetch()
+                    if result is not None and sections is not None:
+                        result = {k: result[k] for k in sections if k in result}
+                
+                if result is None:
+                    return materialize(uncached[0]) if uncached else None
+                return LazyDiagnosis(result)
+                
+            except Exception as e:
+                print(f"获取股票诊断信息失败: {e}")
+                return None
+    
+    @staticmethod
+    def iter_stock_diagnosis(stock_codes: Iterable[str], max_workers: int = BATCH_MAX_WORKERS,
+                             timeout: float = BATCH_TIMEOUT, retries: int = BATCH_RETRIES,
+                             backoff: float = 1.0, use_cache: bool = True,
+                             sections: Optional[Iterable[str]] = None) -> Iterator[Tuple[str, Optional[Dict[str, Any]]]]:
+        """
+        并发获取多只股票的诊断信息，按完成先后逐个返回
+        
+        pywencai 是同步接口，这里用有界线程池并发调用 get_stock_diagnosis；
+        单次调用超时或失败（返回 None）时，按指数退避加随机抖动重试。
+        超时的调用无法中断，会在后台线程中自然结束，其结果被丢弃。
+        
+        Args:
+            stock_codes: 股票代码或名称列表
+            max_workers: 最大并发数
+            timeout: 单次调用超时时间（秒）
+            retries: 失败后的重试次数
+            backoff: 重试基础等待时间（秒），第 n 次重试等待 backoff * 2^(n-1) 再加抖动
+            use_cache: 是否使用本地缓存
+            sections: 需要的部分列表，None表示全部
+            
+        Yields:
+            (股票代码, 诊断信息)，最终失败的股票诊断信息为 None
+            
+        Example:
+            >>> for code, data in WenCaiAPI.iter_stock_diagnosis(["002115", "600036"]):
+            ...     print(code, data is not None)
+        """
+        codes = list(dict.fromkeys(stock_codes))
+        if not codes:
+            return
+        if sections is not None:
+            sections = list(sections)
+        
+        def attempt(code: str, delay: float, started: list):
+            if delay > 0:
+                time.sleep(delay)
+            # 记录实际开始时间，排队和退避等待不计入超时
+            started.append(time.monotonic())
+            return WenCaiAPI.get_stock_diagnosis(code, use_cache=use_cache, sections=sections)
+        
+        executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(codes))),
+                                      thread_name_prefix="wencai")
+        # future -> (股票代码, 第几次尝试, 开始时间记录)
+        pending = {}
+        
+        def submit(code: str, tries: int):
+            delay = 0.0
+            if tries > 0:
+                delay = backoff * (2 ** (tries - 1)) + random.uniform(0, backoff)
+            started = []
+            pending[executor.submit(attempt, code, delay, started)] = (code, tries, started)
+        
         try:
-            # 调用问财接口
-            res = pywencai.get(query=stock_code)
+            for code in codes:
+                submit(code, 0)
             
-            if res is None:
-                return None
+            while pending:
+                now = time.monotonic()
+                deadlines = [s[0] + timeout for _, _, s in pending.values() if s]
+                wait_for = min([timeout, 1.0] + [d - now for d in deadlines])
+                wait(list(pending), timeout=max(0.0, wait_for), return_when=FIRST_COMPLETED)
+                
+                now = time.monotonic()
+                for future, (code, tries, started) in list(pending.items()):
+                    if future.done():
+                        result = future.result()
+                    elif started and now - started[0] >= timeout:
+                        print(f"问财查询超时: {code}")
+                        result = None
+                    else:
+                        continue
+                    
+                    del pending[future]
+                    if result is None and tries < retries:
+                        metrics.inc('span_retries_total', span='wencai.diagnosis')
+                        submit(code, tries + 1)
+                    else:
+                        yield code, result
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+    
+    @staticmethod
+    def get_stock_diagnosis_batch(stock_codes: Iterable[str], **kwargs) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        并发获取多只股票的诊断信息
+        
+        Args:
+            stock_codes: 股票代码或名称列表
+            **kwargs: 传给 iter_stock_diagnosis 的参数
             
-            # 递归处理DataFrame
-            processed_res = WenCaiAPI._convert_nested_dataframe(res)
+        Returns:
+            {股票代码: 诊断信息}，失败的股票为 None
+        """
+        return dict(WenCaiAPI.iter_stock_diagnosis(stock_codes, **kwargs))
+    
+    @staticmethod
+    def _split_rows(table: Any) -> Dict[str, Dict[str, Any]]:
+        """
+        把多股票查询结果表按股票拆分
+        
+        Args:
+            table: pywencai 返回的 DataFrame，"股票代码" 列形如 "002115.SZ"
             
-            return processed_res
+        Returns:
+            {股票代码: {列名: 值}}
+        """
+        if table is None or not hasattr(table, 'to_dict') or not hasattr(table, 'columns'):
+            return {}
+        code_column = next((c for c in ('股票代码', 'code') if c in table.columns), None)
+        if code_column is None:
+            return {}
+        
+        rows = {}
+        for record in table.to_dict(orient='records'):
+            code = str(record.get(code_column, '')).split('.')[0]
+            if code:
+                rows[code] = {str(k): v for k, v in record.items()}
+        return rows
+    
+    @staticmethod
+    def query_stocks(stock_codes: List[str], indicators: Iterable[str] = BATCH_INDICATORS) -> Dict[str, Dict[str, Any]]:
+        """
+        一次查询多只股票的多个指标（不经过缓存）
+        
+        Args:
+            stock_codes: 股票代码列表（不超过100只）
+            indicators: 问财指标描述，如 "市盈率"、"5日主力资金净流入"
             
+        Returns:
+            {股票代码: {列名: 值}}，失败返回空字典
+        """
+        try:
+            table = pywencai.get(query=' '.join(indicators), find=list(stock_codes))
+            return WenCaiAPI._split_rows(table)
         except Exception as e:
-            print(f"获取股票诊断信息失败: {e}")
-            return None
+            print(f"问财批量查询失败: {e}")
+            return {}
+    
+    @staticmethod
+    def get_batch_diagnosis(stock_codes: Iterable[str], indicators: Iterable[str] = BATCH_INDICATORS,
+                            chunk_size: int = BATCH_CHUNK_SIZE,
+                            use_cache: bool = True) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        用多股票查询批量刷新自选股的数值指标
+        
+        每 chunk_size 只股票合并为一次问财查询，结果按股票拆分后写入诊股缓存的
+        "批量指标" 部分（按股票代码和股票简称各存一份），有效期内直接读取缓存。
+        返回的诊股数据只包含 "批量指标" 部分，可直接交给 wencai_metrics 评分。
+        
+        Args:
+            stock_codes: 股票代码列表
+            indicators: 问财指标描述
+            chunk_size: 每次查询的股票数
+            use_cache: 是否使用本地缓存
+            
+        Returns:
+            {股票代码: 诊股数据}，查询不到的股票为 None
+            
+        Example:
+            >>> from app.utils.wencai_metrics import score_watchlist
+            >>> frame = score_watchlist(WenCaiAPI.get_batch_diagnosis(["002115", "600036"]))
+        """
+        codes = list(dict.fromkeys(stock_codes))
+        indicators = list(indicators)
+        cache = WenCaiAPI.cache
+        rows: Dict[str, Any] = {}
+        stale: Dict[str, Any] = {}
+        
+        if use_cache:
+            for code in codes:
+                cached = cache.load(code, [BATCH_SECTION])
+                if BATCH_SECTION not in cached or cached[BATCH_SECTION][0] is None:
+                    continue
+                if cache.stale_sections(cached, [BATCH_SECTION]):
+                    stale[code] = cached[BATCH_SECTION][0]
+                else:
+                    rows[code] = cached[BATCH_SECTION][0]
+        
+        missing = [code for code in codes if code not in rows]
+        for start in range(0, len(missing), max(1, chunk_size)):
+            fetched = WenCaiAPI.query_stocks(missing[start:start + chunk_size], indicators)
+            for code, row in fetched.items():
+                if use_cache:
+                    cache.store(code, {BATCH_SECTION: row})
+                    name = row.get('股票简称')
+                    if name:
+                        cache.store(str(name), {BATCH_SECTION: row})
+            rows.update(fetched)
+        
+        # 查询失败的股票退回到过期的缓存数据
+        for code, row in stale.items():
+            rows.setdefault(code, row)
+        
+        return {
+            code: LazyDiagnosis({BATCH_SECTION: rows[code]}) if code in rows else None
+            for code in codes
+        }
     
     @staticmethod
     def format_diagnosis(diagnosis: Dict[str, Any], sections: list = None) -> str:
@@ -106,27 +369,14 @@ class WenCaiAPI:
         formatted_lines.append("=" * 80)
         
         # 如果指定了sections，只显示这些部分
-        items_to_show = diagnosis.items()
-        if sections:
-            items_to_show = [(k, v) for k, v in diagnosis.items() if k in sections]
+        keys_to_show = [k for k in diagnosis if not sections or k in sections]
         
-        for key, value in items_to_show:
+        for key in keys_to_show:
             formatted_lines.append(f"\n【{key}】")
             
-            # 将值转换为JSON字符串（如果是字典或列表）
-            if isinstance(value, (dict, list)):
-                try:
-                    value_str = json.dumps(value, ensure_ascii=False, indent=2)
-                except:
-                    value_str = str(value)
-            else:
-                value_str = str(value)
-            
-            # 限制长度
-            if len(value_str) > 2000:
-                formatted_lines.append(value_str[:2000] + "\n... (内容过长已截取)")
-            else:
-                formatted_lines.append(value_str)
+            # 限长渲染，表格只转换需要展示的行
+            value = diagnosis.raw(key) if isinstance(diagnosis, LazyDiagnosis) else diagnosis[key]
+            formatted_lines.append(render_value(value, max_chars=2000))
         
         return "\n".join(formatted_lines)
 
@@ -0,0 +1,347 @@
+"""
+问财诊股数据持久化缓存
+按诊股数据的各个部分分别设置有效期，只刷新过期的部分，其余部分直接从本地读取
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+WEEK = 7 * DAY
+QUARTER = 90 * DAY
+
+# 各部分的有效期（秒）：消息面按小时、资金面按天、财务和股东按季度
+SECTION_TTLS = {
+    '重要新闻': HOUR,
+    '投顾点评': HOUR,
+    '牛叉诊股': DAY,
+    '支撑位压力位': DAY,
+    '北向资金流向情况': DAY,
+    '历史主力资金流向': DAY,
+    'DDE散户数量变化': DAY,
+    '龙虎榜分析': DAY,
+    '历史龙虎榜': DAY,
+    '估值指标': DAY,
+    '所属概念列表': DAY,
+    '简介和看点': WEEK,
+    '财务数据': QUARTER,
+    '十大股东持股比例': QUARTER,
+    '批量指标': HOUR,
+}
+
+# 多股票批量查询结果在缓存中的部分名称（每只股票一行 {列名: 值}）
+BATCH_SECTION = '批量指标'
+
+# 由其他查询写入的部分，诊股查询不返回，不参与诊股数据的过期判断
+EXTERNAL_SECTIONS = frozenset({BATCH_SECTION})
+
+# 记录最近一次完整获取返回了哪些部分的标记行，不需要指定部分的读取以它为准
+FULL_MARKER = '__full__'
+
+# 未列出部分的默认有效期
+DEFAULT_TTL = HOUR
+
+# 列式表格在缓存中的标记键
+TABLE_KEY = '__table__'
+
+# 默认缓存文件放在项目根目录，app 和 agentscope_project 共用
+DEFAULT_DB_PATH = os.getenv(
+    "WENCAI_CACHE_DB",
+    str(Path(__file__).resolve().parents[2] / "wencai_cache.db")
+)
+
+
+def records_from_split(split: Dict) -> list:
+    """把缓存中的列式表格还原为 records 列表"""
+    columns = split.get('columns', [])
+    return [dict(zip(columns, row)) for row in split.get('data', [])]
+
+
+def _json_default(obj: Any) -> Any:
+    """JSON 序列化时把表格编码为列式数据，其余对象转为字符串"""
+    if hasattr(obj, 'to_split'):
+        return {TABLE_KEY: obj.to_split()}
+    if hasattr(obj, 'columns') and hasattr(obj, 'to_dict'):
+        split = obj.to_dict(orient='split')
+        return {TABLE_KEY: {'columns': [str(c) for c in split['columns']], 'data': split['data']}}
+    if hasattr(obj, 'item'):
+        return obj.item()
+    return str(obj)
+
+
+class WenCaiCache:
+    """基于 SQLite 的问财诊股分部分缓存"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, ttls: Optional[Dict[str, float]] = None,
+                 default_ttl: float = DEFAULT_TTL,
+                 table_factory: Callable[[Dict], Any] = records_from_split):
+        """
+        初始化缓存
+
+        表格（DataFrame）以列式数据保存，读取时交给 table_factory 还原，
+        默认还原为 records 列表。
+
+        Args:
+            db_path: SQLite 文件路径
+            ttls: 各部分有效期（秒），默认为 SECTION_TTLS
+            default_ttl: 未配置部分的默认有效期（秒）
+            table_factory: 列式表格 {'columns', 'data'} 的还原函数
+        """
+        self.db_path = db_path
+        self.ttls = dict(SECTION_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self.table_factory = table_factory
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """首次使用时打开数据库连接并建表"""
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS diagnosis_sections (
+                    query TEXT NOT NULL,
+                    section TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    PRIMARY KEY (query, section)
+                )
+            """)
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def ttl_of(self, section: str) -> float:
+        """获取某部分的有效期（秒）"""
+        return self.ttls.get(section, self.default_ttl)
+
+    def _encode(self, value: Any) -> str:
+        return json.dumps(value, ensure_ascii=False, default=_json_default)
+
+    def _object_hook(self, obj: Dict) -> Any:
+        if len(obj) == 1 and TABLE_KEY in obj:
+            return self.table_factory(obj[TABLE_KEY])
+        return obj
+
+    def _decode(self, payload: str) -> Any:
+        return json.loads(payload, object_hook=self._object_hook)
+
+    def load(self, query: str, sections: Optional[Iterable[str]] = None) -> Dict[str, Tuple[Any, float]]:
+        """
+        读取缓存中的部分
+
+        Args:
+            query: 问财查询（股票代码或名称）
+            sections: 要读取的部分，None 表示全部（不含完整获取标记）
+
+        Returns:
+            {部分名称: (数据, 获取时间戳)}，只解码要读取的部分
+        """
+        sql = "SELECT section, payload, fetched_at FROM diagnosis_sections WHERE query = ?"
+        if sections is None:
+            sql += " AND section != ?"
+            params = [query, FULL_MARKER]
+        else:
+            params = [query, *dict.fromkeys(sections)]
+            if len(params) == 1:
+                return {}
+            sql += f" AND section IN ({', '.join('?' * (len(params) - 1))})"
+        with self._lock:
+            rows = self.conn.execute(sql, params).fetchall()
+
+        return {
+            section: (self._decode(payload), fetched_at)
+            for section, payload, fetched_at in rows
+        }
+
+    def store(self, query: str, data: Dict[str, Any], fetched_at: Optional[float] = None):
+        """
+        写入部分数据
+
+        Args:
+            query: 问财查询
+            data: {部分名称: 数据}
+            fetched_at: 获取时间戳，默认为当前时间
+        """
+        fetched_at = fetched_at or time.time()
+        rows = [(query, section, self._encode(value), fetched_at) for section, value in data.items()]
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO diagnosis_sections (query, section, payload, fetched_at) "
+                "VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self.conn.commit()
+
+    def mark_full(self, query: str, sections: Iterable[str], fetched_at: Optional[float] = None):
+        """
+        记录一次完整获取返回的部分，之后不指定部分的读取需要这些部分全部有效
+
+        Args:
+            query: 问财查询
+            sections: 完整获取返回的部分名称
+            fetched_at: 获取时间戳，默认为当前时间
+        """
+        full = sorted(section for section in sections if section not in EXTERNAL_SECTIONS)
+        self.store(query, {FULL_MARKER: full}, fetched_at)
+
+    def full_sections(self, query: str) -> Optional[List[str]]:
+        """
+        获取最近一次完整获取返回的部分
+
+        Args:
+            query: 问财查询
+
+        Returns:
+            部分名称列表，从未完整获取过时返回 None
+        """
+        marker = self.load(query, [FULL_MARKER]).get(FULL_MARKER)
+        return marker[0] if marker else None
+
+    def section_times(self, query: str) -> Dict[str, float]:
+        """
+        读取各部分的获取时间（不解码数据）
+
+        Args:
+            query: 问财查询
+
+        Returns:
+            {部分名称: 获取时间戳}（不含完整获取标记）
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT section, fetched_at FROM diagnosis_sections WHERE query = ? AND section != ?",
+                (query, FULL_MARKER)
+            ).fetchall()
+        return dict(rows)
+
+    def version(self, query: str, sections: Optional[Iterable[str]] = None,
+                now: Optional[float] = None) -> Optional[float]:
+        """
+        诊股数据的版本号，用于判断基于它的分析结果是否需要重新计算
+
+        Args:
+            query: 问财查询
+            sections: 需要的部分，None 表示最近一次完整获取返回的全部部分
+            now: 当前时间戳
+
+        Returns:
+            这些部分中最新的获取时间；有部分缺失或过期（下次读取会重新获取）、
+            或不指定部分但从未完整获取过时返回 None
+        """
+        times = self.section_times(query)
+        wanted = list(sections) if sections is not None else self.full_sections(query)
+        if not wanted:
+            return None
+        now = now or time.time()
+        if any(s not in times or now - times[s] >= self.ttl_of(s) for s in wanted):
+            return None
+        return max(times[s] for s in wanted)
+
+    def stale_sections(self, cached: Dict[str, Tuple[Any, float]], sections: Iterable[str],
+                       now: Optional[float] = None) -> Set[str]:
+        """
+        找出缺失或过期的部分
+
+        Args:
+            cached: load 返回的缓存内容
+            sections: 需要的部分
+            now: 当前时间戳
+
+        Returns:
+            需要刷新的部分集合
+        """
+        now = now or time.time()
+        return {
+            section for section in sections
+            if section not in cached or now - cached[section][1] >= self.ttl_of(section)
+        }
+
+    def get_or_fetch(self, query: str, fetch: Callable[[], Optional[Dict[str, Any]]],
+                     sections: Optional[Iterable[str]] = None,
+                     cache_only: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        读取诊股数据，只有存在缺失或过期部分时才调用 fetch 刷新
+
+        刷新时只覆盖过期和新增的部分，仍在有效期内的部分保持原来的获取时间；
+        刷新失败时返回缓存中的旧数据。
+
+        指定 sections 时只编码和写入这些部分，其余部分直接丢弃；
+        问财没有返回的部分记为空值缓存，有效期内不会因为它反复请求。
+        不指定 sections 时需要最近一次完整获取返回的全部部分，只做过部分获取的查询
+        会重新完整获取一次，不会把部分数据当作完整结果返回。
+
+        Args:
+            query: 问财查询
+            fetch: 获取完整诊股数据的函数，返回 {部分名称: 数据}
+            sections: 需要的部分，None 表示完整诊股数据（EXTERNAL_SECTIONS
+                只随结果返回，不触发刷新）
+            cache_only: 只读缓存，不发起网络请求（允许返回过期或不完整的数据）
+
+        Returns:
+            {部分名称: 数据}，没有任何数据时返回 None
+        """
+        if sections is not None:
+            wanted = list(sections)
+            cached = self.load(query, wanted)
+        else:
+            full = self.full_sections(query)
+            wanted = None if full is None else [*full, *EXTERNAL_SECTIONS]
+            cached = self.load(query, wanted)
+            wanted = full
+
+        def select(data: Dict[str, Any]) -> Dict[str, Any]:
+            return {
+                k: v for k, v in data.items()
+                if v is not None and (sections is None or k in wanted)
+            }
+
+        result = {section: value for section, (value, _) in cached.items()}
+        if cache_only:
+            return select(result) or None
+
+        if wanted and not self.stale_sections(cached, wanted):
+            return select(result)
+
+        fetched = fetch()
+        if not fetched:
+            return select(result) or None
+
+        if sections is not None:
+            fetched = {section: fetched.get(section) for section in wanted}
+
+        now = time.time()
+        fresh = {section for section, fetched_at in self.section_times(query).items()
+                 if now - fetched_at < self.ttl_of(section)}
+        updates = {section: value for section, value in fetched.items() if section not in fresh}
+        self.store(query, updates, now)
+        if sections is None:
+            self.mark_full(query, fetched, now)
+        result.update(updates)
+        for section, value in fetched.items():
+            result.setdefault(section, value)
+        return select(result)
+
+    def invalidate(self, query: Optional[str] = None):
+        """
+        删除缓存
+
+        Args:
+            query: 要删除的查询，None 表示全部
+        """
+        with self._lock:
+            if query is None:
+                self.conn.execute("DELETE FROM diagnosis_sections")
+            else:
+                self.conn.execute("DELETE FROM diagnosis_sections WHERE query = ?", (query,))
+            self.conn.commit()
+
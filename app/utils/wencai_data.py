@@ -0,0 +1,227 @@
+"""
+问财诊股数据的惰性转换
+表格保持列式存储，只有在读取某个部分时才转换为 records 或字符串，并支持限长渲染
+"""
+import json
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+
+# 渲染时默认保留的行数和字符数
+DEFAULT_MAX_ROWS = 20
+DEFAULT_MAX_CHARS = 2000
+
+
+class LazyTable:
+    """
+    列式表格
+
+    持有原始 DataFrame 或 {'columns', 'data'} 形式的列式数据，
+    records() / render() 在首次调用时才做转换。
+    """
+
+    __slots__ = ('_frame', '_columns', '_data', '_records')
+
+    def __init__(self, frame: Optional[pd.DataFrame] = None,
+                 columns: Optional[List[str]] = None,
+                 data: Optional[List[List[Any]]] = None):
+        self._frame = frame
+        self._columns = columns
+        self._data = data
+        self._records = None
+
+    @classmethod
+    def from_split(cls, split: Dict) -> 'LazyTable':
+        """从 {'columns': [...], 'data': [[...], ...]} 构建"""
+        return cls(columns=list(split.get('columns', [])), data=split.get('data', []))
+
+    @property
+    def columns(self) -> List[str]:
+        if self._frame is not None:
+            return [str(c) for c in self._frame.columns]
+        return self._columns
+
+    def __len__(self) -> int:
+        if self._frame is not None:
+            return len(self._frame)
+        return len(self._data)
+
+    def __repr__(self) -> str:
+        return f"LazyTable(rows={len(self)}, columns={self.columns})"
+
+    def to_split(self) -> Dict:
+        """转换为可 JSON 序列化的列式数据"""
+        if self._frame is not None:
+            split = self._frame.to_dict(orient='split')
+            return {'columns': [str(c) for c in split['columns']], 'data': split['data']}
+        return {'columns': self._columns, 'data': self._data}
+
+    def to_frame(self) -> pd.DataFrame:
+        """转换为 DataFrame"""
+        if self._frame is None:
+            self._frame = pd.DataFrame(self._data, columns=self._columns)
+        return self._frame
+
+    def column(self, name: str) -> List[Any]:
+        """读取单列，不转换其他列"""
+        if self._frame is not None:
+            return self._frame[name].tolist()
+        index = self._columns.index(name)
+        return [row[index] for row in self._data]
+
+    def head_records(self, n: int) -> List[Dict]:
+        """只转换前 n 行为 records"""
+        if self._records is not None:
+            return self._records[:n]
+        if self._frame is not None:
+            return self._frame.head(n).to_dict(orient='records')
+        return [dict(zip(self._columns, row)) for row in self._data[:n]]
+
+    def records(self) -> List[Dict]:
+        """转换为 records 列表（结果缓存）"""
+        if self._records is None:
+            if self._frame is not None:
+                self._records = self._frame.to_dict(orient='records')
+            else:
+                self._records = [dict(zip(self._columns, row)) for row in self._data]
+        return self._records
+
+    def render(self, max_rows: int = DEFAULT_MAX_ROWS, max_chars: int = DEFAULT_MAX_CHARS) -> str:
+        """
+        限长渲染为 JSON 文本，只转换需要展示的行
+
+        Args:
+            max_rows: 最多展示的行数
+            max_chars: 最多展示的字符数
+
+        Returns:
+            渲染后的文本
+        """
+        text = json.dumps(self.head_records(max_rows), ensure_ascii=False, indent=2, default=str)
+        text = _truncate(text, max_chars)
+        if len(self) > max_rows:
+            text += f"\n... (共 {len(self)} 行，仅显示前 {max_rows} 行)"
+        return text
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    if len(text) > max_chars:
+        return text[:max_chars] + "\n... (内容过长已截取)"
+    return text
+
+
+def materialize(obj: Any) -> Any:
+    """
+    把任意嵌套的 DataFrame / LazyTable 转换为 records（原有的数据结构）
+
+    Args:
+        obj: 需要处理的对象
+
+    Returns:
+        处理后的对象
+    """
+    if isinstance(obj, LazyTable):
+        return obj.records()
+    if isinstance(obj, dict):
+        return {key: materialize(value) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [materialize(item) for item in obj]
+    if isinstance(obj, pd.DataFrame):
+        try:
+            return obj.to_dict(orient='records')
+        except Exception:
+            return str(obj)
+    if hasattr(obj, 'to_dict') and callable(getattr(obj, 'to_dict')):
+        try:
+            return obj.to_dict()
+        except Exception:
+            return str(obj)
+    return obj
+
+
+def render_value(value: Any, max_rows: int = DEFAULT_MAX_ROWS,
+                 max_chars: int = DEFAULT_MAX_CHARS) -> str:
+    """
+    限长渲染任意诊股数据，表格只转换前 max_rows 行
+
+    Args:
+        value: 诊股数据中的某个部分
+        max_rows: 表格最多展示的行数
+        max_chars: 最多展示的字符数
+
+    Returns:
+        渲染后的文本
+    """
+    if isinstance(value, pd.DataFrame):
+        value = LazyTable(value)
+    if isinstance(value, LazyTable):
+        return value.render(max_rows, max_chars)
+    if isinstance(value, list) and len(value) > max_rows:
+        text = json.dumps(materialize(value[:max_rows]), ensure_ascii=False, indent=2, default=str)
+        return _truncate(text, max_chars) + f"\n... (共 {len(value)} 项，仅显示前 {max_rows} 项)"
+    if isinstance(value, (dict, list)):
+        text = json.dumps(materialize(value), ensure_ascii=False, indent=2, default=str)
+    else:
+        text = str(value)
+    return _truncate(text, max_chars)
+
+
+class LazyDiagnosis(Mapping):
+    """
+    惰性诊股数据
+
+    行为与原来的诊股字典一致（读取部分时得到 records 形式的数据），但只在读取时转换，
+    `key in diagnosis` 等判断不触发任何转换；table() 可直接拿到列式表格。
+    """
+
+    def __init__(self, raw: Dict[str, Any]):
+        """
+        Args:
+            raw: 原始诊股数据，值可以是 DataFrame、LazyTable 或普通对象
+        """
+        self._raw = dict(raw)
+        self._converted: Dict[str, Any] = {}
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._converted:
+            self._converted[key] = materialize(self._raw[key])
+        return self._converted[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._raw)
+
+    def __len__(self) -> int:
+        return len(self._raw)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._raw
+
+    def __repr__(self) -> str:
+        return f"LazyDiagnosis(sections={list(self._raw)})"
+
+    def raw(self, key: str) -> Any:
+        """读取未转换的原始数据"""
+        return self._raw[key]
+
+    def table(self, key: str) -> Optional[LazyTable]:
+        """
+        以列式表格读取某个部分
+
+        Returns:
+            LazyTable，如果该部分不是表格则返回 None
+        """
+        value = self._raw.get(key)
+        if isinstance(value, pd.DataFrame):
+            value = self._raw[key] = LazyTable(value)
+        return value if isinstance(value, LazyTable) else None
+
+    def render(self, key: str, max_rows: int = DEFAULT_MAX_ROWS,
+               max_chars: int = DEFAULT_MAX_CHARS) -> str:
+        """限长渲染某个部分"""
+        return render_value(self._raw[key], max_rows, max_chars)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换全部部分，得到原来的字典结构"""
+        return {key: self[key] for key in self._raw}
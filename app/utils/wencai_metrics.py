@@ -0,0 +1,298 @@
+"""
+问财诊股数据数值化
+把诊股数据中的资金面、估值和财务表格解析为固定的数值字段，按列存储，
+便于跨股票比较和对整个自选股列表做向量化评分
+"""
+import math
+import re
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .wencai_cache import BATCH_SECTION
+from .wencai_data import LazyDiagnosis, LazyTable
+
+
+# 固定的数值字段（金额单位：元；比例单位：%）
+METRIC_FIELDS = (
+    'main_inflow_5d',       # 近5日主力净流入
+    'main_inflow_20d',      # 近20日主力净流入
+    'northbound_change',    # 北向资金近5日持股比例变化
+    'pe',                   # 市盈率
+    'pb',                   # 市净率
+    'roe',                  # 净资产收益率
+    'revenue_growth',       # 营业收入同比增长率
+    'top10_holder_ratio',   # 十大股东合计持股比例
+)
+
+# 日期列候选名称，用于把表格按时间倒序排列
+DATE_COLUMNS = ('日期', '交易日期', '时间', '报告期', '截止日期')
+
+_UNITS = {'万亿': 1e12, '亿': 1e8, '万': 1e4}
+_NUMBER_RE = re.compile(r'[-+]?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?')
+_RANGE_RE = re.compile(r'\[(\d{8})-(\d{8})\]')
+
+# 批量查询结果的列名关键字：字段 -> (必须包含的任一关键字组, ...)
+BATCH_COLUMN_KEYWORDS = {
+    'northbound_change': (('北向', '变'), ('沪深股通', '变')),
+    'pe': (('市盈率',),),
+    'pb': (('市净率',),),
+    'roe': (('净资产收益率',), ('roe',)),
+    'revenue_growth': (('营业', '收入', '增长'), ('营业', '收入', '同比')),
+    'top10_holder_ratio': (('十大股东', '比例'),),
+}
+
+
+def parse_number(value: Any) -> float:
+    """
+    解析问财返回的数值，支持 "1.23亿"、"3,456万"、"12.5%" 等格式
+
+    Args:
+        value: 原始值
+
+    Returns:
+        浮点数，无法解析时返回 NaN（百分比保留为百分数，如 "12.5%" 返回 12.5）
+    """
+    if value is None or isinstance(value, bool):
+        return math.nan
+    if isinstance(value, (int, float, np.number)):
+        return float(value)
+
+    text = str(value).strip().replace(',', '')
+    match = _NUMBER_RE.search(text)
+    if not match:
+        return math.nan
+
+    number = float(match.group())
+    for unit, scale in _UNITS.items():
+        if unit in text[match.end():]:
+            return number * scale
+    return number
+
+
+def _iter_tables(value: Any) -> Iterator[LazyTable]:
+    """从诊股数据的某个部分中找出所有表格（包括嵌套在字典里的表格）"""
+    if isinstance(value, LazyTable):
+        yield value
+    elif isinstance(value, pd.DataFrame):
+        yield LazyTable(value)
+    elif isinstance(value, list) and value and isinstance(value[0], dict):
+        columns = list(value[0].keys())
+        yield LazyTable(columns=columns, data=[[row.get(c) for c in columns] for row in value])
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _iter_tables(item)
+
+
+def _find_column(columns: Sequence[str], include: Sequence[str],
+                 exclude: Sequence[str] = ()) -> Optional[str]:
+    """找出同时包含 include 中全部关键字、且不含 exclude 关键字的第一列"""
+    for column in columns:
+        if all(k in column for k in include) and not any(k in column for k in exclude):
+            return column
+    return None
+
+
+def _latest_first(table: LazyTable, column: str) -> List[float]:
+    """读取某列的数值，按日期倒序排列（没有日期列时保持原顺序）"""
+    values = [parse_number(v) for v in table.column(column)]
+    date_column = next((c for c in table.columns if c in DATE_COLUMNS), None)
+    if date_column is None:
+        return values
+
+    dates = [str(d) for d in table.column(date_column)]
+    order = sorted(range(len(values)), key=lambda i: dates[i], reverse=True)
+    return [values[i] for i in order]
+
+
+def _section_series(diagnosis: Mapping[str, Any], section: str, include: Sequence[str],
+                    exclude: Sequence[str] = ()) -> List[float]:
+    """在某个部分的表格中查找列，返回按时间倒序的数值"""
+    if section not in diagnosis:
+        return []
+    value = diagnosis.raw(section) if isinstance(diagnosis, LazyDiagnosis) else diagnosis[section]
+    for table in _iter_tables(value):
+        column = _find_column(table.columns, include, exclude)
+        if column is not None:
+            return _latest_first(table, column)
+    return []
+
+
+def _latest(values: List[float]) -> float:
+    return next((v for v in values if not math.isnan(v)), math.nan)
+
+
+def _recent_sum(values: List[float], days: int) -> float:
+    recent = [v for v in values[:days] if not math.isnan(v)]
+    return float(sum(recent)) if recent else math.nan
+
+
+def _inflow_window(column: str) -> Optional[int]:
+    """判断主力资金列对应的区间天数（5 或 20），无法判断时返回 None"""
+    for days in (20, 5):
+        if f'{days}日' in column:
+            return days
+    match = _RANGE_RE.search(column)
+    if match:
+        start, end = (datetime.strptime(d, '%Y%m%d') for d in match.groups())
+        return 5 if (end - start).days <= 10 else 20
+    return None
+
+
+def _batch_metrics(row: Mapping[str, Any]) -> Dict[str, float]:
+    """从多股票批量查询的单行结果中解析数值字段"""
+    metrics = {}
+    for column, value in row.items():
+        name = column.lower()
+        if '主力' in name and ('净' in name or '流向' in name):
+            days = _inflow_window(column)
+            if days:
+                metrics.setdefault(f'main_inflow_{days}d', parse_number(value))
+            continue
+        for field, groups in BATCH_COLUMN_KEYWORDS.items():
+            if any(all(k in name for k in group) for group in groups):
+                metrics.setdefault(field, parse_number(value))
+                break
+    return metrics
+
+
+def extract_metrics(diagnosis: Optional[Mapping[str, Any]]) -> Dict[str, float]:
+    """
+    把一只股票的诊股数据解析为固定的数值字段
+
+    只读取需要的列，不会把整张表转换为 records。
+
+    Args:
+        diagnosis: get_stock_diagnosis 返回的诊股数据
+
+    Returns:
+        {字段名: 数值}，包含 METRIC_FIELDS 的全部字段，缺失的为 NaN
+    """
+    metrics = dict.fromkeys(METRIC_FIELDS, math.nan)
+    if not diagnosis:
+        return metrics
+
+    inflow = _section_series(diagnosis, '历史主力资金流向', ('主力', '净'), ('占比', '率'))
+    metrics['main_inflow_5d'] = _recent_sum(inflow, 5)
+    metrics['main_inflow_20d'] = _recent_sum(inflow, 20)
+
+    change = _section_series(diagnosis, '北向资金流向情况', ('持股', '变'))
+    if change:
+        metrics['northbound_change'] = _recent_sum(change, 5)
+    else:
+        ratio = [v for v in _section_series(diagnosis, '北向资金流向情况', ('持股', '比'))
+                 if not math.isnan(v)]
+        if len(ratio) > 1:
+            metrics['northbound_change'] = ratio[0] - ratio[min(5, len(ratio) - 1)]
+
+    metrics['pe'] = _latest(_section_series(diagnosis, '估值指标', ('市盈率',)))
+    metrics['pb'] = _latest(_section_series(diagnosis, '估值指标', ('市净率',)))
+    metrics['roe'] = _latest(_section_series(diagnosis, '财务数据', ('净资产收益率',))
+                             or _section_series(diagnosis, '财务数据', ('ROE',)))
+    metrics['revenue_growth'] = _latest(_section_series(diagnosis, '财务数据', ('营业', '收入', '增'))
+                                        or _section_series(diagnosis, '财务数据', ('营业', '收入', '同比')))
+
+    total = _section_series(diagnosis, '十大股东持股比例', ('合计',))
+    if total:
+        metrics['top10_holder_ratio'] = _latest(total)
+    else:
+        holders = [v for v in _section_series(diagnosis, '十大股东持股比例', ('比例',))[:10]
+                   if not math.isnan(v)]
+        if holders:
+            metrics['top10_holder_ratio'] = min(100.0, float(sum(holders)))
+
+    # 诊股表格中没有的字段用批量查询结果补齐
+    row = diagnosis[BATCH_SECTION] if BATCH_SECTION in diagnosis else None
+    if isinstance(row, Mapping):
+        for field, value in _batch_metrics(row).items():
+            if math.isnan(metrics[field]):
+                metrics[field] = value
+
+    return metrics
+
+
+def build_metrics_frame(diagnoses: Mapping[str, Optional[Mapping[str, Any]]]) -> pd.DataFrame:
+    """
+    把多只股票的诊股数据解析为列式数值表
+
+    Args:
+        diagnoses: {股票代码: 诊股数据}
+
+    Returns:
+        以股票代码为索引、METRIC_FIELDS 为列的 DataFrame（float64）
+    """
+    columns = {field: np.full(len(diagnoses), np.nan) for field in METRIC_FIELDS}
+    for i, diagnosis in enumerate(diagnoses.values()):
+        for field, value in extract_metrics(diagnosis).items():
+            columns[field][i] = value
+    return pd.DataFrame(columns, index=pd.Index(list(diagnoses), name='code'))
+
+
+def _band(values: pd.Series, low: float, high: float, points: float) -> np.ndarray:
+    """落在 [low, high] 区间内加分，缺失值不加分"""
+    return np.where((values >= low) & (values <= high), points, 0.0)
+
+
+def score_funds(frame: pd.DataFrame) -> pd.Series:
+    """
+    向量化计算资金面评分（0-100分，基础分50）
+
+    - 近5日主力净流入：每亿元 ±8 分，最多 ±20 分
+    - 近20日主力净流入：每亿元 ±3 分，最多 ±15 分
+    - 北向资金持股比例变化：每 0.1 个百分点 ±5 分，最多 ±15 分
+
+    Args:
+        frame: build_metrics_frame 返回的数值表
+
+    Returns:
+        以股票代码为索引的评分
+    """
+    score = np.full(len(frame), 50.0)
+    score += np.clip(frame['main_inflow_5d'].fillna(0).to_numpy() / 1e8 * 8, -20, 20)
+    score += np.clip(frame['main_inflow_20d'].fillna(0).to_numpy() / 1e8 * 3, -15, 15)
+    score += np.clip(frame['northbound_change'].fillna(0).to_numpy() * 50, -15, 15)
+    return pd.Series(np.clip(score, 0, 100), index=frame.index, name='fund_score')
+
+
+def score_fundamentals(frame: pd.DataFrame) -> pd.Series:
+    """
+    向量化计算基本面评分（0-100分，基础分50）
+
+    - ROE：每个百分点 +1.5 分（亏损扣分），最多 ±20 分
+    - 营业收入同比增长：每个百分点 +0.3 分，最多 ±15 分
+    - 市盈率：0-30 倍 +10 分，亏损（负值）-10 分，超过 100 倍 -5 分
+    - 市净率：0-3 倍 +5 分
+    - 十大股东持股比例：40%-80% +5 分
+
+    Args:
+        frame: build_metrics_frame 返回的数值表
+
+    Returns:
+        以股票代码为索引的评分
+    """
+    pe = frame['pe']
+    score = np.full(len(frame), 50.0)
+    score += np.clip(frame['roe'].fillna(0).to_numpy() * 1.5, -20, 20)
+    score += np.clip(frame['revenue_growth'].fillna(0).to_numpy() * 0.3, -15, 15)
+    score += _band(pe, 0, 30, 10) - np.where(pe < 0, 10, 0) - np.where(pe > 100, 5, 0)
+    score += _band(frame['pb'], 0, 3, 5)
+    score += _band(frame['top10_holder_ratio'], 40, 80, 5)
+    return pd.Series(np.clip(score, 0, 100), index=frame.index, name='fundamental_score')
+
+
+def score_watchlist(diagnoses: Mapping[str, Optional[Mapping[str, Any]]]) -> pd.DataFrame:
+    """
+    对整个自选股列表计算数值字段和资金面/基本面评分
+
+    Args:
+        diagnoses: {股票代码: 诊股数据}
+
+    Returns:
+        数值字段加 fund_score、fundamental_score 两列的 DataFrame
+    """
+    frame = build_metrics_frame(diagnoses)
+    frame['fund_score'] = score_funds(frame)
+    frame['fundamental_score'] = score_fundamentals(frame)
+    return frame
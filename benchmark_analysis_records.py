@@ -0,0 +1,93 @@
+"""
+紧凑分析结果性能测试
+对比嵌套字典、SummaryRecord 列表和结构化数组的内存占用与批量排序筛选耗时
+"""
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from app.utils.analysis_records import Recommendation, from_array, rank, select, to_array, SummaryRecord
+
+
+RECOMMENDATIONS = ['买入', '持有', '观望', '规避']
+RISK_LEVELS = ['低风险', '中等风险', '高风险']
+MACD_SIGNALS = ['金叉 - 买入信号', '多头 - 持有', '震荡 - 等待', '空头 - 观望', '死叉 - 卖出信号']
+
+
+def build_results(n: int, seed: int = 0):
+    """构造 n 条与 analyze_stock 同结构的摘要结果（不含原始K线和诊股数据）"""
+    rng = np.random.default_rng(seed)
+    results = []
+    for i in range(n):
+        score = float(round(rng.uniform(20, 95), 1))
+        results.append({
+            'stock_code': f"{i:06d}",
+            'stock_name': f"股票{i}",
+            'success': True,
+            'technical_analysis': {
+                'basic_info': {'close': float(round(rng.uniform(2, 200), 2)),
+                               'change_pct': float(round(rng.normal(0, 3), 2))},
+                'technical_indicators': {'ma': {'trend': '强势上涨'},
+                                         'macd': {'signal': MACD_SIGNALS[rng.integers(5)]},
+                                         'kdj': {'signal': '震荡 - 观望'}},
+            },
+            'summary': {
+                'overall_score': score,
+                'risk_level': RISK_LEVELS[rng.integers(3)],
+                'recommendation': RECOMMENDATIONS[rng.integers(4)],
+                'score_details': {'技术面': score, '资金面': score, '基本面': score, '消息面': 50.0},
+                'key_points': ['✓ 均线多头排列，趋势强劲', f"○ ROE {rng.normal(8, 6):.2f}%"],
+                'risks': ['⚠ KDJ超买，注意回调'],
+                'opportunities': ['✓ MACD金叉，买入信号'],
+                'generated_by': 'Rule',
+            },
+        })
+    return results
+
+
+def allocated(build):
+    """构造对象并返回 (对象, 新分配的字节数)"""
+    tracemalloc.start()
+    obj = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, size
+
+
+def measure(name: str, func, repeat: int = 5):
+    func()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed = (time.perf_counter() - started) / repeat
+    print(f"{name:<36} {elapsed * 1000:>9.2f} ms")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+
+    results, dict_bytes = allocated(lambda: build_results(n))
+    records, record_bytes = allocated(lambda: [SummaryRecord.from_result(r) for r in results])
+    array, array_bytes = allocated(lambda: to_array(records))
+
+    print("=" * 60)
+    print(f"内存占用（{n} 只股票）")
+    print("=" * 60)
+    print(f"{'嵌套字典（仅摘要部分）':<36} {dict_bytes / 1e6:>9.1f} MB")
+    print(f"{'SummaryRecord 列表':<36} {record_bytes / 1e6:>9.1f} MB")
+    print(f"{'结构化数组':<36} {array_bytes / 1e6:>9.1f} MB")
+
+    print("\n" + "=" * 60)
+    print("排序和筛选")
+    print("=" * 60)
+    measure("字典：按评分排序", lambda: sorted(results, key=lambda r: -r['summary']['overall_score']))
+    measure("字典：评分≥70且建议买入", lambda: [r for r in results if r['summary']['overall_score'] >= 70
+                                             and r['summary']['recommendation'] == '买入'])
+    measure("数组：按评分排序", lambda: rank(array))
+    measure("数组：评分≥70且建议买入", lambda: select(array, min_score=70,
+                                                 recommendations=[Recommendation.BUY]))
+    measure("字典：评分前 20", lambda: sorted(results, key=lambda r: -r['summary']['overall_score'])[:20])
+    measure("数组：评分前 20 并还原为记录", lambda: from_array(rank(array, limit=20)))
+    measure("转换：字典 -> 结构化数组", lambda: to_array(results), repeat=1)
@@ -0,0 +1,72 @@
+"""
+横截面因子评分性能测试
+对比逐只股票的规则评分和整个股票池的向量化因子评分
+"""
+import time
+
+import numpy as np
+
+from app.utils.factor_scoring import build_factor_frame, score_universe, ZSCORE
+from app.utils.stock_comprehensive_analyzer import StockComprehensiveAnalyzer
+from app.utils.wencai_cache import BATCH_SECTION
+
+
+MA_TRENDS = ['强势上涨', '震荡整理', '弱势下跌']
+MACD_SIGNALS = ['金叉 - 买入信号', '多头 - 持有', '震荡 - 等待', '空头 - 观望', '死叉 - 卖出信号']
+KDJ_SIGNALS = ['金叉向上 - 买入', '超卖 - 可能反弹', '震荡 - 观望', '超买 - 注意回调风险', '死叉向下 - 卖出']
+
+
+def build_universe(n: int, seed: int = 0):
+    """构造 n 只股票的技术分析结果、诊股数据（批量指标）和新闻条数"""
+    rng = np.random.default_rng(seed)
+    codes = [f"{i:06d}" for i in range(n)]
+    technicals, diagnoses = {}, {}
+    for code in codes:
+        technicals[code] = {
+            'technical_indicators': {
+                'ma': {'trend': MA_TRENDS[rng.integers(3)]},
+                'macd': {'signal': MACD_SIGNALS[rng.integers(5)]},
+                'kdj': {'signal': KDJ_SIGNALS[rng.integers(5)]},
+            },
+            'support_resistance': {'resistance_distance': float(rng.uniform(0, 20))},
+        }
+        diagnoses[code] = {
+            BATCH_SECTION: {
+                '区间主力资金流向[20240101-20240105]': f"{rng.normal(0, 2):.2f}亿",
+                '区间主力资金流向[20231201-20240105]': f"{rng.normal(0, 5):.2f}亿",
+                '市盈率(pe)': float(rng.uniform(-20, 120)),
+                '市净率(pb)': float(rng.uniform(0.5, 10)),
+                '净资产收益率roe': float(rng.normal(8, 6)),
+                '营业收入同比增长率': float(rng.normal(10, 20)),
+            },
+            '重要新闻': [] if rng.random() < 0.5 else None,
+        }
+        if diagnoses[code]['重要新闻'] is None:
+            del diagnoses[code]['重要新闻']
+    news_counts = {code: int(rng.poisson(2)) for code in codes}
+    return technicals, diagnoses, news_counts
+
+
+def measure(name: str, func, repeat: int = 3):
+    func()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed = (time.perf_counter() - started) / repeat
+    print(f"{name:<32} {elapsed * 1000:>9.1f} ms")
+
+
+if __name__ == "__main__":
+    n = 5000
+    technicals, diagnoses, news_counts = build_universe(n)
+    analyzer = StockComprehensiveAnalyzer(use_ai=False)
+    frame = build_factor_frame(technicals, diagnoses, news_counts)
+
+    print("=" * 60)
+    print(f"因子评分性能（{n} 只股票）")
+    print("=" * 60)
+    measure("逐只规则评分", lambda: [analyzer._generate_rule_based_summary(diagnoses[c], technicals[c])
+                               for c in technicals], repeat=1)
+    measure("构建因子表", lambda: build_factor_frame(technicals, diagnoses, news_counts))
+    measure("横截面评分排名（rank）", lambda: score_universe(frame))
+    measure("横截面评分排名（zscore）", lambda: score_universe(frame, method=ZSCORE))
@@ -0,0 +1,103 @@
+"""
+涨停雷达页面解析性能对比
+对比原来的逐条多次 XPath 解析和预编译 XPath 单次遍历解析的吞吐量
+
+用法:
+    python benchmark_ths_parse.py                 # 使用生成的页面（200 条）
+    python benchmark_ths_parse.py --record page.html   # 抓取并保存真实页面
+    python benchmark_ths_parse.py --page page.html     # 使用保存的真实页面
+"""
+import argparse
+import time
+from pathlib import Path
+
+from lxml import etree
+
+from app.utils.ths_crawler import THSCrawler, BASIC_FIELDS, NEWS_FIELDS
+
+
+def build_sample_page(count: int = 200) -> str:
+    """生成与涨停雷达列表页结构一致的页面"""
+    items = []
+    for i in range(count):
+        seq = 500000 + count - i
+        items.append(
+            f'<li><span class="arc-title"><span>{9 + i // 60 % 6:02d}:{i % 60:02d}</span>'
+            f'<a class="news-link" title="涨停雷达：某某股份触及涨停 {seq}" data-seq="{seq}" '
+            f'href="https://news.10jqka.com.cn/20240119/c{seq}.shtml" target="_blank">涨停雷达 {seq}</a>'
+            f'</span><a class="arc-cont news-link" href="https://news.10jqka.com.cn/20240119/c{seq}.shtml">'
+            f'{"公司主营业务为通信网络优化，受行业利好消息刺激，股价快速拉升。" * 3}</a>'
+            f'<div class="arc-info"><span>同花顺</span></div></li>'
+        )
+    return (
+        '<html><head><title>涨停雷达</title></head><body><div class="header">导航</div>'
+        f'<div class="list-con"><ul>{"".join(items)}</ul></div><div class="footer">页脚</div></body></html>'
+    )
+
+
+def legacy_parse(html: etree._Element, with_content: bool):
+    """原来的解析逻辑：每条新闻分别执行多次 XPath 字符串查询"""
+    news_list = []
+    for item in html.xpath('//div[@class="list-con"]//ul/li'):
+        time_elements = item.xpath('.//span[@class="arc-title"]/span/text()')
+        news_time = time_elements[0].strip() if time_elements else ""
+        title_links = item.xpath('.//span[@class="arc-title"]/a[@class="news-link"]')
+        if not title_links:
+            continue
+        title_link = title_links[0]
+        news = {
+            'time': news_time,
+            'title': title_link.get('title', '').strip(),
+            'data_seq': title_link.get('data-seq', '').strip(),
+            'url': title_link.get('href', '').strip(),
+        }
+        if with_content:
+            content_elements = item.xpath('.//a[@class="arc-cont news-link"]/text()')
+            news['content'] = content_elements[0].strip() if content_elements else ""
+        if news['time'] and news['title'] and news['data_seq']:
+            news_list.append(news)
+    return news_list
+
+
+def measure(name: str, func, count: int, repeat: int = 50):
+    """测量平均耗时和每秒解析条数"""
+    func()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed = (time.perf_counter() - started) / repeat
+    print(f"{name:<36} {elapsed * 1000:>8.2f} ms/页  {count / elapsed:>10.0f} 条/秒")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="涨停雷达页面解析性能对比")
+    parser.add_argument("--page", help="保存的涨停雷达页面")
+    parser.add_argument("--record", help="抓取真实页面并保存到该文件")
+    args = parser.parse_args()
+
+    if args.record:
+        content = THSCrawler()._make_request(THSCrawler.LIMIT_UP_RADAR_URL)
+        if not content:
+            raise SystemExit("抓取页面失败")
+        Path(args.record).write_text(content, encoding='utf-8')
+        print(f"已保存页面: {args.record}")
+
+    page_file = args.page or args.record
+    page = Path(page_file).read_text(encoding='utf-8') if page_file else build_sample_page()
+
+    html = etree.HTML(page)
+    # 两次请求两次解析（原来分别调用两个接口）
+    both_legacy = lambda: (legacy_parse(etree.HTML(page), False), legacy_parse(etree.HTML(page), True))
+    assert legacy_parse(html, True) == list(THSCrawler.iter_news(html, NEWS_FIELDS)), "解析结果不一致"
+    count = len(legacy_parse(html, True))
+
+    print("=" * 70)
+    print(f"涨停雷达页面解析性能对比（{'保存的页面' if page_file else '生成的页面'}，{count} 条）")
+    print("=" * 70)
+    measure("原解析（基本字段）", lambda: legacy_parse(html, False), count)
+    measure("预编译单次遍历（基本字段）", lambda: list(THSCrawler.iter_news(html, BASIC_FIELDS)), count)
+    measure("原解析（含内容）", lambda: legacy_parse(html, True), count)
+    measure("预编译单次遍历（含内容）", lambda: list(THSCrawler.iter_news(html, NEWS_FIELDS)), count)
+    measure("原两个接口（建树+解析各两次）", both_legacy, count)
+    measure("单次获取解析（建树+解析一次）",
+            lambda: list(THSCrawler.iter_news(etree.HTML(page), NEWS_FIELDS)), count)
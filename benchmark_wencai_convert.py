@@ -0,0 +1,109 @@
+"""
+问财诊股数据转换性能对比
+对比原来的全量 records 转换和惰性列式转换的 CPU 耗时与内存峰值
+"""
+import json
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from app.utils.wencai_api import WenCaiAPI
+from app.utils.wencai_cache import WenCaiCache, records_from_split
+from app.utils.wencai_data import LazyDiagnosis, LazyTable
+
+
+def build_sample_diagnosis(seed: int = 0) -> dict:
+    """构造与问财诊股结构相近的样本数据（含大表）"""
+    rng = np.random.default_rng(seed)
+
+    def table(rows, cols, prefix):
+        data = {f"{prefix}{i}": rng.random(rows) * 100 for i in range(cols)}
+        data['日期'] = pd.date_range('2020-01-01', periods=rows).strftime('%Y%m%d')
+        return pd.DataFrame(data)
+
+    return {
+        '简介和看点': '公司主营通信网络优化服务……' * 20,
+        '支撑位压力位': table(5, 4, '价位'),
+        '所属概念列表': table(30, 3, '概念'),
+        '北向资金流向情况': table(250, 6, '北向'),
+        '历史主力资金流向': table(1000, 10, '主力'),
+        'DDE散户数量变化': table(250, 6, 'DDE'),
+        '龙虎榜分析': {'近一年上榜次数': 12, '明细': table(60, 8, '席位')},
+        '历史龙虎榜': table(2000, 15, '龙虎榜'),
+        '财务数据': table(40, 30, '财务'),
+        '估值指标': table(250, 8, '估值'),
+        '十大股东持股比例': table(10, 5, '股东'),
+        '重要新闻': [{'标题': f'新闻{i}', '内容': '内容' * 50} for i in range(30)],
+        '投顾点评': '短期震荡，关注量能变化',
+    }
+
+
+def old_convert(obj):
+    """原来的转换逻辑：递归把所有 DataFrame 转为 records"""
+    if isinstance(obj, dict):
+        return {k: old_convert(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [old_convert(v) for v in obj]
+    if isinstance(obj, pd.DataFrame):
+        return obj.to_dict(orient='records')
+    return obj
+
+
+def old_format(diagnosis: dict) -> str:
+    """原来的格式化逻辑：整段 JSON 序列化后再截取"""
+    lines = []
+    for key, value in diagnosis.items():
+        text = json.dumps(value, ensure_ascii=False, indent=2, default=str)
+        lines.append(text[:2000])
+    return "\n".join(lines)
+
+
+def consume_old(raw: dict):
+    """原来的消费路径：全量转换 + 判断部分是否存在 + 格式化"""
+    diagnosis = old_convert(raw)
+    _ = '历史主力资金流向' in diagnosis and '财务数据' in diagnosis
+    old_format(diagnosis)
+
+
+def consume_new(raw: dict):
+    """惰性消费路径：不转换 + 判断部分是否存在 + 限长格式化"""
+    diagnosis = LazyDiagnosis(raw)
+    _ = '历史主力资金流向' in diagnosis and '财务数据' in diagnosis
+    WenCaiAPI.format_diagnosis(diagnosis)
+
+
+def measure(name: str, func, repeat: int = 5):
+    """测量平均耗时和内存峰值"""
+    func()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed = (time.perf_counter() - started) / repeat
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{name:<28} {elapsed * 1000:>9.1f} ms  峰值内存 {peak / 1024 / 1024:>7.2f} MB")
+
+
+if __name__ == "__main__":
+    raw = build_sample_diagnosis()
+    cache = WenCaiCache(":memory:")
+    payloads = {k: cache._encode(v) for k, v in raw.items()}
+
+    eager_cache = WenCaiCache(":memory:", table_factory=records_from_split)
+    lazy_cache = WenCaiCache(":memory:", table_factory=LazyTable.from_split)
+
+    print("=" * 70)
+    print("问财诊股数据转换性能对比")
+    print("=" * 70)
+    measure("获取后消费（原全量转换）", lambda: consume_old(raw))
+    measure("获取后消费（惰性转换）", lambda: consume_new(raw))
+    measure("读缓存消费（records）",
+            lambda: consume_old({k: eager_cache._decode(p) for k, p in payloads.items()}))
+    measure("读缓存消费（列式）",
+            lambda: consume_new({k: lazy_cache._decode(p) for k, p in payloads.items()}))
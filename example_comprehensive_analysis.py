@@ -2,6 +2,8 @@
 股票综合分析使用示例
 演示如何使用综合分析器，自动获取问财诊股数据和K线数据，生成完整分析报告
 """
+from datetime import date, timedelta
+
 from app.utils.stock_comprehensive_analyzer import StockComprehensiveAnalyzer
 
 
@@ -66,20 +68,14 @@ def example_batch_analysis():
     
     results = []
     
-    for code, name in stocks:
-        print(f"\n正在分析: {name}({code})")
-        print("-" * 80)
-        
-        try:
-            result = analyzer.analyze_stock(code, name, kline_days=60)
-            if result['success']:
-                summary = result['summary']
-                print(f"  综合评分: {summary['overall_score']:.1f}")
-                print(f"  操作建议: {summary['recommendation']}")
-                print(f"  风险等级: {summary['risk_level']}")
-                results.append((name, summary['overall_score'], summary['recommendation']))
-        except Exception as e:
-            print(f"  分析失败: {e}")
+    # 有界线程池并发分析，按完成先后返回结果
+    for result in analyzer.analyze_many(stocks, concurrency=3, kline_days=60):
+        if result['success']:
+            summary = result['summary']
+            timings = result['timings']
+            print(f"  {result['stock_name']}: 问财 {timings.get('diagnosis', 0):.1f}s  "
+                  f"K线 {timings.get('kline', 0):.1f}s  总计 {timings['total']:.1f}s")
+            results.append((result['stock_name'], summary['overall_score'], summary['recommendation']))
     
     # 按评分排序
     if results:
@@ -119,40 +115,28 @@ def example_custom_analysis():
 
 
 def example_export_to_json():
-    """导出分析结果为JSON"""
+    """流式导出分析结果"""
     print("\n\n" + "=" * 80)
     print("示例 5: 导出分析结果")
     print("=" * 80)
     
-    import json
+    from app.utils.result_export import open_sink, load_history, JSONL
     
     analyzer = StockComprehensiveAnalyzer()
-    result = analyzer.analyze_stock("002115", "三维通信", kline_days=60)
+    stocks = [("002115", "三维通信"), ("600036", "招商银行"), ("000858", "五粮液")]
     
-    if result['success']:
-        # 准备导出数据（移除不能序列化的部分）
-        export_data = {
-            "stock_code": result['stock_code'],
-            "stock_name": result['stock_name'],
-            "summary": result['summary'],
-        }
-        
-        # 如果需要技术分析数据
-        if result.get('technical_analysis') and 'error' not in result['technical_analysis']:
-            tech = result['technical_analysis']
-            export_data['technical'] = {
-                "basic_info": tech['basic_info'],
-                "indicators": tech['technical_indicators'],
-                "support_resistance": tech['support_resistance']
-            }
-        
-        # 保存到文件
-        filename = f"analysis_{result['stock_code']}.json"
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(export_data, f, ensure_ascii=False, indent=2, default=str)
-        
-        print(f"\n分析结果已导出到: {filename}")
-        print(f"文件大小: {len(json.dumps(export_data, ensure_ascii=False))/ 1024:.2f} KB")
+    # 每完成一只股票就追加一行到 exports/date=YYYY-MM-DD/analysis.jsonl，
+    # 中途崩溃也不会丢失已写出的结果；安装 pyarrow 后可改用 PARQUET
+    with open_sink(JSONL, "exports") as sink:
+        for result in sink.write_many(analyzer.analyze_many(stocks, concurrency=3, kline_days=60)):
+            if result['success']:
+                print(f"已导出: {result['stock_name']} 评分 {result['summary']['overall_score']:.1f}")
+    
+    print(f"\n共导出 {sink.written} 条，文件: {sink.path_for(date.today())}")
+    
+    # 读取历史导出，按日期分区过滤，无需重新解析原始数据
+    history = load_history("exports", start=date.today() - timedelta(days=30))
+    print(history[['date', 'stock_name', 'overall_score', 'recommendation']].tail(10))
 
 
 if __name__ == "__main__":
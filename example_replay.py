@@ -0,0 +1,62 @@
+"""
+离线录制/回放使用示例
+先联网录制一次真实响应，之后在离线环境下按固定延迟和错误率回放，做确定性的压测
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.utils.replay import FixtureStore, Recorder, Replayer
+from app.utils.stock_comprehensive_analyzer import StockComprehensiveAnalyzer
+
+
+FIXTURE_DIR = "fixtures/replay"
+
+STOCKS = [
+    ("002115", "三维通信"),
+    ("000001", "平安银行"),
+    ("600036", "招商银行"),
+]
+
+
+def example_record():
+    """录制真实响应（需要联网）"""
+    print("=" * 50)
+    print("示例 1: 录制真实响应")
+    print("=" * 50)
+
+    store = FixtureStore(FIXTURE_DIR)
+    analyzer = StockComprehensiveAnalyzer()
+
+    with Recorder(store) as recorder:
+        for code, name in STOCKS:
+            analyzer.analyze_stock(code, name, kline_days=60)
+
+    print(f"共录制 {recorder.recorded} 条响应，保存在 {FIXTURE_DIR}")
+
+
+def example_replay_load_test(workers: int = 8, rounds: int = 10):
+    """离线回放压测"""
+    print("\n" + "=" * 50)
+    print("示例 2: 离线回放压测")
+    print("=" * 50)
+
+    store = FixtureStore(FIXTURE_DIR)
+    analyzer = StockComprehensiveAnalyzer()
+    tasks = STOCKS * rounds
+
+    with Replayer(store, latency=0.2, jitter=0.1, error_rate=0.05, seed=42) as replayer:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(lambda s: analyzer.analyze_stock(s[0], s[1], kline_days=60), tasks))
+        elapsed = time.perf_counter() - started
+
+    print(f"完成 {len(tasks)} 次分析，耗时 {elapsed:.2f} 秒")
+    print(f"回放统计: {replayer.stats}")
+
+
+if __name__ == "__main__":
+    # 示例1：录制（需要联网，只需运行一次）
+    # example_record()
+
+    # 示例2：离线回放压测
+    example_replay_load_test()
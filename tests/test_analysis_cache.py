@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+综合分析结果缓存单元测试
+"""
+
+import unittest
+import sys
+import os
+import threading
+import time
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.analysis_cache import AnalysisCache
+
+
+class TestAnalysisCache(unittest.TestCase):
+    """分析结果缓存测试用例"""
+
+    def setUp(self):
+        self.cache = AnalysisCache(intraday_ttl=60)
+        self.key = AnalysisCache.make_key("002115", 120, True)
+        self.version = 1.0
+        self.compute = MagicMock(side_effect=lambda: {'score': self.compute.call_count})
+        patcher = patch('app.utils.analysis_cache.is_trading_time', return_value=False)
+        self.trading = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, **kwargs):
+        return self.cache.get_or_compute(self.key, self.compute, lambda: self.version, **kwargs)
+
+    def test_key_includes_trading_session(self):
+        """测试键包含交易会话，开盘后换新键"""
+        before_open = AnalysisCache.make_key("002115", 120, True, now=datetime(2024, 1, 19, 8, 0))
+        friday = AnalysisCache.make_key("002115", 120, True, now=datetime(2024, 1, 19, 14, 0))
+        weekend = AnalysisCache.make_key("002115", 120, True, now=datetime(2024, 1, 20, 10, 0))
+        self.assertNotEqual(before_open, friday)
+        self.assertEqual(friday, weekend)
+
+    def test_key_separates_cache_only_results(self):
+        """测试只读诊股缓存的降级结果不会提供给正常请求"""
+        self.assertNotEqual(AnalysisCache.make_key("002115", 120, False),
+                            AnalysisCache.make_key("002115", 120, False, cache_only=True))
+
+    def test_hit_until_version_changes(self):
+        """测试版本号不变时命中缓存，新部分到达或数据过期后重新计算"""
+        self.assertEqual(self.get(), {'score': 1})
+        self.assertEqual(self.get(), {'score': 1})
+        self.assertEqual(self.compute.call_count, 1)
+
+        self.version = 2.0
+        self.assertEqual(self.get(), {'score': 2})
+
+        self.version = None
+        self.assertEqual(self.get(), {'score': 3})
+
+    def test_intraday_ttl(self):
+        """测试交易时段内结果超过有效期后重新计算"""
+        self.trading.return_value = True
+        self.get()
+        self.get()
+        self.assertEqual(self.compute.call_count, 1)
+
+        with patch('app.utils.analysis_cache.time.time', return_value=time.time() + 61):
+            self.get()
+        self.assertEqual(self.compute.call_count, 2)
+
+    def test_stale_while_revalidate(self):
+        """测试过期时先返回旧结果，后台只刷新一次"""
+        self.get()
+        self.version = 2.0
+        release = threading.Event()
+
+        def slow():
+            release.wait(5)
+            return {'score': 'new'}
+
+        self.compute.side_effect = slow
+        self.assertEqual(self.get(stale_while_revalidate=True), {'score': 1})
+        self.assertEqual(self.get(stale_while_revalidate=True), {'score': 1})
+        release.set()
+        self.cache._executor.shutdown(wait=True)
+
+        self.assertEqual(self.compute.call_count, 2)
+        self.assertEqual(self.get(), {'score': 'new'})
+
+    def test_lru_and_invalidate(self):
+        """测试超过容量淘汰最久未用的结果，按股票删除"""
+        cache = AnalysisCache(max_entries=2)
+        for code in ("000001", "000002", "000003"):
+            cache.put(AnalysisCache.make_key(code, 120, True), {}, 1.0)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.lookup(AnalysisCache.make_key("000001", 120, True), 1.0), (None, False))
+
+        cache.invalidate("000002")
+        self.assertEqual(len(cache), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
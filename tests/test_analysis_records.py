@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+紧凑分析结果单元测试
+"""
+
+import unittest
+import sys
+import os
+import math
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.analysis_records import (
+    RECORD_DTYPE, Recommendation, RiskLevel, Signal, SummaryRecord,
+    count_by_recommendation, from_array, rank, select, technical_signals, to_array
+)
+
+
+def make_result(code, score, recommendation='持有', risk='中等风险', macd='金叉 - 买入信号',
+                kdj='震荡 - 观望', generated_by='Rule'):
+    return {
+        'stock_code': code,
+        'stock_name': f'股票{code}',
+        'success': True,
+        'technical_analysis': {
+            'basic_info': {'close': 10.5, 'change_pct': -1.25},
+            'technical_indicators': {'ma': {'trend': '强势上涨'}, 'macd': {'signal': macd},
+                                     'kdj': {'signal': kdj}},
+        },
+        'summary': {'overall_score': score, 'recommendation': recommendation, 'risk_level': risk,
+                    'score_details': {'技术面': 80.0, '资金面': 55.0},
+                    'key_points': ['✓ 均线多头排列，趋势强劲'], 'generated_by': generated_by},
+    }
+
+
+class TestSummaryRecord(unittest.TestCase):
+    """SummaryRecord 转换测试用例"""
+
+    def test_from_result(self):
+        record = SummaryRecord.from_result(make_result('002115', 72.5, kdj='超买 - 注意回调风险'))
+
+        self.assertEqual(record.recommendation, Recommendation.HOLD)
+        self.assertEqual(record.risk_level, RiskLevel.MEDIUM)
+        self.assertEqual(record.technical_score, 80.0)
+        self.assertTrue(math.isnan(record.fundamental_score))
+        self.assertEqual(record.signals, Signal.MA_BULL | Signal.MACD_GOLDEN | Signal.KDJ_OVERBOUGHT)
+        self.assertEqual(record.close, 10.5)
+        self.assertFalse(hasattr(record, '__dict__'))
+
+    def test_round_trip_to_dict(self):
+        summary = SummaryRecord.from_result(make_result('002115', 72.5)).to_result()['summary']
+        self.assertEqual(summary, {'overall_score': 72.5, 'risk_level': '中等风险', 'recommendation': '持有',
+                                   'score_details': {'技术面': 80.0, '资金面': 55.0}})
+
+    def test_unknown_labels_and_ai(self):
+        record = SummaryRecord.from_result({
+            'stock_code': '000001', 'success': True,
+            'summary': {'overall_score': 50, 'recommendation': '强烈推荐', 'generated_by': 'DeepSeek AI'},
+        })
+        self.assertEqual(record.recommendation, Recommendation.WATCH)
+        self.assertEqual(record.risk_level, RiskLevel.UNKNOWN)
+        self.assertEqual(record.signals, Signal.AI)
+        self.assertEqual(record.stock_name, '000001')
+        self.assertEqual(technical_signals({'error': '数据不足'}), Signal.NONE)
+
+
+class TestRecordArray(unittest.TestCase):
+    """结构化数组批量操作测试用例"""
+
+    def setUp(self):
+        self.results = [
+            make_result('000001', 45.0, '规避', '高风险', macd='死叉 - 卖出信号'),
+            make_result('002115', 72.5),
+            {'stock_code': '300001', 'success': False, 'error': '超时'},
+            make_result('600036', 81.0, '买入', '低风险', kdj='超买 - 注意回调风险'),
+            make_result('600519', 72.5, '持有', '低风险'),
+        ]
+        self.array = to_array(self.results)
+
+    def test_to_array(self):
+        self.assertEqual(self.array.dtype, RECORD_DTYPE)
+        self.assertEqual(list(self.array['stock_code']), ['000001', '002115', '600036', '600519'])
+        self.assertEqual(self.array['recommendation'][0], Recommendation.AVOID)
+        self.assertEqual(len(to_array([])), 0)
+
+    def test_from_array(self):
+        records = from_array(self.array[1:2])
+        self.assertEqual(records[0].stock_code, '002115')
+        self.assertIs(type(records[0].recommendation), Recommendation)
+        self.assertEqual(records[0].to_summary()['recommendation'], '持有')
+
+    def test_rank(self):
+        array = np.concatenate([self.array, to_array([SummaryRecord('000002', '万科A', math.nan)])])
+        self.assertEqual(list(rank(array)['stock_code']), ['600036', '002115', '600519', '000001', '000002'])
+        self.assertEqual(list(rank(array, descending=False)['stock_code'])[:2], ['000001', '002115'])
+        self.assertEqual(list(rank(array, by='change_pct')['stock_code'])[0], '000001')
+        # 只取前几条时结果与完整排序一致（并列的 002115、600519 保持原顺序）
+        self.assertEqual(list(rank(array, limit=3)['stock_code']), ['600036', '002115', '600519'])
+        self.assertEqual(list(rank(array, limit=2)['stock_code']), ['600036', '002115'])
+        self.assertEqual(len(rank(array, limit=0)), 0)
+
+    def test_select(self):
+        codes = lambda array: list(array['stock_code'])
+        self.assertEqual(codes(select(self.array, min_score=70)), ['002115', '600036', '600519'])
+        self.assertEqual(codes(select(self.array, max_score=50)), ['000001'])
+        self.assertEqual(codes(select(self.array, recommendations=[Recommendation.BUY])), ['600036'])
+        self.assertEqual(codes(select(self.array, max_risk=RiskLevel.LOW)), ['600036', '600519'])
+        self.assertEqual(codes(select(self.array, signals=Signal.MACD_GOLDEN,
+                                      exclude_signals=Signal.KDJ_OVERBOUGHT)), ['002115', '600519'])
+
+    def test_count_by_recommendation(self):
+        counts = count_by_recommendation(self.array)
+        self.assertEqual(counts, {Recommendation.AVOID: 1, Recommendation.WATCH: 0,
+                                  Recommendation.HOLD: 2, Recommendation.BUY: 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
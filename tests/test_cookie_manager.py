@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Cookie 管理器单元测试
+"""
+
+import unittest
+import sys
+import os
+import json
+import multiprocessing
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.cookie_manager import CookieManager
+
+
+class TestCookieManager(unittest.TestCase):
+    """Cookie 池测试用例"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cookie_file = os.path.join(self.tmpdir.name, "cookies.json")
+        with open(self.cookie_file, 'w') as f:
+            json.dump(["a=1", "b=2", "c=3"], f)
+        self.manager = CookieManager(self.cookie_file, save_delay=60)
+
+    def tearDown(self):
+        self.manager.flush()
+        self.tmpdir.cleanup()
+
+    def _read_file(self):
+        with open(self.cookie_file) as f:
+            return json.load(f)
+
+    def test_round_robin(self):
+        """测试轮询分配 cookie"""
+        picked = [self.manager.get_cookie() for _ in range(4)]
+        self.assertEqual(picked, ["a=1", "b=2", "c=3", "a=1"])
+
+    def test_transient_failure_cools_down(self):
+        """测试临时失败进入冷却期而不是删除"""
+        self.manager.report_failure("a=1")
+
+        picked = {self.manager.get_cookie() for _ in range(4)}
+        self.assertEqual(picked, {"b=2", "c=3"})
+        self.assertIn("a=1", self.manager.get_all_cookies())
+
+        self.manager.report_success("a=1", 0.1)
+        self.assertEqual(self.manager.get_stats()["a=1"]['cooldown_until'], 0.0)
+        self.assertEqual(self.manager.get_stats()["a=1"]['latency'], 0.1)
+
+    def test_repeated_or_permanent_failure_removes(self):
+        """测试连续失败或明确失效时删除 cookie"""
+        self.manager.report_failure("b=2", transient=False)
+        for _ in range(CookieManager.MAX_CONSECUTIVE_FAILURES):
+            self.manager.report_failure("c=3")
+
+        self.assertEqual(self.manager.get_all_cookies(), ["a=1"])
+
+    def test_debounced_atomic_save(self):
+        """测试新增被合并写入，删除立即落盘"""
+        self.manager.add_cookie("d=4")
+        self.assertEqual(self._read_file(), ["a=1", "b=2", "c=3"])
+
+        self.manager.remove_cookie("a=1")
+        self.assertEqual(self._read_file(), ["b=2", "c=3", "d=4"])
+        self.assertNotIn(".tmp", "".join(os.listdir(self.tmpdir.name)))
+
+    def test_invalidation_visible_to_other_instances(self):
+        """测试一个实例删除的 cookie 在其他实例中停用"""
+        other = CookieManager(self.cookie_file, save_delay=60, check_interval=0)
+        self.manager.report_failure("b=2", transient=False)
+
+        self.assertEqual(other.get_all_cookies(), ["a=1", "c=3"])
+        self.assertNotIn("b=2", {other.get_cookie() for _ in range(3)})
+
+    def test_concurrent_writers_merge(self):
+        """测试多个实例的写入互相合并而不是覆盖"""
+        other = CookieManager(self.cookie_file, save_delay=60, check_interval=0)
+        self.manager.add_cookie("x=1")
+        other.add_cookie("y=2")
+        self.manager.flush()
+        other.flush()
+
+        self.assertEqual(self._read_file(), ["a=1", "b=2", "c=3", "x=1", "y=2"])
+
+    @unittest.skipUnless(hasattr(os, "fork"), "需要 fork 支持")
+    def test_multi_process_writers(self):
+        """测试多进程并发写入不丢失更新"""
+        ctx = multiprocessing.get_context("fork")
+        workers = [ctx.Process(target=_add_cookies, args=(self.cookie_file, i)) for i in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(len(self._read_file()), 3 + 4 * 10)
+
+
+def _add_cookies(cookie_file, worker_id):
+    """子进程：逐个添加 cookie 并立即写入"""
+    manager = CookieManager(cookie_file, save_delay=0)
+    for i in range(10):
+        manager.add_cookie(f"w{worker_id}={i}")
+
+if __name__ == '__main__':
+    unittest.main()
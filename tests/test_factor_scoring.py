@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+横截面因子评分单元测试
+"""
+
+import unittest
+import sys
+import os
+import time
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.factor_scoring import (
+    build_factor_frame, normalize, score_universe, technical_factors, RANK, ZSCORE
+)
+from app.utils.wencai_cache import BATCH_SECTION
+
+
+def make_technical(trend, macd, kdj, room=5.0):
+    return {
+        'technical_indicators': {'ma': {'trend': trend}, 'macd': {'signal': macd}, 'kdj': {'signal': kdj}},
+        'support_resistance': {'resistance_distance': room},
+    }
+
+
+class TestFactorScoring(unittest.TestCase):
+    """因子评分测试用例"""
+
+    def setUp(self):
+        self.technicals = {
+            'bull': make_technical('强势上涨', '金叉 - 买入信号', '金叉向上 - 买入', 15.0),
+            'flat': make_technical('震荡整理', '震荡 - 等待', '震荡 - 观望', 5.0),
+            'bear': make_technical('弱势下跌', '死叉 - 卖出信号', '超买 - 注意回调风险', 1.0),
+            'none': {'error': 'K线数据为空'},
+        }
+        self.diagnoses = {
+            'bull': {BATCH_SECTION: {'市盈率(pe)': 15, '净资产收益率roe': 20}, '重要新闻': []},
+            'flat': {BATCH_SECTION: {'市盈率(pe)': 40, '净资产收益率roe': 8}},
+            'bear': {BATCH_SECTION: {'市盈率(pe)': -10, '净资产收益率roe': -5}},
+        }
+
+    def test_technical_signals(self):
+        """测试技术信号映射为数值，失败的结果为 NaN"""
+        frame = technical_factors(self.technicals)
+        self.assertEqual(frame.loc['bull', ['ma_trend', 'macd_signal', 'kdj_signal']].tolist(), [1, 2, 2])
+        self.assertEqual(frame.loc['bear', ['ma_trend', 'macd_signal', 'kdj_signal']].tolist(), [-1, -2, -1])
+        self.assertTrue(frame.loc['none'].isna().all())
+
+    def test_ranking(self):
+        """测试横截面排名，缺失的维度记为中性"""
+        frame = build_factor_frame(self.technicals, self.diagnoses, {'bull': 3})
+        for method in (RANK, ZSCORE):
+            ranking = score_universe(frame, method=method)
+            self.assertEqual(ranking.index[0], 'bull')
+            self.assertEqual(ranking.loc['bull', 'rank'], 1)
+            self.assertEqual(ranking.loc['none', 'technical_score'], 50.0)
+            self.assertGreater(ranking.loc['flat', 'overall_score'], ranking.loc['bear', 'overall_score'])
+
+    def test_weights(self):
+        """测试权重可配置，只计算权重大于 0 的维度"""
+        frame = build_factor_frame(self.technicals, self.diagnoses)
+        ranking = score_universe(frame, {'news': 1.0})
+        self.assertEqual(list(ranking.columns), ['news_score', 'overall_score', 'rank'])
+        self.assertEqual(ranking.index[0], 'bull')
+        with self.assertRaises(ValueError):
+            score_universe(frame, {'technical': 0})
+
+    def test_normalize_constant_column(self):
+        """测试没有区分度的因子记为 0.5，缺失值保持 NaN"""
+        frame = build_factor_frame({'a': None, 'b': None}, {})
+        normalized = normalize(frame)
+        self.assertTrue((normalized['important_news'] == 0.5).all())
+        self.assertTrue(normalized['roe'].isna().all())
+
+    def test_large_universe_is_fast(self):
+        """测试 5000 只股票的评分排名在 1 秒内完成"""
+        rng = np.random.default_rng(0)
+        frame = build_factor_frame({}, {})
+        frame = frame.reindex([f"{i:06d}" for i in range(5000)])
+        frame[:] = rng.normal(size=frame.shape)
+
+        started = time.perf_counter()
+        ranking = score_universe(frame)
+        self.assertLess(time.perf_counter() - started, 1.0)
+        self.assertEqual(sorted(ranking['rank'])[:2], [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+持仓纪律检查单元测试
+"""
+
+import unittest
+import sys
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from datetime import time as dtime
+from unittest.mock import MagicMock, patch
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils import holdings_review
+from app.utils.holdings_review import (
+    HoldingsReviewJob, decide, next_run, ADD, HOLD, STOP_LOSS, FULL, FAST, RULE
+)
+
+
+def make_result(score, recommendation='持有'):
+    return {'success': True, 'stock_name': '测试',
+            'summary': {'overall_score': score, 'recommendation': recommendation}}
+
+
+class TestDecide(unittest.TestCase):
+    """决定规则测试用例"""
+
+    def test_rules(self):
+        holding = {'code': '002115', 'cost': 10.0}
+        self.assertEqual(decide(holding, 9.0, make_result(90))['decision'], STOP_LOSS)
+        self.assertEqual(decide({**holding, 'stop_loss': 12}, 9.0, None)['decision'], HOLD)
+        self.assertEqual(decide(holding, 9.8, make_result(40, '规避'))['decision'], STOP_LOSS)
+        self.assertEqual(decide(holding, 10.5, make_result(80, '买入'))['decision'], ADD)
+        # 亏损时不加仓
+        self.assertEqual(decide(holding, 9.8, make_result(80, '买入'))['decision'], HOLD)
+        self.assertEqual(decide(holding, None, None)['decision'], HOLD)
+
+    def test_next_run_skips_weekend(self):
+        friday_after = datetime(2024, 1, 19, 15, 0)
+        self.assertEqual(next_run(dtime(14, 40), friday_after), datetime(2024, 1, 22, 14, 40))
+        self.assertEqual(next_run(dtime(14, 40), datetime(2024, 1, 22, 9, 0)), datetime(2024, 1, 22, 14, 40))
+
+
+class TestHoldingsReviewJob(unittest.TestCase):
+    """截止时间调度测试用例"""
+
+    def setUp(self):
+        self.prices = {'A': 9.5, 'B': 10.0, 'C': 8.0, 'D': 11.0}
+        self.holdings = [{'code': code, 'cost': 10.0} for code in self.prices]
+        self.modes = {}
+        self.lock = threading.Lock()
+        self.delay = {FULL: 0.05, FAST: 0.01}
+
+        def analyze(code, name, **kwargs):
+            mode = FULL if kwargs['use_ai'] is None else FAST
+            with self.lock:
+                self.modes[code] = mode
+            time.sleep(self.delay[mode])
+            return make_result(60)
+
+        self.analyzer = MagicMock()
+        self.analyzer.analyze_stock.side_effect = analyze
+        self.job = HoldingsReviewJob(self.analyzer, concurrency=2, price_source=self.prices.get)
+        self.margin = holdings_review.SAFETY_MARGIN
+        holdings_review.SAFETY_MARGIN = 0.0
+
+    def tearDown(self):
+        holdings_review.SAFETY_MARGIN = self.margin
+
+    def deadline(self, seconds):
+        return datetime.now() + timedelta(seconds=seconds)
+
+    def test_full_analysis_in_risk_order(self):
+        """测试时间充足时全部完整分析，结果按风险从高到低排列"""
+        self.job.estimates = {FULL: 0.1, FAST: 0.02}
+        decisions = self.job.run(self.holdings, deadline=self.deadline(5))
+
+        self.assertEqual([d['code'] for d in decisions], ['C', 'A', 'B', 'D'])
+        self.assertEqual(decisions[0]['decision'], STOP_LOSS)
+        self.assertTrue(all(d['mode'] == FULL for d in decisions))
+
+    def test_degrades_when_budget_tight(self):
+        """测试时间不够时跳过大模型，改为只读缓存"""
+        self.job.estimates = {FULL: 10.0, FAST: 0.02}
+        decisions = self.job.run(self.holdings, deadline=self.deadline(1))
+
+        self.assertEqual(set(self.modes.values()), {FAST})
+        self.assertTrue(all(d['mode'] == FAST for d in decisions))
+        _, kwargs = self.analyzer.analyze_stock.call_args
+        self.assertTrue(kwargs['cache_only'])
+
+    def test_every_holding_decided_before_deadline(self):
+        """测试分析太慢时截止前不再等待，按价格规则给出决定"""
+        self.delay = {FULL: 2.0, FAST: 2.0}
+        self.job.estimates = {FULL: 0.01, FAST: 0.01}
+        started = time.monotonic()
+        decisions = self.job.run(self.holdings, deadline=self.deadline(0.3))
+
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertEqual(len(decisions), 4)
+        self.assertTrue(all(d['mode'] == RULE for d in decisions))
+        self.assertEqual({d['code']: d['decision'] for d in decisions}['C'], STOP_LOSS)
+
+    def test_default_prices_polled_when_service_idle(self):
+        """测试行情轮询没有运行时，开始前拉取一次快照用于排序和止损"""
+        service = MagicMock(running=False)
+        service.get_latest_price.side_effect = self.prices.get
+        with patch.object(holdings_review, 'quote_service', service):
+            job = HoldingsReviewJob(self.analyzer, concurrency=2)
+            job.estimates = {FULL: 0.1, FAST: 0.02}
+            decisions = job.run(self.holdings, deadline=self.deadline(5))
+
+        service.poll_once.assert_called_once()
+        self.assertEqual([d['code'] for d in decisions], ['C', 'A', 'B', 'D'])
+        self.assertEqual(decisions[0]['decision'], STOP_LOSS)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+进程内埋点单元测试
+"""
+
+import unittest
+import sys
+import os
+import json
+from unittest.mock import patch
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.instrumentation import (
+    CACHE_HIT, CACHE_MISS, Histogram, Metrics, current_span, record_cache, record_queue_wait
+)
+from app.utils.rate_limiter import RateLimiter
+
+
+class TestHistogram(unittest.TestCase):
+    """直方图测试用例"""
+
+    def test_observe_and_quantile(self):
+        histogram = Histogram((0.1, 1.0, 10.0))
+        for value in (0.05, 0.5, 0.5, 5.0):
+            histogram.observe(value)
+
+        self.assertEqual(histogram.counts, [1, 2, 1, 0])
+        self.assertEqual(histogram.count, 4)
+        self.assertAlmostEqual(histogram.sum, 6.05)
+        self.assertAlmostEqual(histogram.quantile(0.5), 0.55)
+        self.assertIsNone(Histogram().quantile(0.5))
+
+    def test_overflow_bucket(self):
+        histogram = Histogram((0.1, 1.0))
+        histogram.observe(100.0)
+        self.assertEqual(histogram.counts, [0, 0, 1])
+        self.assertEqual(histogram.quantile(0.99), 1.0)
+
+
+class TestMetrics(unittest.TestCase):
+    """指标注册表测试用例"""
+
+    def setUp(self):
+        self.metrics = Metrics(buckets=(0.1, 1.0))
+
+    def test_span_records_attributes(self):
+        with self.metrics.span('eastmoney.request', endpoint='kline') as span:
+            self.assertIs(current_span(), span)
+            with self.metrics.span('inner') as inner:
+                record_cache(CACHE_HIT)
+                record_queue_wait(0.2)
+            span.bytes = 1024
+            span.retries = 2
+        self.assertIsNone(current_span())
+
+        self.assertEqual(inner.parent, 'eastmoney.request')
+        self.assertEqual(inner.cache, CACHE_HIT)
+        self.assertAlmostEqual(inner.queue_wait, 0.2)
+        self.assertIsNone(span.cache)
+        self.assertIsNotNone(span.duration)
+
+        snapshot = self.metrics.snapshot()
+        json.dumps(snapshot)
+        durations = {h['labels']['span']: h for h in snapshot['histograms']
+                     if h['name'] == 'span_duration_seconds'}
+        self.assertEqual(durations['eastmoney.request']['labels']['endpoint'], 'kline')
+        self.assertEqual(durations['inner']['count'], 1)
+        counters = {(c['name'], c['labels']['span']): c for c in snapshot['counters']}
+        self.assertEqual(counters['span_bytes_total', 'eastmoney.request']['value'], 1024)
+        self.assertEqual(counters['span_retries_total', 'eastmoney.request']['value'], 2)
+        self.assertEqual(counters['span_cache_total', 'inner']['labels']['result'], CACHE_HIT)
+        self.assertEqual([s['name'] for s in snapshot['spans']], ['inner', 'eastmoney.request'])
+
+    def test_span_records_error(self):
+        with self.assertRaises(ValueError):
+            with self.metrics.span('wencai.fetch'):
+                raise ValueError("boom")
+
+        counters = self.metrics.snapshot()['counters']
+        self.assertEqual(counters[0]['name'], 'span_errors_total')
+        self.assertEqual(counters[0]['labels'], {'span': 'wencai.fetch', 'error': 'ValueError'})
+
+    def test_prometheus_format(self):
+        self.metrics.observe('span_duration_seconds', 0.05, span='a')
+        self.metrics.observe('span_duration_seconds', 0.5, span='a')
+        self.metrics.inc('span_cache_total', span='a', result=CACHE_MISS)
+        text = self.metrics.to_prometheus(prefix='test')
+
+        self.assertIn('# TYPE test_span_duration_seconds histogram', text)
+        self.assertIn('test_span_duration_seconds_bucket{span="a",le="0.1"} 1', text)
+        self.assertIn('test_span_duration_seconds_bucket{span="a",le="1.0"} 2', text)
+        self.assertIn('test_span_duration_seconds_bucket{span="a",le="+Inf"} 2', text)
+        self.assertIn('test_span_duration_seconds_count{span="a"} 2', text)
+        self.assertIn('# TYPE test_span_cache_total counter', text)
+        self.assertIn('test_span_cache_total{result="miss",span="a"} 1', text)
+
+    def test_disabled(self):
+        self.metrics.enabled = False
+        with self.metrics.span('a'):
+            pass
+        self.assertEqual(self.metrics.snapshot()['histograms'], [])
+
+    def test_rate_limiter_wait_counts_as_queue_wait(self):
+        limiter = RateLimiter(rate=1000.0, burst=1)
+        with patch('app.utils.rate_limiter.time.sleep'):
+            with self.metrics.span('ths.request') as span:
+                limiter.acquire()
+                limiter.acquire()
+        self.assertGreater(span.queue_wait, 0)
+
+    def test_format_report(self):
+        with self.metrics.span('wencai.diagnosis') as span:
+            span.cache = CACHE_HIT
+        with self.metrics.span('wencai.diagnosis') as span:
+            span.cache = CACHE_MISS
+        report = self.metrics.format_report()
+        self.assertIn('wencai.diagnosis', report)
+        self.assertIn('50%', report)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+新闻正文抓取与限速单元测试
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+import time
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from app.utils.news_fetcher import ArticleFetcher, extract_text
+from app.utils.news_store import NewsStore
+from app.utils.rate_limiter import RateLimiter
+from tests.test_news_store import make_matcher
+
+ARTICLE = (
+    '<html><head><meta charset="gbk"><script>var a = 1;</script></head><body>'
+    '<div class="nav"><p>导航</p></div>'
+    '<div class="main-text atc-content"><p>三维通信  午后涨停。</p><p></p>'
+    '<p>公司公告<b>中标</b>项目。</p><script>track()</script></div></body></html>'
+)
+
+
+class TestArticleFetcher(unittest.IsolatedAsyncioTestCase):
+    """正文抓取测试用例"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = NewsStore(":memory:", matcher=make_matcher(self.tmpdir.name))
+        self.requests = []
+
+        def handler(request):
+            self.requests.append(str(request.url))
+            if request.url.path.endswith('404.shtml'):
+                return httpx.Response(404)
+            return httpx.Response(200, content=ARTICLE.encode('gbk'))
+
+        self.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        self.fetcher = ArticleFetcher(self.store, RateLimiter(1000, 100), client=self.client)
+        self.news = [
+            {'data_seq': str(i), 'title': f'新闻{i}', 'time': '09:30',
+             'url': f'https://news.10jqka.com.cn/{i}.shtml'}
+            for i in range(5)
+        ]
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+        self.store.conn.close()
+        self.tmpdir.cleanup()
+
+    async def test_fetch_once_per_data_seq(self):
+        """测试每篇文章只下载和保存一次"""
+        articles = await self.fetcher.fetch_async(self.news)
+        again = await self.fetcher.fetch_async(self.news)
+
+        self.assertEqual(len(articles), 5)
+        self.assertEqual(again, [])
+        self.assertEqual(len(self.requests), 5)
+        self.assertEqual(self.store.get('3')['body'], "三维通信 午后涨停。\n公司公告中标项目。")
+
+    async def test_failed_download_not_stored(self):
+        """测试下载失败的文章不保存，下次重试"""
+        news = {'data_seq': '9', 'title': '失败', 'url': 'https://news.10jqka.com.cn/404.shtml'}
+        self.assertEqual(await self.fetcher.fetch_async([news]), [])
+        self.assertFalse(self.store.has('9'))
+
+    def test_extract_text_without_known_container(self):
+        """测试没有已知正文容器时取段落最多的元素"""
+        page = '<html><body><div><p>甲</p></div><section><p>正文一</p><p>正文二</p></section></body></html>'
+        self.assertEqual(extract_text(page.encode('utf-8')), "正文一\n正文二")
+
+
+class TestRateLimiter(unittest.TestCase):
+    """限速器测试用例"""
+
+    def test_rate_is_enforced(self):
+        """测试超过突发数后按速率放行"""
+        limiter = RateLimiter(rate=20, burst=2)
+        started = time.monotonic()
+        for _ in range(6):
+            limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - started, 0.19)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+新闻全文索引单元测试
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+import time
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.news_store import NewsStore, StockMatcher, DAY
+from app.utils.symbol_master import SymbolMaster
+
+
+def make_matcher(tmpdir):
+    """构造只包含几只股票的识别器"""
+    master = SymbolMaster(cache_file=os.path.join(tmpdir, "symbols.json"))
+    master.load_rows([
+        {'f12': '002115', 'f13': 0, 'f14': '三维通信'},
+        {'f12': '601318', 'f13': 1, 'f14': '中国平安'},
+        {'f12': '000001', 'f13': 0, 'f14': '平安银行'},
+    ])
+    return StockMatcher(master)
+
+
+class TestNewsStore(unittest.TestCase):
+    """全文索引和股票映射测试用例"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = NewsStore(":memory:", matcher=make_matcher(self.tmpdir.name))
+        now = time.time()
+        self.store.save({'data_seq': '1', 'title': '三维通信午后涨停', 'content': '算力概念活跃'},
+                        '公司公告中标项目', )
+        self.store.save({'data_seq': '2', 'title': '保险股走强', 'published_at': now - 10 * DAY},
+                        '中国平安、601318 领涨，三维通信跟涨')
+        self.store.save({'data_seq': '3', 'title': '银行板块异动'}, '平安银行放量')
+
+    def tearDown(self):
+        self.store.conn.close()
+        self.tmpdir.cleanup()
+
+    def test_full_text_search(self):
+        """测试全文检索标题、摘要和正文"""
+        self.assertTrue(self.store.fts_enabled)
+        self.assertEqual([a['data_seq'] for a in self.store.search("中标项目")], ['1'])
+        self.assertEqual([a['data_seq'] for a in self.store.search("算力概")], ['1'])
+        self.assertEqual({a['data_seq'] for a in self.store.search("三维通信")}, {'1', '2'})
+        self.assertEqual([a['data_seq'] for a in self.store.search("三维通信", days=5)], ['1'])
+        # 少于3个字符退回 LIKE
+        self.assertEqual({a['data_seq'] for a in self.store.search("平安")}, {'2', '3'})
+
+    def test_stock_mapping(self):
+        """测试新闻与股票代码的映射"""
+        self.assertEqual({a['data_seq'] for a in self.store.news_for_stock("002115", days=None)}, {'1', '2'})
+        self.assertEqual([a['data_seq'] for a in self.store.news_for_stock("三维通信")], ['1'])
+        self.assertEqual([a['data_seq'] for a in self.store.news_for_stock("601318", days=None)], ['2'])
+        self.assertEqual([a['data_seq'] for a in self.store.news_for_stock("000001")], ['3'])
+        self.assertEqual(self.store.news_for_stock("不存在"), [])
+
+    def test_mention_counts(self):
+        """测试一次统计全部股票的新闻条数"""
+        self.assertEqual(self.store.mention_counts(days=None), {'002115': 2, '601318': 1, '000001': 1})
+        self.assertEqual(self.store.mention_counts(), {'002115': 1, '000001': 1})
+
+    def test_wencai_news_saved_once(self):
+        """测试问财重要新闻按标题和时间去重，并关联查询的股票"""
+        items = [{'标题': '公司获得专利', '发布时间': '2024-01-19 10:00:00', '内容': '新专利'}]
+        self.assertEqual(self.store.save_wencai_news("三维通信", items), 1)
+        self.assertEqual(self.store.save_wencai_news("三维通信", items), 0)
+
+        article = self.store.search("获得专利", code='002115')[0]
+        self.assertEqual(article['source'], 'wencai')
+        self.assertEqual(article['published_at'], time.mktime((2024, 1, 19, 10, 0, 0, 0, 0, -1)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+实时行情快照环形缓冲区单元测试
+"""
+
+import unittest
+import sys
+import os
+from datetime import datetime
+from unittest.mock import MagicMock
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.eastmoney_api import EastMoneyAPI
+from app.utils.quote_snapshot import QuoteRingBuffer, QuoteSnapshotService
+from app.utils.trading_calendar import is_trading_time, trading_session
+
+
+def _row(code, price, volume, name="测试"):
+    return {'f12': code, 'f13': 0, 'f14': name, 'f2': price, 'f5': volume, 'f3': '-'}
+
+
+class TestQuoteRingBuffer(unittest.TestCase):
+    """行情环形缓冲区测试用例"""
+
+    def setUp(self):
+        self.buffer = QuoteRingBuffer(max_symbols=10, capacity=3)
+
+    def test_latest_and_delta(self):
+        """测试最新行情和逐笔变化量"""
+        self.buffer.append([_row("002115", 11.5, 100), _row("000001", 10.0, 50)], timestamp=1.0)
+        self.buffer.append([_row("002115", 11.7, 160), _row("000001", 9.9, 80)], timestamp=2.0)
+
+        quote = self.buffer.latest("002115")
+        self.assertEqual(quote['price'], 11.7)
+        self.assertIsNone(quote['change_pct'])
+        self.assertAlmostEqual(quote['delta']['price'], 0.2)
+        self.assertEqual(quote['delta']['volume'], 60)
+        self.assertEqual(self.buffer.latest_price("000001"), 9.9)
+        self.assertIsNone(self.buffer.latest("600000"))
+
+    def test_ring_wraps_around(self):
+        """测试缓冲区写满后覆盖最旧快照"""
+        for i in range(5):
+            self.buffer.append([_row("002115", 10.0 + i, 100)], timestamp=float(i))
+
+        self.assertEqual(len(self.buffer), 3)
+        self.assertEqual(list(self.buffer.history("002115")), [12.0, 13.0, 14.0])
+
+    def test_symbol_missing_from_snapshot(self):
+        """测试股票在新快照中缺失时不返回过期价格"""
+        self.buffer.append([_row("002115", 11.5, 100)])
+        self.buffer.append([_row("000001", 10.0, 50)])
+
+        self.assertIsNone(self.buffer.latest_price("002115"))
+
+    def test_poll_once(self):
+        """测试服务单次轮询写入缓冲区"""
+        api = MagicMock()
+        api.get_market_snapshot.return_value = [_row("002115", 11.5, 100)]
+        service = QuoteSnapshotService(buffer=self.buffer, api=api)
+
+        self.assertTrue(service.poll_once())
+        self.assertEqual(service.get_latest_price("002115"), 11.5)
+
+
+class TestMarketSnapshot(unittest.TestCase):
+    """全市场快照翻页测试用例"""
+
+    def setUp(self):
+        self.api = EastMoneyAPI()
+        self.failing = set()
+
+        def make_request(url, params, cookie=None):
+            pn, pz = params['pn'], params['pz']
+            if pn in self.failing:
+                return None
+            codes = range((pn - 1) * pz, min(pn * pz, 250))
+            return {'data': {'total': 250, 'diff': [_row(f"{i:06d}", 10.0, 1) for i in codes]}}
+
+        self.api._make_request = MagicMock(side_effect=make_request)
+
+    def test_fetch_all_pages(self):
+        """测试按第一页的总数并发请求其余页面"""
+        rows = self.api.get_market_snapshot(pz=100)
+
+        self.assertEqual(len(rows), 250)
+        self.assertEqual([r['f12'] for r in rows], [f"{i:06d}" for i in range(250)])
+        self.assertEqual(self.api._make_request.call_count, 3)
+
+    def test_page_failure_skips_tick(self):
+        """测试中间页失败时不返回不完整的快照"""
+        self.failing = {2}
+        self.assertIsNone(self.api.get_market_snapshot(pz=100))
+
+
+class TestTradingCalendar(unittest.TestCase):
+    """交易时间工具测试用例"""
+
+    def test_is_trading_time(self):
+        """测试交易时段判断"""
+        self.assertTrue(is_trading_time(datetime(2025, 10, 20, 10, 0)))
+        self.assertFalse(is_trading_time(datetime(2025, 10, 20, 12, 0)))
+        self.assertFalse(is_trading_time(datetime(2025, 10, 19, 10, 0)))
+
+    def test_trading_session(self):
+        """测试开盘前归属上一个交易日"""
+        self.assertEqual(trading_session(datetime(2025, 10, 20, 8, 0)).day, 17)
+        self.assertEqual(trading_session(datetime(2025, 10, 20, 14, 0)).day, 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+离线录制/回放工具单元测试
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+from unittest.mock import patch
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pywencai
+import requests
+
+from app.utils.eastmoney_api import EastMoneyAPI
+from app.utils.replay import FixtureStore, Recorder, Replayer
+from app.utils.wencai_api import WenCaiAPI
+
+
+def _fake_adapter_send(adapter, request, **kwargs):
+    """模拟网络层返回固定的K线数据"""
+    resp = requests.Response()
+    resp.status_code = 200
+    resp._content = b'{"data": {"code": "002115", "klines": []}}'
+    resp.url = request.url
+    resp.request = request
+    return resp
+
+
+class TestReplay(unittest.TestCase):
+    """录制和回放测试用例"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = FixtureStore(self.tmpdir.name)
+        self.api = EastMoneyAPI(cookie_file=os.path.join(self.tmpdir.name, "cookies.json"))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_record_then_replay(self):
+        """测试录制的响应可以离线回放"""
+        with patch('requests.adapters.HTTPAdapter.send', _fake_adapter_send):
+            with Recorder(self.store) as recorder:
+                recorded = self.api.get_stock_history(secid="0.002115", lmt=30)
+        self.assertEqual(recorder.recorded, 1)
+
+        with Replayer(self.store) as replayer:
+            replayed = self.api.get_stock_history(secid="0.002115", lmt=30)
+        self.assertEqual(replayed, recorded)
+        self.assertEqual(replayer.stats['hits'], 1)
+
+    def test_strict_miss(self):
+        """测试严格模式下缺少 fixture 时请求失败"""
+        with Replayer(self.store) as replayer:
+            self.assertIsNone(self.api.get_stock_history(secid="0.002115", lmt=30))
+        self.assertEqual(replayer.stats['misses'], 1)
+
+    def test_error_injection(self):
+        """测试错误注入"""
+        with patch('requests.adapters.HTTPAdapter.send', _fake_adapter_send):
+            with Recorder(self.store):
+                self.api.get_stock_history(secid="0.002115", lmt=30)
+
+        with Replayer(self.store, error_rate=1.0, error_kind='http_500') as replayer:
+            self.assertIsNone(self.api.get_stock_history(secid="0.002115", lmt=30))
+        self.assertEqual(replayer.stats['errors'], 1)
+
+    def test_pywencai_replay(self):
+        """测试问财调用按参数回放"""
+        original = pywencai.get
+        self.store.save_call(self.store.call_key('pywencai', {'query': '三维通信'}), {'简介': '测试'})
+
+        with Replayer(self.store):
+            self.assertEqual(WenCaiAPI.get_stock_diagnosis("三维通信", use_cache=False), {"简介": "测试"})
+        self.assertIs(pywencai.get, original)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+分析结果流式导出单元测试
+"""
+
+import unittest
+import sys
+import os
+import json
+import tempfile
+from datetime import date, datetime
+from unittest.mock import patch
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils import result_export
+from app.utils.result_export import (
+    EXPORT_FIELDS, JsonlSink, ParquetSink, flatten_result, load_history, open_sink, partition_dir
+)
+
+
+def make_result(code, score=72.5):
+    return {
+        'stock_code': code,
+        'stock_name': f'股票{code}',
+        'success': True,
+        'kline_data': {'klines': ['2024-01-19,10,11'] * 100},
+        'technical_analysis': {
+            'basic_info': {'date': '2024-01-19', 'close': 10.5, 'change_pct': 1.2, 'volume': 1000},
+            'technical_indicators': {'ma': {'trend': '强势上涨'}, 'macd': {'signal': '金叉 - 买入信号'},
+                                     'rsi': {'rsi6': 55.0}},
+            'support_resistance': {'support': 9.8, 'resistance': 11.2},
+            'dataframe': object(),
+        },
+        'recent_news': [{'title': 'a'}, {'title': 'b'}],
+        'timings': {'total': 1.5},
+        'summary': {'overall_score': score, 'recommendation': '买入', 'risk_level': '低风险',
+                    'score_details': {'技术面': 80, '资金面': 60},
+                    'key_points': ['✓ 均线多头排列', '○ ROE 12%'], 'risks': [], 'generated_by': 'Rule'},
+    }
+
+
+class TestFlattenResult(unittest.TestCase):
+    """扁平化测试用例"""
+
+    def test_flatten(self):
+        record = flatten_result(make_result('002115'), datetime(2024, 1, 19, 15, 0))
+
+        self.assertEqual(list(record), [name for name, _ in EXPORT_FIELDS])
+        self.assertEqual(record['analyzed_at'], '2024-01-19T15:00:00')
+        self.assertEqual(record['technical_score'], 80)
+        self.assertIsNone(record['fundamental_score'])
+        self.assertEqual(record['macd_signal'], '金叉 - 买入信号')
+        self.assertEqual(record['news_count'], 2)
+        self.assertEqual(record['key_points'], '✓ 均线多头排列\n○ ROE 12%')
+        self.assertIsNone(record['risks'])
+        json.dumps(record)
+
+    def test_flatten_failure(self):
+        record = flatten_result({'stock_code': '000001', 'success': False, 'error': '超时'})
+        self.assertFalse(record['success'])
+        self.assertEqual(record['error'], '超时')
+        self.assertIsNone(record['overall_score'])
+
+
+class TestJsonlSink(unittest.TestCase):
+    """JSONL 导出测试用例"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.directory = self.tmpdir.name
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_streams_each_result(self):
+        """测试每条结果写完即可读到，不必等到关闭"""
+        sink = JsonlSink(self.directory)
+        results = iter([make_result('002115'), make_result('600036')])
+        stream = sink.write_many(results)
+
+        next(stream)
+        path = sink.path_for(date.today())
+        self.assertEqual(len(path.read_text(encoding='utf-8').splitlines()), 1)
+        next(stream)
+        sink.close()
+
+        lines = path.read_text(encoding='utf-8').splitlines()
+        self.assertEqual([json.loads(line)['stock_code'] for line in lines], ['002115', '600036'])
+        self.assertEqual(sink.written, 2)
+
+    def test_appends_and_loads_partitions(self):
+        """测试多次运行追加到同一分区，按日期范围读取历史"""
+        old = partition_dir(self.directory, date(2024, 1, 18))
+        old.mkdir(parents=True)
+        (old / 'analysis.jsonl').write_text(
+            json.dumps(flatten_result(make_result('000001', 50.0)), ensure_ascii=False) + "\n", encoding='utf-8')
+
+        for code in ('002115', '600036'):
+            with open_sink(directory=self.directory) as sink:
+                sink.write(make_result(code))
+
+        history = load_history(self.directory)
+        self.assertEqual(len(history), 3)
+        self.assertEqual(history['stock_code'].tolist(), ['000001', '002115', '600036'])
+        self.assertEqual(history['date'].iloc[0], date(2024, 1, 18))
+
+        today = load_history(self.directory, start=date(2024, 1, 19))
+        self.assertEqual(today['stock_code'].tolist(), ['002115', '600036'])
+        self.assertEqual(today['overall_score'].tolist(), [72.5, 72.5])
+
+    def test_load_history_empty(self):
+        history = load_history(os.path.join(self.directory, 'missing'))
+        self.assertTrue(history.empty)
+        self.assertIn('overall_score', history.columns)
+
+
+class TestParquetSink(unittest.TestCase):
+    """Parquet 导出测试用例"""
+
+    def test_requires_pyarrow(self):
+        with patch.object(result_export, 'pa', None):
+            with self.assertRaises(ImportError):
+                ParquetSink()
+
+    @unittest.skipIf(result_export.pa is None, "未安装 pyarrow")
+    def test_writes_parts(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with ParquetSink(directory, batch_size=2) as sink:
+                for code in ('002115', '600036', '000001'):
+                    sink.write(make_result(code))
+
+            parts = list(partition_dir(directory, date.today()).glob('*.parquet'))
+            self.assertEqual(len(parts), 2)
+            history = load_history(directory)
+            self.assertEqual(sorted(history['stock_code']), ['000001', '002115', '600036'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+股票综合分析器单元测试
+"""
+
+import unittest
+import sys
+import os
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.analysis_cache import AnalysisCache
+from app.utils.instrumentation import metrics
+from app.utils.stock_comprehensive_analyzer import StockComprehensiveAnalyzer
+
+DELAY = 0.3
+
+
+class AnalyzerTestCase(unittest.TestCase):
+    """替换掉外部数据源的分析器"""
+
+    def setUp(self):
+        self.analyzer = StockComprehensiveAnalyzer(use_ai=False, cache=AnalysisCache())
+        self.calls = []
+        self.lock = threading.Lock()
+
+        def record(name):
+            with self.lock:
+                self.calls.append((name, time.perf_counter()))
+
+        def diagnosis(query, **kwargs):
+            time.sleep(DELAY)
+            record('diagnosis')
+            return {}
+
+        def history(secid, lmt):
+            time.sleep(DELAY)
+            record('kline')
+            return {'klines': []}
+
+        def analyze(kline_data):
+            record('technical')
+            return {'error': '数据不足'}
+
+        patches = [
+            patch.object(self.analyzer.wencai_api, 'get_stock_diagnosis', side_effect=diagnosis),
+            patch.object(self.analyzer.eastmoney_api, 'get_stock_history', side_effect=history),
+            patch.object(self.analyzer.technical_analyzer, 'analyze', side_effect=analyze),
+            patch.object(self.analyzer.symbol_master, 'resolve', return_value=None),
+            patch.object(self.analyzer, '_build_secid', return_value='0.002115'),
+            patch.object(self.analyzer, '_data_version', return_value=1.0),
+            patch('app.utils.stock_comprehensive_analyzer.news_store.news_for_stock', return_value=[]),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+
+class TestAnalyzeStockFanOut(AnalyzerTestCase):
+    """analyze_stock 并发获取测试用例"""
+
+    def test_sources_fetched_concurrently(self):
+        """测试问财和K线并发获取，总耗时约等于最慢的数据源"""
+        start = time.perf_counter()
+        result = self.analyzer.analyze_stock("002115", "三维通信")
+        elapsed = time.perf_counter() - start
+
+        self.assertLess(elapsed, DELAY * 1.8)
+        self.assertEqual(result['stock_name'], "三维通信")
+        self.assertEqual(result['kline_data'], {'klines': []})
+        self.assertIn('summary', result)
+        self.assertEqual(sorted(name for name, _ in self.calls), ['diagnosis', 'kline', 'technical'])
+        self.assertGreaterEqual(result['timings']['kline'], DELAY * 0.9)
+        self.assertLess(result['timings']['total'], DELAY * 1.8)
+
+    def test_technical_follows_kline(self):
+        """测试技术分析在K线返回后立即开始，不等待问财"""
+        def slow_diagnosis(query, **kwargs):
+            time.sleep(DELAY * 2)
+            self.calls.append(('diagnosis', time.perf_counter()))
+            return {}
+
+        with patch.object(self.analyzer.wencai_api, 'get_stock_diagnosis', side_effect=slow_diagnosis):
+            self.analyzer.analyze_stock("002115", "三维通信")
+
+        names = [name for name, _ in self.calls]
+        self.assertEqual(names, ['kline', 'technical', 'diagnosis'])
+
+    def test_async_variant(self):
+        """测试异步版本结果一致且并发获取"""
+        start = time.perf_counter()
+        result = asyncio.run(self.analyzer.analyze_stock_async("002115", "三维通信"))
+        elapsed = time.perf_counter() - start
+
+        self.assertLess(elapsed, DELAY * 1.8)
+        self.assertEqual(result['stock_code'], "002115")
+        self.assertEqual(result['recent_news'], [])
+
+    def test_result_cached(self):
+        """测试同一交易会话内重复分析直接返回缓存，use_cache=False 时重新分析"""
+        first = self.analyzer.analyze_stock("002115", "三维通信")
+        second = self.analyzer.analyze_stock("002115", "三维通信")
+        self.assertEqual(second['summary'], first['summary'])
+        self.assertEqual(len(self.calls), 3)
+
+        self.analyzer.analyze_stock("002115", "三维通信", use_cache=False)
+        self.assertEqual(len(self.calls), 6)
+
+    def test_stage_spans(self):
+        """测试各阶段作为 analyze 的子 span 记入全局指标，缓存命中只计数不计入 analyze 耗时"""
+        metrics.reset()
+        self.analyzer.analyze_stock("002115", "三维通信")
+        self.analyzer.analyze_stock("002115", "三维通信")
+        asyncio.run(self.analyzer.analyze_stock_async("002115", "三维通信"))
+
+        snapshot = metrics.snapshot()
+        counts = {h['labels']['span']: h['count'] for h in snapshot['histograms']
+                  if h['name'] == 'span_duration_seconds'}
+        self.assertEqual(counts['analyze'], 1)
+        for stage in ('diagnosis', 'kline', 'technical', 'news', 'summary'):
+            self.assertEqual(counts[f'analyze.{stage}'], 1)
+        parents = {s['name']: s['parent'] for s in snapshot['spans']}
+        self.assertEqual(parents['analyze.diagnosis'], 'analyze')
+        self.assertEqual(parents['analyze.kline'], 'analyze')
+        cache = {c['labels']['result']: c['value'] for c in snapshot['counters']
+                 if c['name'] == 'span_cache_total' and c['labels']['span'] == 'analysis_cache.lookup'}
+        self.assertEqual(cache, {'hit': 2, 'miss': 1})
+
+    def test_errors_propagate(self):
+        """测试数据源抛出的异常仍然传给调用方"""
+        with patch.object(self.analyzer.eastmoney_api, 'get_stock_history',
+                          side_effect=RuntimeError("boom")):
+            with self.assertRaises(RuntimeError):
+                self.analyzer.analyze_stock("002115", "三维通信")
+
+
+class TestStreamReport(AnalyzerTestCase):
+    """渐进式报告测试用例"""
+
+    def setUp(self):
+        super().setUp()
+
+        def slow_diagnosis(query, **kwargs):
+            time.sleep(DELAY * 2)
+            return {'所属概念列表': ['5G'], '重要新闻': []}
+
+        p = patch.object(self.analyzer.wencai_api, 'get_stock_diagnosis', side_effect=slow_diagnosis)
+        p.start()
+        self.addCleanup(p.stop)
+
+    def test_sections_arrive_as_data_is_ready(self):
+        """测试技术面在问财返回前输出，评分和完整结果最后输出"""
+        parts = list(self.analyzer.stream_report("002115", "三维通信"))
+        sections = [part['section'] for part in parts]
+        elapsed = {part['section']: part['elapsed'] for part in parts}
+
+        self.assertEqual(sections, ['header', 'technical', 'fund', 'fundamental', 'news', 'summary', 'done'])
+        self.assertLess(elapsed['header'], DELAY / 2)
+        self.assertLess(elapsed['technical'], DELAY * 1.5)
+        self.assertGreaterEqual(elapsed['fund'], DELAY * 2)
+        self.assertIn('三维通信', parts[0]['text'])
+        self.assertIn('包含概念题材', parts[4]['text'])
+
+        result = parts[-1]['result']
+        self.assertTrue(result['success'])
+        self.assertEqual(result['summary']['overall_score'], parts[5]['score'])
+        self.assertIn('summary', result['timings'])
+
+    def test_ai_summary_last_and_cached(self):
+        """测试AI分析在规则评分之后输出，完整结果写入缓存"""
+        self.analyzer.use_ai = True
+        ai_summary = {'overall_score': 88.0, 'risk_level': '低风险', 'recommendation': '买入',
+                      'key_points': [], 'risks': [], 'opportunities': [], 'generated_by': 'DeepSeek AI'}
+        with patch.object(self.analyzer, '_generate_ai_summary', return_value=ai_summary):
+            parts = list(self.analyzer.stream_report("002115", "三维通信"))
+
+        self.assertEqual([p['section'] for p in parts][-3:], ['summary', 'ai', 'done'])
+        self.assertIn('初步评分', parts[-3]['text'])
+        self.assertEqual(parts[-1]['result']['summary'], ai_summary)
+
+        cached = list(self.analyzer.stream_report("002115", "三维通信"))
+        self.assertEqual([p['section'] for p in cached], ['header', 'summary', 'done'])
+        self.assertEqual(cached[-1]['result']['summary'], ai_summary)
+
+
+class TestAnalyzeMany(AnalyzerTestCase):
+    """analyze_many 批量分析测试用例"""
+
+    def test_bounded_pool_streams_results(self):
+        """测试有界并发、按完成先后返回并报告进度"""
+        active, peak = [0], [0]
+
+        def history(secid, lmt):
+            with self.lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with self.lock:
+                active[0] -= 1
+            return None
+
+        seen = []
+        stocks = [f"{i:06d}" for i in range(12)]
+        with patch.object(self.analyzer.eastmoney_api, 'get_stock_history', side_effect=history):
+            results = list(self.analyzer.analyze_many(
+                stocks, concurrency=4, progress=lambda done, total, r: seen.append((done, total))))
+
+        self.assertEqual(sorted(r['stock_code'] for r in results), stocks)
+        self.assertLessEqual(peak[0], 4)
+        self.assertEqual(seen[-1], (12, 12))
+        self.assertTrue(all('total' in r['timings'] for r in results))
+
+    def test_error_isolated(self):
+        """测试单只股票出错只影响它自己"""
+        def history(secid, lmt):
+            if secid == 'bad':
+                raise ValueError("接口异常")
+            return None
+
+        with patch.object(self.analyzer, '_build_secid', side_effect=lambda code: 'bad' if code == '000002' else code), \
+                patch.object(self.analyzer.eastmoney_api, 'get_stock_history', side_effect=history):
+            results = {r['stock_code']: r for r in self.analyzer.analyze_many(
+                [("000001", "平安银行"), ("000002", "万科A")], progress=lambda *a: None)}
+
+        self.assertTrue(results['000001']['success'])
+        self.assertFalse(results['000002']['success'])
+        self.assertIn("接口异常", results['000002']['error'])
+
+    def test_rank_stocks(self):
+        """测试对批量结果做横截面排名，失败的结果被跳过"""
+        results = list(self.analyzer.analyze_many(["000001", "000002"], progress=lambda *a: None))
+        results.append({"stock_code": "000003", "stock_name": "失败", "success": False})
+        ranking = self.analyzer.rank_stocks(results)
+
+        self.assertEqual(sorted(ranking.index), ["000001", "000002"])
+        self.assertIn('overall_score', ranking.columns)
+
+    def test_cancel(self):
+        """测试取消后不再开始新的股票"""
+        cancel = threading.Event()
+        stocks = [f"{i:06d}" for i in range(20)]
+        results = []
+        for result in self.analyzer.analyze_many(stocks, concurrency=2, progress=lambda *a: None,
+                                                 cancel_event=cancel):
+            results.append(result)
+            cancel.set()
+
+        self.assertLess(len(results), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+股票代码主表单元测试
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+import threading
+from unittest.mock import MagicMock
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils import symbol_master as symbol_master_module
+from app.utils.symbol_master import SymbolMaster, guess_market
+
+ROWS = [
+    {'f12': '002115', 'f13': 0, 'f14': '三维通信'},
+    {'f12': '688981', 'f13': 1, 'f14': '中芯国际'},
+    {'f12': '830799', 'f13': 0, 'f14': '艾融软件'},
+    {'f12': '000001', 'f13': 0, 'f14': '平安银行'},
+    {'f12': '000002', 'f13': 0, 'f14': '平安研华'},
+]
+
+
+class TestSymbolMaster(unittest.TestCase):
+    """代码主表测试用例"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache_file = os.path.join(self.tmpdir.name, "symbol_master.json")
+        self.api = MagicMock()
+        self.api.get_market_snapshot.return_value = ROWS
+        self.master = SymbolMaster(self.cache_file, api=self.api)
+        self.master.refresh()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_resolve_by_code_name_and_secid(self):
+        """测试按代码、名称和 secid 解析"""
+        self.assertEqual(self.master.get_secid("688981"), "1.688981")
+        self.assertEqual(self.master.get_secid("830799"), "0.830799")
+        self.assertEqual(self.master.resolve("三维通信")['code'], "002115")
+        self.assertEqual(self.master.resolve("0.000001")['name'], "平安银行")
+        self.assertIsNone(self.master.resolve("999999"))
+
+    @unittest.skipIf(symbol_master_module.lazy_pinyin is None, "未安装 pypinyin")
+    def test_resolve_by_abbreviation(self):
+        """测试按拼音缩写解析，有歧义时不猜测"""
+        self.assertEqual(self.master.resolve("swtx")['code'], "002115")
+        self.assertIsNone(self.master.resolve("PAYH"))
+        self.assertEqual([s['code'] for s in self.master.find_by_abbr("PAYH")], ["000001", "000002"])
+
+    def test_refresh_once_per_day_and_cache(self):
+        """测试每天只刷新一次，并可从缓存文件加载"""
+        self.master.resolve("002115")
+        self.master.resolve("000001")
+        self.assertFalse(self.master.refresh_in_background())
+        self.assertEqual(self.api.get_market_snapshot.call_count, 1)
+
+        offline_api = MagicMock()
+        reloaded = SymbolMaster(self.cache_file, api=offline_api)
+        self.assertEqual(reloaded.get_name("002115"), "三维通信")
+        offline_api.get_market_snapshot.assert_not_called()
+
+    def test_resolve_does_not_wait_for_refresh(self):
+        """测试没有当天数据时查询立即返回本地结果，刷新在后台进行"""
+        release = threading.Event()
+        slow_api = MagicMock()
+        slow_api.get_market_snapshot.side_effect = lambda **kwargs: release.wait(5) and ROWS
+        master = SymbolMaster(os.path.join(self.tmpdir.name, "empty.json"), api=slow_api)
+
+        self.assertIsNone(master.resolve("002115"))
+        self.assertFalse(master.refresh_in_background())
+        release.set()
+        master._refresh_thread.join(5)
+        self.assertEqual(master.resolve("002115")['name'], "三维通信")
+        self.assertEqual(slow_api.get_market_snapshot.call_count, 1)
+
+    def test_guess_market_fallback(self):
+        """测试主表缺失时的市场推断"""
+        self.assertEqual(guess_market("688001"), "1")
+        self.assertEqual(guess_market("600036"), "1")
+        self.assertEqual(guess_market("300059"), "0")
+        self.assertEqual(guess_market("920001"), "0")
+
+        offline_api = MagicMock()
+        offline_api.get_market_snapshot.return_value = None
+        offline = SymbolMaster(os.path.join(self.tmpdir.name, "missing.json"), api=offline_api)
+        self.assertEqual(offline.get_secid("600036"), "1.600036")
+        offline._refresh_thread.join(5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+涨停雷达历史回补单元测试
+"""
+
+import unittest
+import sys
+import os
+import json
+import tempfile
+from datetime import date, timedelta
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from app.utils.news_store import NewsStore
+from app.utils.rate_limiter import RateLimiter
+from app.utils.ths_backfill import BackfillCrawler, published_at
+from tests.test_news_store import make_matcher
+
+
+def make_archive_page(page, per_page=3):
+    """生成第 page 页的历史列表，每页比上一页早 30 天"""
+    day = (date.today() - timedelta(days=30 * (page - 1))).strftime('%Y%m%d')
+    items = "".join(
+        f'<li><span class="arc-title"><span>10:0{i}</span>'
+        f'<a class="news-link" title="新闻{page}-{i}" data-seq="{page * 100 + i}" '
+        f'href="https://news.10jqka.com.cn/{day}/c{page * 100 + i}.shtml"></a>'
+        f'</span><a class="arc-cont news-link">内容{page}-{i}</a></li>'
+        for i in range(per_page)
+    )
+    return f'<html><body><div class="list-con"><ul>{items}</ul></div></body></html>'
+
+
+class TestBackfillCrawler(unittest.IsolatedAsyncioTestCase):
+    """历史回补测试用例"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.checkpoint = os.path.join(self.tmpdir.name, "checkpoint.json")
+        self.store = NewsStore(":memory:", matcher=make_matcher(self.tmpdir.name))
+        self.requested = []
+        self.failing = set()
+
+        def handler(request):
+            path = request.url.path
+            page = int(path.rsplit('_', 1)[1].split('.')[0]) if 'index_' in path else 1
+            self.requested.append(page)
+            if page in self.failing:
+                return httpx.Response(503)
+            if page > 20:
+                return httpx.Response(404)
+            return httpx.Response(200, content=make_archive_page(page).encode('utf-8'))
+
+        self.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+        self.store.conn.close()
+        self.tmpdir.cleanup()
+
+    def make_crawler(self):
+        return BackfillCrawler(self.store, self.checkpoint, concurrency=2,
+                               limiter=RateLimiter(1000, 100), client=self.client)
+
+    def count(self):
+        return self.store.conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    def test_published_at(self):
+        """测试从链接日期和列表时间推算发布时间"""
+        ts = published_at({'url': 'https://news.10jqka.com.cn/20240119/c1.shtml', 'time': '9:35'})
+        self.assertEqual(date.fromtimestamp(ts), date(2024, 1, 19))
+        self.assertIsNone(published_at({'url': 'https://news.10jqka.com.cn/c1.shtml'}))
+
+    async def test_stop_at_date_limit(self):
+        """测试超过截止日期后停止，早于截止日期的条目不入库"""
+        result = await self.make_crawler().run_async(days=100)
+
+        self.assertTrue(result['finished'])
+        # 第 1-4 页在 100 天以内，第 5 页（120 天前）触发停止
+        self.assertEqual(self.count(), 12)
+        self.assertLessEqual(max(self.requested), 6)
+
+    async def test_resume_after_interruption(self):
+        """测试中断后从检查点继续，失败的页面会重试"""
+        self.failing = {3}
+        first = await self.make_crawler().run_async(days=100, max_pages=4)
+        self.assertEqual(first['next_page'], 3)
+        self.assertEqual(first['done_pages'], [4])
+        with open(self.checkpoint) as f:
+            self.assertEqual(json.load(f)['next_page'], 3)
+
+        self.failing = set()
+        self.requested.clear()
+        second = await self.make_crawler().run_async(days=100)
+
+        self.assertTrue(second['finished'])
+        self.assertNotIn(1, self.requested)
+        self.assertNotIn(4, self.requested)
+        self.assertEqual(self.count(), 12)
+
+    async def test_stop_after_consecutive_failures(self):
+        """测试所有页面都失败时按失败预算停止"""
+        self.failing = set(range(1, 100))
+        result = await self.make_crawler().run_async(days=100)
+
+        self.assertFalse(result['finished'])
+        self.assertEqual(result['next_page'], 1)
+        self.assertLessEqual(len(self.requested), 6)
+
+    async def test_gaps_before_end_are_retried(self):
+        """测试到达最后一页时仍有缺页不算完成，续传只重试缺页"""
+        self.failing = {2}
+        first = await self.make_crawler().run_async(days=100)
+        self.assertFalse(first['finished'])
+        self.assertEqual(first['next_page'], 2)
+        self.assertEqual(first['end_page'], 5)
+        self.assertEqual(first['done_pages'], [3, 4, 5])
+
+        self.failing = set()
+        self.requested.clear()
+        second = await self.make_crawler().run_async(days=100)
+
+        self.assertTrue(second['finished'])
+        self.assertEqual(self.requested, [2])
+        self.assertEqual(self.count(), 12)
+
+
+if __name__ == '__main__':
+    unittest.main()
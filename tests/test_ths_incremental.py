@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+涨停雷达增量抓取单元测试
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+from unittest.mock import patch
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from lxml import etree
+
+from app.utils.ths_crawler import THSCrawler, BASIC_FIELDS
+
+
+def make_page(seqs):
+    """生成包含指定 data-seq 的涨停雷达页面（从新到旧）"""
+    items = "".join(
+        f'<li><span class="arc-title"><span>09:{seq % 60:02d}</span>'
+        f'<a class="news-link" title="新闻{seq}" data-seq="{seq}" href="https://news.10jqka.com.cn/{seq}.shtml"></a>'
+        f'</span><a class="arc-cont news-link">内容{seq}</a></li>'
+        for seq in seqs
+    )
+    return f'<html><body><div class="list-con"><ul>{items}</ul></div></body></html>'
+
+
+def make_response(status, text="", headers=None):
+    resp = requests.Response()
+    resp.status_code = status
+    resp._content = text.encode('utf-8')
+    resp.headers.update(headers or {})
+    return resp
+
+
+class TestTHSIncremental(unittest.TestCase):
+    """增量抓取测试用例"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.state_file = os.path.join(self.tmpdir.name, "state.json")
+        self.crawler = THSCrawler(cookie_file=os.path.join(self.tmpdir.name, "cookies.json"),
+                                  state_file=self.state_file)
+
+    def tearDown(self):
+        self.crawler.cookie_manager.flush()
+        self.tmpdir.cleanup()
+
+    def test_only_new_items_returned(self):
+        """测试只返回新条目，状态持久化后新实例继续增量"""
+        pages = [
+            make_response(200, make_page([103, 102, 101]), {'ETag': '"v1"'}),
+            make_response(200, make_page([105, 104, 103, 102, 101]), {'ETag': '"v2"'}),
+        ]
+        with patch('requests.get', side_effect=pages):
+            first = self.crawler.get_new_limit_up_news()
+            second = self.crawler.get_new_limit_up_news(with_content=True)
+
+        self.assertEqual([n['data_seq'] for n in first], ['103', '102', '101'])
+        self.assertEqual([n['data_seq'] for n in second], ['105', '104'])
+        self.assertEqual(second[0]['content'], '内容105')
+
+        restarted = THSCrawler(cookie_file=os.path.join(self.tmpdir.name, "cookies.json"),
+                               state_file=self.state_file)
+        with patch('requests.get', return_value=make_response(200, make_page([105, 104]))):
+            self.assertEqual(restarted.get_new_limit_up_news(), [])
+
+    def test_malformed_seq_skipped(self):
+        """测试 data-seq 格式异常的条目被跳过，不影响其余条目"""
+        page = make_page([103, 102, 101]).replace('data-seq="103"', 'data-seq="abc"')
+        with patch('requests.get', return_value=make_response(200, page, {'ETag': '"v1"'})):
+            first = self.crawler.get_new_limit_up_news()
+        self.assertEqual([n['data_seq'] for n in first], ['102', '101'])
+
+        self.crawler.reset_incremental_state()
+        with patch('requests.get', return_value=make_response(200, page)):
+            self.assertEqual(len(self.crawler.get_new_limit_up_news()), 2)
+
+    def test_etag_saved_only_after_parse(self):
+        """测试页面解析失败时不记录 ETag，下次仍会重新读取页面"""
+        response = make_response(200, make_page([1]), {'ETag': '"v1"'})
+        with patch('requests.get', return_value=response), \
+                patch.object(THSCrawler, 'iter_news', side_effect=ValueError("bad page")):
+            self.assertEqual(self.crawler.get_new_limit_up_news(), [])
+
+        with patch('requests.get', return_value=response) as mocked:
+            self.assertEqual(len(self.crawler.get_new_limit_up_news()), 1)
+        self.assertNotIn('If-None-Match', mocked.call_args.kwargs['headers'])
+
+    def test_conditional_request(self):
+        """测试发送条件请求头，304 时不返回内容"""
+        with patch('requests.get', return_value=make_response(
+                200, make_page([1]), {'ETag': '"v1"', 'Last-Modified': 'Mon, 01 Jan 2024 01:00:00 GMT'})):
+            self.crawler.get_new_limit_up_news()
+
+        with patch('requests.get', return_value=make_response(304)) as mocked:
+            self.assertEqual(self.crawler.get_new_limit_up_news(), [])
+
+        headers = mocked.call_args.kwargs['headers']
+        self.assertEqual(headers['If-None-Match'], '"v1"')
+        self.assertEqual(headers['If-Modified-Since'], 'Mon, 01 Jan 2024 01:00:00 GMT')
+
+    def test_single_fetch_field_selection(self):
+        """测试一次请求解析出所需字段"""
+        with patch('requests.get', return_value=make_response(200, make_page([7]))) as mocked:
+            news = self.crawler.get_limit_up_news_with_content()
+        self.assertEqual(mocked.call_count, 1)
+        self.assertEqual(news, [{
+            'time': '09:07', 'title': '新闻7', 'data_seq': '7',
+            'url': 'https://news.10jqka.com.cn/7.shtml', 'content': '内容7',
+        }])
+
+        basic = list(THSCrawler.iter_news(etree.HTML(make_page([7, 6])), BASIC_FIELDS))
+        self.assertEqual([set(n) for n in basic], [set(BASIC_FIELDS)] * 2)
+        self.assertEqual(list(THSCrawler.iter_news(etree.HTML(make_page([7]).replace('新闻7', '')))), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
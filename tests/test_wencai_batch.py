@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+问财批量并发查询单元测试
+"""
+
+import unittest
+import sys
+import os
+import threading
+import time
+from unittest.mock import patch
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from app.utils.wencai_api import WenCaiAPI
+from app.utils.wencai_cache import WenCaiCache, BATCH_SECTION
+from app.utils.wencai_metrics import score_watchlist
+
+
+class TestWenCaiBatch(unittest.TestCase):
+    """批量并发查询测试用例"""
+
+    def test_runs_concurrently_and_streams(self):
+        """测试并发执行，结果按完成先后返回"""
+        delays = {'慢': 0.3, '快1': 0.1, '快2': 0.1, '快3': 0.1}
+
+        def fake(code, **kwargs):
+            time.sleep(delays[code])
+            return {'代码': code}
+
+        started = time.monotonic()
+        with patch.object(WenCaiAPI, 'get_stock_diagnosis', side_effect=fake):
+            order = [code for code, _ in WenCaiAPI.iter_stock_diagnosis(delays, max_workers=4)]
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(order[-1], '慢')
+        self.assertEqual(sorted(order), sorted(delays))
+        self.assertLess(elapsed, 0.5)
+
+    def test_concurrency_is_bounded(self):
+        """测试并发数不超过 max_workers"""
+        lock = threading.Lock()
+        state = {'running': 0, 'peak': 0}
+
+        def fake(code, **kwargs):
+            with lock:
+                state['running'] += 1
+                state['peak'] = max(state['peak'], state['running'])
+            time.sleep(0.05)
+            with lock:
+                state['running'] -= 1
+            return {}
+
+        with patch.object(WenCaiAPI, 'get_stock_diagnosis', side_effect=fake):
+            results = WenCaiAPI.get_stock_diagnosis_batch([str(i) for i in range(10)], max_workers=3)
+
+        self.assertEqual(len(results), 10)
+        self.assertEqual(state['peak'], 3)
+
+    def test_retry_then_give_up(self):
+        """测试失败重试，超过重试次数后返回 None"""
+        calls = {'ok': 0, 'bad': 0}
+
+        def fake(code, **kwargs):
+            calls[code] += 1
+            if code == 'ok' and calls[code] < 2:
+                return None
+            return {'代码': code} if code == 'ok' else None
+
+        with patch.object(WenCaiAPI, 'get_stock_diagnosis', side_effect=fake):
+            results = WenCaiAPI.get_stock_diagnosis_batch(['ok', 'bad'], retries=2, backoff=0.01)
+
+        self.assertEqual(results, {'ok': {'代码': 'ok'}, 'bad': None})
+        self.assertEqual(calls, {'ok': 2, 'bad': 3})
+
+    def test_timeout(self):
+        """测试单次调用超时"""
+        def fake(code, **kwargs):
+            time.sleep(0.5 if code == '卡住' else 0)
+            return {'代码': code}
+
+        with patch.object(WenCaiAPI, 'get_stock_diagnosis', side_effect=fake):
+            started = time.monotonic()
+            results = WenCaiAPI.get_stock_diagnosis_batch(['卡住', '正常'], timeout=0.1, retries=0)
+
+        self.assertLess(time.monotonic() - started, 0.4)
+        self.assertEqual(results, {'卡住': None, '正常': {'代码': '正常'}})
+
+
+class TestWenCaiMultiStockQuery(unittest.TestCase):
+    """多股票合并查询测试用例"""
+
+    def setUp(self):
+        self.cache = WenCaiCache(":memory:")
+        self.patcher = patch.object(WenCaiAPI, 'cache', self.cache)
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.cache.conn.close()
+
+    @staticmethod
+    def _fake_get(query, find, **kwargs):
+        return pd.DataFrame({
+            '股票代码': [f"{code}.{'SH' if code.startswith('6') else 'SZ'}" for code in find],
+            '股票简称': [f"股票{code}" for code in find],
+            '市盈率(pe)[20240119]': ['25.5'] * len(find),
+            '区间主力资金净额[20240115-20240119]': ['1亿'] * len(find),
+        })
+
+    def test_chunks_split_and_cache(self):
+        """测试按块合并查询、按股票拆分并写入缓存"""
+        codes = [f"{i:06d}" for i in range(1, 8)]
+        with patch('pywencai.get', side_effect=self._fake_get) as mocked:
+            first = WenCaiAPI.get_batch_diagnosis(codes, chunk_size=3)
+            second = WenCaiAPI.get_batch_diagnosis(codes, chunk_size=3)
+
+        self.assertEqual(mocked.call_count, 3)
+        self.assertEqual(list(first), codes)
+        self.assertEqual(first['000001'][BATCH_SECTION]['股票简称'], '股票000001')
+        self.assertEqual(dict(second['000007']), dict(first['000007']))
+        self.assertIn(BATCH_SECTION, self.cache.load('股票000002'))
+
+        frame = score_watchlist(first)
+        self.assertEqual(frame.loc['000003', 'pe'], 25.5)
+        self.assertEqual(frame.loc['000003', 'main_inflow_5d'], 1e8)
+
+    def test_missing_stock_is_none(self):
+        """测试查询不到的股票返回 None"""
+        with patch('pywencai.get', return_value=None):
+            self.assertEqual(WenCaiAPI.get_batch_diagnosis(['002115']), {'002115': None})
+
+
+if __name__ == '__main__':
+    unittest.main()
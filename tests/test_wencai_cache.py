@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+问财诊股缓存单元测试
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+import time
+from unittest.mock import MagicMock
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.wencai_cache import WenCaiCache, HOUR, QUARTER
+
+
+class TestWenCaiCache(unittest.TestCase):
+    """分部分缓存测试用例"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache = WenCaiCache(os.path.join(self.tmpdir.name, "cache.db"))
+        self.fetch = MagicMock(return_value={
+            '重要新闻': ['新新闻'],
+            '财务数据': [{'营业收入': 2}],
+        })
+
+    def tearDown(self):
+        self.cache.conn.close()
+        self.tmpdir.cleanup()
+
+    def test_first_call_fetches_then_serves_locally(self):
+        """测试首次请求后直接读取缓存"""
+        first = self.cache.get_or_fetch("002115", self.fetch)
+        second = self.cache.get_or_fetch("002115", self.fetch)
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.fetch.call_count, 1)
+
+    def test_only_stale_sections_refreshed(self):
+        """测试只覆盖过期部分，未过期部分保持原值"""
+        now = time.time()
+        self.cache.store("002115", {'重要新闻': ['旧新闻']}, fetched_at=now - 2 * HOUR)
+        self.cache.store("002115", {'财务数据': [{'营业收入': 1}]}, fetched_at=now - HOUR)
+
+        result = self.cache.get_or_fetch("002115", self.fetch)
+
+        self.assertEqual(self.fetch.call_count, 1)
+        self.assertEqual(result['重要新闻'], ['新新闻'])
+        self.assertEqual(result['财务数据'], [{'营业收入': 1}])
+        self.assertLess(self.cache.load("002115")['财务数据'][1], now)
+
+    def test_selected_sections_skip_fetch_when_fresh(self):
+        """测试只需要未过期部分时不请求问财"""
+        now = time.time()
+        self.cache.store("002115", {'重要新闻': ['旧新闻']}, fetched_at=now - 2 * HOUR)
+        self.cache.store("002115", {'财务数据': [{'营业收入': 1}]}, fetched_at=now - QUARTER / 2)
+
+        result = self.cache.get_or_fetch("002115", self.fetch, sections=['财务数据'])
+
+        self.fetch.assert_not_called()
+        self.assertEqual(result, {'财务数据': [{'营业收入': 1}]})
+
+    def test_fetch_failure_serves_stale(self):
+        """测试刷新失败时返回旧数据"""
+        self.cache.store("002115", {'重要新闻': ['旧新闻']}, fetched_at=time.time() - 2 * HOUR)
+        self.fetch.return_value = None
+
+        self.assertEqual(self.cache.get_or_fetch("002115", self.fetch), {'重要新闻': ['旧新闻']})
+        self.assertIsNone(self.cache.get_or_fetch("600036", self.fetch))
+        self.assertIsNone(self.cache.get_or_fetch("000001", self.fetch, cache_only=True))
+
+    def test_selected_sections_only_stored(self):
+        """测试指定部分时只缓存这些部分，缺失的部分不会反复请求"""
+        wanted = ['财务数据', '估值指标']
+
+        result = self.cache.get_or_fetch("002115", self.fetch, sections=wanted)
+        again = self.cache.get_or_fetch("002115", self.fetch, sections=wanted)
+
+        self.assertEqual(result, {'财务数据': [{'营业收入': 2}]})
+        self.assertEqual(again, result)
+        self.assertEqual(self.fetch.call_count, 1)
+        self.assertNotIn('重要新闻', self.cache.load("002115"))
+        self.assertNotIn('估值指标', self.cache.get_or_fetch("002115", self.fetch))
+
+    def test_full_request_after_selected_sections(self):
+        """测试部分获取之后的完整请求会补齐其余部分，而不是只返回已缓存的部分"""
+        self.cache.get_or_fetch("002115", self.fetch, sections=['财务数据', '估值指标'])
+
+        full = self.cache.get_or_fetch("002115", self.fetch)
+        again = self.cache.get_or_fetch("002115", self.fetch)
+
+        self.assertEqual(self.fetch.call_count, 2)
+        self.assertEqual(full, {'重要新闻': ['新新闻'], '财务数据': [{'营业收入': 2}]})
+        self.assertEqual(again, full)
+        self.assertEqual(self.cache.full_sections("002115"), ['财务数据', '重要新闻'])
+
+    def test_load_only_decodes_wanted_sections(self):
+        """测试指定部分时只读取这些部分"""
+        self.cache.store("002115", {'重要新闻': ['旧'], '财务数据': [1]})
+        self.cache._decode = MagicMock(side_effect=self.cache._decode)
+
+        self.assertEqual(list(self.cache.load("002115", ['财务数据'])), ['财务数据'])
+        self.assertEqual(self.cache._decode.call_count, 1)
+        self.assertEqual(self.cache.load("002115", []), {})
+
+    def test_version(self):
+        """测试版本号随新部分到达变化，有部分过期时为 None"""
+        self.assertIsNone(self.cache.version("002115"))
+        self.cache.store("002115", {'重要新闻': ['旧'], '财务数据': [1]}, fetched_at=1000.0)
+        self.assertIsNone(self.cache.version("002115", now=1000.0 + 60))
+        self.cache.mark_full("002115", ['重要新闻', '财务数据'], fetched_at=1000.0)
+        self.assertEqual(self.cache.version("002115", now=1000.0 + 60), 1000.0)
+        self.assertIsNone(self.cache.version("002115", now=1000.0 + HOUR))
+        self.assertIsNone(self.cache.version("002115", ['估值指标'], now=1000.0 + 60))
+
+        self.cache.store("002115", {'重要新闻': ['新']}, fetched_at=1030.0)
+        self.assertEqual(self.cache.version("002115", now=1000.0 + 60), 1030.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+问财诊股数据惰性转换单元测试
+"""
+
+import unittest
+import sys
+import os
+from unittest.mock import patch
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from app.utils.wencai_cache import WenCaiCache
+from app.utils.wencai_data import LazyDiagnosis, LazyTable, materialize, render_value
+
+
+class TestLazyDiagnosis(unittest.TestCase):
+    """惰性转换测试用例"""
+
+    def setUp(self):
+        self.frame = pd.DataFrame({'日期': ['20240101', '20240102', '20240103'], '净流入': [1.5, -2.0, 3.0]})
+        self.raw = {'历史主力资金流向': self.frame, '投顾点评': '震荡'}
+
+    def test_membership_does_not_convert(self):
+        """测试判断部分是否存在不触发转换"""
+        diagnosis = LazyDiagnosis(self.raw)
+        with patch('app.utils.wencai_data.materialize') as mocked:
+            self.assertIn('历史主力资金流向', diagnosis)
+            self.assertNotIn('财务数据', diagnosis)
+            mocked.assert_not_called()
+
+    def test_getitem_matches_eager_conversion(self):
+        """测试读取结果与原来的 records 转换一致，且只转换一次"""
+        diagnosis = LazyDiagnosis(self.raw)
+        records = diagnosis['历史主力资金流向']
+
+        self.assertEqual(records, self.frame.to_dict(orient='records'))
+        self.assertIs(diagnosis['历史主力资金流向'], records)
+        self.assertEqual(diagnosis.to_dict(), materialize(self.raw))
+
+    def test_render_is_bounded(self):
+        """测试渲染只保留前若干行"""
+        frame = pd.DataFrame({'值': range(1000)})
+        text = render_value(frame, max_rows=5)
+
+        self.assertIn('共 1000 行', text)
+        self.assertNotIn('"值": 5', text)
+
+    def test_cache_roundtrip_keeps_columnar(self):
+        """测试缓存读写保持列式表格"""
+        cache = WenCaiCache(":memory:", table_factory=LazyTable.from_split)
+        cache.store("002115", self.raw)
+        table = cache.load("002115")['历史主力资金流向'][0]
+
+        self.assertIsInstance(table, LazyTable)
+        self.assertEqual(table.column('净流入'), [1.5, -2.0, 3.0])
+        self.assertEqual(table.records(), self.frame.to_dict(orient='records'))
+        cache.conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
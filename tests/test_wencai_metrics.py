@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+问财诊股数值化单元测试
+"""
+
+import math
+import unittest
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from app.utils.wencai_data import LazyDiagnosis
+from app.utils.wencai_metrics import (
+    METRIC_FIELDS, build_metrics_frame, extract_metrics, parse_number, score_watchlist
+)
+
+
+def _diagnosis(inflow, pe, roe):
+    """构造包含资金、估值和财务表格的诊股数据"""
+    return LazyDiagnosis({
+        '历史主力资金流向': pd.DataFrame({
+            '日期': [f'202401{d:02d}' for d in range(1, 21)],
+            '主力资金净流入': [inflow] * 20,
+            '主力净流入占比': ['5%'] * 20,
+        }),
+        '估值指标': pd.DataFrame({'日期': ['20240119', '20240120'], '市盈率(TTM)': ['99', pe], '市净率': [2.1, 2.0]}),
+        '财务数据': [{'报告期': '2023-09-30', '净资产收益率': roe, '营业收入同比增长率': '12.5%'}],
+        '十大股东持股比例': [{'股东': f'股东{i}', '持股比例': '6%'} for i in range(12)],
+    })
+
+
+class TestWenCaiMetrics(unittest.TestCase):
+    """数值化和向量化评分测试用例"""
+
+    def test_parse_number(self):
+        """测试数值解析"""
+        self.assertEqual(parse_number('1.5亿'), 1.5e8)
+        self.assertEqual(parse_number('-3,000万'), -3e7)
+        self.assertEqual(parse_number('12.5%'), 12.5)
+        self.assertTrue(math.isnan(parse_number('--')))
+
+    def test_extract_metrics(self):
+        """测试从诊股数据中解析固定字段"""
+        metrics = extract_metrics(_diagnosis('1000万', '25.5', '15%'))
+
+        self.assertEqual(set(metrics), set(METRIC_FIELDS))
+        self.assertAlmostEqual(metrics['main_inflow_5d'], 5e7)
+        self.assertAlmostEqual(metrics['main_inflow_20d'], 2e8)
+        self.assertEqual(metrics['pe'], 25.5)
+        self.assertEqual(metrics['pb'], 2.0)
+        self.assertEqual(metrics['roe'], 15.0)
+        self.assertEqual(metrics['revenue_growth'], 12.5)
+        self.assertEqual(metrics['top10_holder_ratio'], 60.0)
+        self.assertTrue(math.isnan(metrics['northbound_change']))
+
+    def test_vectorized_scoring(self):
+        """测试对多只股票向量化评分，缺失数据给基础分"""
+        frame = score_watchlist({
+            'good': _diagnosis('1亿', '20', '20%'),
+            'bad': _diagnosis('-1亿', '-5', '-10%'),
+            'empty': None,
+        })
+
+        self.assertEqual(list(frame.index), ['good', 'bad', 'empty'])
+        self.assertGreater(frame.loc['good', 'fund_score'], frame.loc['bad', 'fund_score'])
+        self.assertGreater(frame.loc['good', 'fundamental_score'], frame.loc['bad', 'fundamental_score'])
+        self.assertEqual(frame.loc['empty', 'fund_score'], 50.0)
+        self.assertTrue(build_metrics_frame({}).empty)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -28,12 +28,11 @@ if __name__ == "__main__":
     # 创建分析器
     analyzer = StockComprehensiveAnalyzer()
 
-    # 分析股票（自动获取所有数据）
-    result = analyzer.analyze_stock(STOCK_CODE, STOCK_NAME)
-
-    # 生成并打印报告
-    report = analyzer.generate_report(result, detailed=True)
-    print("\n" + report)
+    # 渐进式输出报告：技术面先到，问财数据和AI分析到达后依次输出
+    result = None
+    for part in analyzer.stream_report(STOCK_CODE, STOCK_NAME):
+        print(part['text'], flush=True)
+        result = part.get('result', result)
 
     # 显示关键信息
     print("\n" + "=" * 80)
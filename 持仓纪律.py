@@ -0,0 +1,37 @@
+"""
+持仓纪律脚本 - 收盘前分析持仓股，决定止损、加仓还是不动
+
+直接运行立即检查一次（当天 14:50 前运行以 14:50 为截止时间）；
+加 --schedule 参数后常驻运行，每个交易日 14:40 自动检查。
+"""
+import sys
+import time
+
+from app.utils.holdings_review import HoldingsReviewJob, load_holdings
+
+# ============ 在这里填写你的持仓（或写到 holdings.json） ============
+MY_HOLDINGS = [
+    {"code": "002115", "name": "三维通信", "cost": 8.50},
+    {"code": "600036", "name": "招商银行", "cost": 35.20, "stop_loss": 5.0},
+]
+# ===================================================================
+
+
+def get_holdings():
+    return load_holdings() or MY_HOLDINGS
+
+
+if __name__ == "__main__":
+    job = HoldingsReviewJob()
+    
+    if "--schedule" in sys.argv:
+        print("持仓纪律检查已启动，每个交易日 14:40 开始，14:50 前给出结论（Ctrl+C 退出）")
+        job.start(get_holdings)
+        try:
+            while job.running:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            job.stop()
+    else:
+        decisions = job.run(get_holdings())
+        print(job.format_decisions(decisions))